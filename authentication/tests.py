@@ -1,3 +1,117 @@
+import csv
+import io
+import shutil
+import tempfile
+from pathlib import Path
+from django.core import mail
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from django.urls import reverse
+from core.mail import drain_outbox
+from core.models import CourseStatistic, EmailOutbox, PlatformStatistic
+from exams.models import Course
+from .models import CustomUser, CourseEnrollment
 
-# Create your tests here.
+
+class ImportStudentsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        instructor = CustomUser.objects.create_user(
+            email='instructor@test.local', username='instructor', password='pw', user_type='instructor',
+        )
+        cls.fullstack = Course.objects.create(code='fullstack', name='Fullstack', description='Course', instructor=instructor)
+        cls.react = Course.objects.create(code='frontend_react', name='React', description='Course', instructor=instructor)
+        CustomUser.objects.create_user(email='existing@test.local', username='existing', password='pw')
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def run_import(self, name, content, *args):
+        path = self.directory / name
+        path.write_text(content)
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_students', str(path), '--workers', '1', '--chunk-size', '2', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv(self):
+        out, err = self.run_import('students.csv', (
+            'email,first_name,last_name,password,course,username\n'
+            'Ada@Test.Local,Ada,Lovelace,secret-pass-1,,\n'
+            'grace@test.local,Grace,Hopper,,frontend_react,ghopper\n'
+            'alan@test.local,Alan,Turing,,,\n'
+            'not-an-email,Bad,Row,,,\n'
+            'ada@test.local,Ada,Again,,,\n'
+            'Existing@Test.local,Old,Account,,,\n'
+            'linus@test.local,Linus,,,,\n'
+            'ken@test.local,Ken,Thompson,,nursing,\n'
+            'dennis@test.local,Dennis,Ritchie,,,existing\n'
+        ), '--course', 'fullstack', '--default-password', 'welcome-123', '--verified')
+        self.assertIn('9 rows', out)
+        self.assertIn('3 created, 1 already registered, 5 rejected', out)
+        for message in ('invalid email', 'duplicate email in file', 'first_name and last_name are required',
+                        'unknown course "nursing"', 'username "existing" is taken'):
+            self.assertIn(message, err)
+
+        ada = CustomUser.objects.get(email='Ada@test.local')
+        self.assertTrue(ada.check_password('secret-pass-1'))
+        self.assertTrue(ada.is_email_verified)
+        self.assertEqual(ada.user_type, 'student')
+        self.assertTrue(CustomUser.objects.get(email='alan@test.local').check_password('welcome-123'))
+        self.assertEqual(CustomUser.objects.get(email='grace@test.local').username, 'ghopper')
+        self.assertEqual(
+            sorted(CourseEnrollment.objects.values_list('student__email', 'course__code')),
+            [('Ada@test.local', 'fullstack'), ('alan@test.local', 'fullstack'), ('grace@test.local', 'frontend_react')],
+        )
+        self.assertEqual(PlatformStatistic.objects.get(key='total_students').value, 4)
+        self.assertEqual(CourseStatistic.objects.get(course=self.fullstack).active_enrollments, 2)
+
+    def test_jsonl_error_report_and_dry_run(self):
+        report = self.directory / 'errors.csv'
+        content = (
+            '{"email": "ada@test.local", "first_name": "Ada", "last_name": "Lovelace"}\n'
+            '\n'
+            'not json\n'
+            '["a", "list"]\n'
+        )
+        out, _ = self.run_import('students.jsonl', content, '--dry-run', '--error-report', str(report))
+        self.assertIn('Validated 3 rows', out)
+        self.assertIn('0 created, 0 already registered, 2 rejected', out)
+        self.assertFalse(CustomUser.objects.filter(email='ada@test.local').exists())
+        with report.open() as handle:
+            self.assertEqual([row[0] for row in csv.reader(handle)], ['line', '3', '4'])
+
+        self.run_import('students.jsonl', content)
+        student = CustomUser.objects.get(email='ada@test.local')
+        # No password in the file and no default: the student has to reset it
+        self.assertFalse(student.has_usable_password())
+
+    def test_rejects_unknown_default_course(self):
+        with self.assertRaises(CommandError):
+            self.run_import('students.csv', 'email,first_name,last_name\n', '--course', 'nursing')
+
+
+class RegistrationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        instructor = CustomUser.objects.create_user(
+            email='instructor@test.local', username='instructor', password='pw', user_type='instructor',
+        )
+        cls.course = Course.objects.create(code='fullstack', name='Fullstack', description='Course', instructor=instructor)
+
+    def test_verification_email_goes_through_the_outbox(self):
+        response = self.client.post(reverse('authentication:student_register'), {
+            'username': 'ada', 'email': 'ada@test.local', 'first_name': 'Ada', 'last_name': 'Lovelace',
+            'course': self.course.id, 'password1': 'An4lytical-Engine', 'password2': 'An4lytical-Engine',
+        })
+        self.assertRedirects(response, reverse('authentication:login'), fetch_redirect_response=False)
+        student = CustomUser.objects.get(email='ada@test.local')
+        self.assertFalse(student.is_active)
+
+        # The request only queues the message
+        self.assertEqual(mail.outbox, [])
+        message = EmailOutbox.objects.get()
+        self.assertEqual((message.to, message.status), (['ada@test.local'], 'pending'))
+        self.assertEqual(drain_outbox(), (1, 0))
+        self.assertEqual(mail.outbox[0].to, ['ada@test.local'])
+        self.assertIn(str(student.email_verification_token), mail.outbox[0].body)
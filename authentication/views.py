@@ -3,8 +3,6 @@ from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import PasswordResetView, PasswordResetConfirmView
 from django.contrib import messages
-from django.core.mail import send_mail
-from django.conf import settings
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_protect
 from django.urls import reverse_lazy, reverse
@@ -14,6 +12,7 @@ from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.template.loader import render_to_string
 from django.contrib.sites.shortcuts import get_current_site
+from core.mail import enqueue_email
 from .models import CustomUser
 from .forms import StudentRegistrationForm, InstructorRegistrationForm, SimpleLoginForm, CustomPasswordResetForm, CustomSetPasswordForm, UserProfileForm, CourseEnrollmentForm, QuickCourseChangeForm
 import uuid
@@ -39,18 +38,11 @@ def send_verification_email(user, request):
     })
     
     try:
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [user.email],
-            html_message=message,
-            fail_silently=False
-        )
-        logger.info(f"Verification email sent to {user.email}")
+        enqueue_email(subject, message, [user.email], html_body=message)
+        logger.info(f"Verification email queued for {user.email}")
         return True
     except Exception as e:
-        logger.error(f"Failed to send verification email to {user.email}: {str(e)}")
+        logger.error(f"Failed to queue verification email for {user.email}: {str(e)}")
         return False
 
 def register_choice(request):
@@ -110,16 +102,17 @@ def instructor_register(request):
                 f'You will receive an email notification once approved to start creating courses and assessments.')
             
             # Send approval pending email to instructor
+            specializations = ', '.join(
+                dict(form.fields['specialization'].choices)[spec] for spec in form.cleaned_data['specialization']
+            )
             try:
-                send_mail(
+                enqueue_email(
                     'N-TECH CBT - Instructor Account Pending Approval',
-                    f'Hello {user.first_name},\n\nThank you for applying to become an N-TECH instructor!\n\nYour account details:\n- Name: {user.get_full_name()}\n- Institution: {user.institution}\n- Department: {user.department}\n- Specializations: {", ".join(user.specializations) if user.specializations else "Not specified"}\n\nYour instructor application is currently under review by our administrators. You will receive an email notification once your account is approved and you can start creating technology training content.\n\nBest regards,\nN-TECH Training Team',
-                    settings.DEFAULT_FROM_EMAIL,
+                    f'Hello {user.first_name},\n\nThank you for applying to become an N-TECH instructor!\n\nYour account details:\n- Name: {user.get_full_name()}\n- Institution: {user.institution}\n- Department: {user.department}\n- Specializations: {specializations or "Not specified"}\n\nYour instructor application is currently under review by our administrators. You will receive an email notification once your account is approved and you can start creating technology training content.\n\nBest regards,\nN-TECH Training Team',
                     [user.email],
-                    fail_silently=True,
                 )
             except Exception as e:
-                print(f"Email sending failed: {e}")
+                logger.error(f"Failed to queue approval pending email for {user.email}: {str(e)}")
             
             return redirect('authentication:login')
     else:
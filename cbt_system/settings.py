@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+from urllib.parse import urlsplit
 from decouple import config
 import dj_database_url
 
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryStatsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -142,6 +144,46 @@ DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='N-TECH CBT System <yo
 # Redis Configuration
 REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/0')
 
+# Cache Configuration
+# Set CACHE_URL=locmem:// to use a per-process memory cache without Redis.
+# The default is database 1 of the REDIS_URL server, apart from the
+# Celery broker's database, so cache evictions and flushes never touch
+# queued tasks.
+CACHE_URL = config('CACHE_URL', default=urlsplit(REDIS_URL)._replace(path='/1').geturl())
+CACHE_TIMEOUT = config('CACHE_TIMEOUT', default=300, cast=int)
+
+if CACHE_URL.startswith('locmem://'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'cbt-cache',
+            'TIMEOUT': CACHE_TIMEOUT,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': 'cbt',
+            'TIMEOUT': CACHE_TIMEOUT,
+            'OPTIONS': {
+                # Options below are passed to the redis-py connection pool
+                'max_connections': config('CACHE_MAX_CONNECTIONS', default=50, cast=int),
+                'socket_connect_timeout': 1,
+                'socket_timeout': 1,
+                'retry_on_timeout': True,
+                'health_check_interval': 30,
+            },
+        }
+    }
+
+# Report per-request query counts in response headers (for load tests only)
+QUERY_STATS_HEADERS = config('QUERY_STATS_HEADERS', default=False, cast=bool)
+
+# Tests run on a local-memory cache with eager Celery tasks (no Redis needed)
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
 # Celery Configuration
 CELERY_BROKER_URL = config('CELERY_BROKER_URL', default=REDIS_URL)
 CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default=REDIS_URL)
@@ -149,6 +191,28 @@ CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+CELERY_BEAT_SCHEDULE = {
+    'sweep-expired-exam-attempts': {
+        'task': 'exams.tasks.sweep_expired_attempts',
+        'schedule': 60.0,  # every minute
+    },
+    'aggregate-exam-performance': {
+        'task': 'exams.tasks.aggregate_exam_performance',
+        'schedule': 60.0,
+    },
+    'provision-upcoming-exams': {
+        'task': 'exams.tasks.provision_upcoming_exams',
+        'schedule': 300.0,  # every 5 minutes, for exams opening within 15 minutes
+    },
+    'refresh-dashboard-statistics': {
+        'task': 'core.tasks.refresh_dashboard_statistics',
+        'schedule': 900.0,  # every 15 minutes
+    },
+    'deliver-email-outbox': {
+        'task': 'core.tasks.deliver_outbox',
+        'schedule': 15.0,  # every 15 seconds, so queued email goes out promptly
+    },
+}
 
 # Security Settings for Production
 if not DEBUG:
@@ -1,3 +1,21 @@
 from django.contrib import admin
+from django.utils import timezone
+from .models import EmailOutbox
 
-# Register your models here.
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('subject', 'to')
+    readonly_fields = ('attempts', 'last_error', 'created_at', 'sent_at')
+    actions = ['retry_now']
+    
+    def recipients(self, obj):
+        return ', '.join(obj.to)
+    recipients.short_description = 'To'
+    
+    def retry_now(self, request, queryset):
+        updated = queryset.filter(status__in=('pending', 'dead')).update(status='pending', attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f'{updated} email(s) queued for delivery.')
+    retry_now.short_description = "Retry selected emails now"
@@ -0,0 +1,98 @@
+"""
+Versioned cache keys.
+
+Every cached value lives under a namespace (e.g. ``courses`` or
+``exam:12``) whose version number is part of the key. Invalidating a
+namespace only bumps its version, so stale entries are never read again
+and simply expire, without having to know or delete individual keys.
+"""
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# Tries before a failed invalidation is raised, and the pause between them
+BUMP_ATTEMPTS = 3
+BUMP_RETRY_DELAY = 0.05
+
+
+def _version_key(namespace):
+    return f'version:{namespace}'
+
+
+def _initial_version():
+    # Time based, so a namespace whose version was evicted never falls back
+    # to a number that older entries were written under
+    return int(time.time() * 1000)
+
+
+def get_version(namespace):
+    """Current version number of a namespace"""
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        version = _initial_version()
+        if not cache.add(_version_key(namespace), version, timeout=None):
+            version = cache.get(_version_key(namespace), version)
+    return version
+
+
+def bump_version(namespace):
+    """
+    Invalidate every key of a namespace.
+
+    Redis errors are retried a few times and then raised: a lost bump keeps
+    stale entries readable until they expire, so it must not pass for a
+    successful one.
+    """
+    for attempt in range(1, BUMP_ATTEMPTS + 1):
+        try:
+            try:
+                cache.incr(_version_key(namespace))
+            except ValueError:
+                # No version cached yet: start a fresh one
+                cache.add(_version_key(namespace), _initial_version(), timeout=None)
+            return
+        except RedisError as e:
+            if attempt == BUMP_ATTEMPTS:
+                raise
+            logger.warning(f"Retrying invalidation of cache namespace {namespace}: {e}")
+            time.sleep(BUMP_RETRY_DELAY * attempt)
+
+
+def make_key(namespace, *parts):
+    """Build a key under the current version of a namespace"""
+    return ':'.join([namespace, f'v{get_version(namespace)}', *map(str, parts)])
+
+
+def get_or_set(namespace, parts, loader, timeout=None, versions=()):
+    """
+    Read-through helper: return the cached value or compute it with loader().
+
+    The versions of the namespaces in versions are made part of the key as
+    well, so bumping any of them also retires the value.
+
+    Cache outages are logged and fall back to loader(), so a Redis failure
+    slows requests down instead of breaking them.
+    """
+    timeout = settings.CACHE_TIMEOUT if timeout is None else timeout
+    try:
+        key = make_key(namespace, *parts, *[f'{other}.v{get_version(other)}' for other in versions])
+        value = cache.get(key, _MISSING)
+    except RedisError as e:
+        logger.warning(f"Cache read failed for {namespace}: {e}")
+        return loader()
+
+    if value is not _MISSING:
+        return value
+
+    value = loader()
+    try:
+        cache.set(key, value, timeout)
+    except RedisError as e:
+        logger.warning(f"Cache write failed for {namespace}: {e}")
+    return value
@@ -0,0 +1,149 @@
+"""
+Durable email outbox.
+
+Views call enqueue_email, which only writes an EmailOutbox row, so a slow
+or unreachable mail server never holds up a request. The deliver_outbox
+Celery beat task drains due rows in batches over one reused connection,
+leasing each batch rather than locking it while the mail server is slow,
+retries failures with exponential backoff and gives up on a message
+after EmailOutbox.MAX_ATTEMPTS tries.
+
+Requests deliberately do not publish a Celery task per message: with the
+broker down, publishing retries for several seconds, which would put the
+broker back on the request path.
+"""
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 60 * 60
+# How long a worker owns the messages it claimed; longer than a batch takes
+LEASE = timedelta(minutes=10)
+
+
+def build_email(subject, body, to, html_body='', from_email=None):
+    """Unsaved outbox row, for callers that queue many messages with bulk_create"""
+    return EmailOutbox(
+        subject=subject[:255],
+        body=body,
+        html_body=html_body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(to),
+    )
+
+
+def enqueue_email(subject, body, to, html_body='', from_email=None):
+    """Queue one message for the next outbox delivery run"""
+    message = build_email(subject, body, to, html_body=html_body, from_email=from_email)
+    message.save()
+    return message
+
+
+def retry_delay(attempts):
+    """Backoff before the next try after the given number of failed attempts"""
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def claim_messages(batch_size, now):
+    """
+    Lease up to batch_size due messages to this worker in one short
+    transaction. Claimed rows are marked sending until now + LEASE and
+    count the try; rows whose lease ran out (their worker died
+    mid-batch) are due again, unless they have used up their tries.
+    """
+    with transaction.atomic():
+        EmailOutbox.objects.filter(
+            status='sending', next_attempt_at__lte=now, attempts__gte=EmailOutbox.MAX_ATTEMPTS
+        ).update(status='dead', last_error='Delivery was interrupted on every try')
+        messages = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status__in=('pending', 'sending'), next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        EmailOutbox.objects.filter(id__in=[message.id for message in messages]).update(
+            status='sending', attempts=F('attempts') + 1, next_attempt_at=now + LEASE
+        )
+    for message in messages:
+        message.status = 'sending'
+        message.attempts += 1
+    return messages
+
+
+def send_outbox_batch(batch_size=100):
+    """
+    Deliver up to batch_size due messages over a single connection.
+
+    Messages are claimed first (see claim_messages) and sent outside any
+    transaction, so no row locks are held while the mail server is
+    talked to, and several workers can drain the outbox at once. Each
+    message is sent on its own so a rejected recipient only fails that
+    message, and its outcome is recorded right away with its own UPDATE:
+    a worker dying mid-batch re-sends at most the message in flight.
+    Returns (sent, failed).
+    """
+    now = timezone.now()
+    sent = failed = 0
+    messages = claim_messages(batch_size, now)
+    if not messages:
+        return sent, failed
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        # Nothing can be delivered; count it as one attempt for the whole batch
+        for message in messages:
+            _record_failure(message, e, now)
+        return sent, len(messages)
+
+    try:
+        for message in messages:
+            email = EmailMultiAlternatives(
+                message.subject, message.body, message.from_email, message.to, connection=connection
+            )
+            if message.html_body:
+                email.attach_alternative(message.html_body, 'text/html')
+            try:
+                connection.send_messages([email])
+            except Exception as e:
+                _record_failure(message, e, timezone.now())
+                failed += 1
+            else:
+                EmailOutbox.objects.filter(pk=message.pk).update(
+                    status='sent', sent_at=timezone.now(), last_error=''
+                )
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def _record_failure(message, error, now):
+    """Schedule the claimed message's next try, or give up on it"""
+    values = {'status': 'pending', 'last_error': str(error)[:1000]}
+    if message.attempts >= EmailOutbox.MAX_ATTEMPTS:
+        values['status'] = 'dead'
+        logger.error(f"Giving up on email {message.id} to {', '.join(message.to)}: {error}")
+    else:
+        values['next_attempt_at'] = now + retry_delay(message.attempts)
+    EmailOutbox.objects.filter(pk=message.pk).update(**values)
+
+
+def drain_outbox(batch_size=100, max_batches=50):
+    """Send due messages batch by batch until none are left. Returns (sent, failed)."""
+    total_sent = total_failed = 0
+    for _ in range(max_batches):
+        sent, failed = send_outbox_batch(batch_size)
+        total_sent += sent
+        total_failed += failed
+        if sent + failed < batch_size:
+            break
+    return total_sent, total_failed
@@ -0,0 +1,310 @@
+import json
+import random
+import time
+import tracemalloc
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+from authentication.models import CourseEnrollment
+from core.profiling import percentile
+from core.statistics import refresh_all
+from exams.models import Course, Subject, Question, Exam, ExamQuestion, ExamAttempt, StudentAnswer, refresh_total_marks
+from exams.performance import rebuild_exam_performance
+from exams.question_stats import rebuild_question_stats
+
+User = get_user_model()
+
+DEFAULT_BUDGETS = Path(settings.BASE_DIR) / 'core' / 'benchmarks' / 'view_budgets.json'
+PASSWORD = 'benchmark-pass-123'
+
+# Order in which the views are reported
+VIEWS = [
+    'login_view',
+    'dashboard (student)',
+    'exam_list',
+    'start_exam',
+    'take_exam',
+    'submit_exam',
+    'exam_result',
+    'dashboard (instructor)',
+    'dashboard (admin)',
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the hot views on a seeded test database and check them against recorded budgets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=500, help='Students with exam history to seed')
+        parser.add_argument('--questions', type=int, default=200, help='Questions per course to seed')
+        parser.add_argument('--repeats', type=int, default=20, help='Requests measured per view')
+        parser.add_argument('--budgets', type=str, default=str(DEFAULT_BUDGETS), help='Budget file to check against')
+        parser.add_argument('--record', action='store_true', help='Write the measured values as the new budgets')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=1.0,
+            help='Allowed relative growth of latency and memory over budget (1.0 = twice the budget)'
+        )
+
+    def handle(self, *args, **options):
+        if options['repeats'] < 1 or options['students'] < 1 or options['questions'] < 40:
+            raise CommandError('--repeats and --students must be positive and --questions at least 40')
+
+        # Run against a throwaway test database so real data is never touched
+        old_name = connection.settings_dict['NAME']
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            cache_settings = {'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'benchmark-views',
+            }}
+            with override_settings(CACHES=cache_settings):
+                self.stdout.write('🌱 Seeding benchmark data...')
+                dataset = self.seed(options['students'], options['questions'], options['repeats'])
+                self.stdout.write('⏱️  Measuring views...')
+                samples = self.run_benchmark(dataset)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        results = {
+            view: {
+                'queries': max(sample[0] for sample in samples[view]),
+                'p50_ms': round(percentile([sample[1] for sample in samples[view]], 50), 1),
+                'p95_ms': round(percentile([sample[1] for sample in samples[view]], 95), 1),
+                'peak_kib': round(max(sample[2] for sample in samples[view]) / 1024, 1),
+            }
+            for view in VIEWS
+        }
+        self.report(results)
+
+        budgets_path = Path(options['budgets'])
+        if options['record']:
+            budgets_path.parent.mkdir(parents=True, exist_ok=True)
+            budgets_path.write_text(json.dumps(results, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'✅ Budgets recorded to {budgets_path}'))
+            return
+
+        if not budgets_path.exists():
+            self.stdout.write(self.style.WARNING(f'⚠️ No budgets at {budgets_path}; run with --record first'))
+            return
+
+        failures = self.check_budgets(results, json.loads(budgets_path.read_text()), options['tolerance'])
+        if failures:
+            raise CommandError('Views over budget:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('✅ All views are within their budgets'))
+
+    def seed(self, students, questions_per_course, repeats):
+        rng = random.Random(42)
+        password = make_password(PASSWORD)
+        now = timezone.now()
+
+        admin = User.objects.create(
+            email='admin@bench.local', username='bench-admin', first_name='Bench', last_name='Admin',
+            user_type='admin', is_staff=True, is_email_verified=True, password=password,
+        )
+        instructor = User.objects.create(
+            email='instructor@bench.local', username='bench-instructor', first_name='Bench', last_name='Instructor',
+            user_type='instructor', is_approved=True, is_email_verified=True, password=password,
+        )
+
+        courses = [
+            Course.objects.create(code=code, name=name, description='Benchmark course', instructor=instructor)
+            for code, name in Course.COURSE_CHOICES[:2]
+        ]
+        exams = []
+        for course in courses:
+            subjects = [
+                Subject.objects.create(course=course, name=f'Benchmark subject {number}')
+                for number in range(3)
+            ]
+            questions = Question.objects.bulk_create([
+                Question(
+                    course=course,
+                    subject=subjects[number % len(subjects)],
+                    question_text=f'{course.code} benchmark question {number}',
+                    option_a='Option A', option_b='Option B', option_c='Option C', option_d='Option D',
+                    correct_answer=rng.choice('ABCD'),
+                    difficulty=rng.choice(['easy', 'medium', 'hard']),
+                    marks=rng.choice([1, 2]),
+                    created_by=instructor,
+                )
+                for number in range(questions_per_course)
+            ])
+            for number in range(2):
+                exam = Exam.objects.create(
+                    title=f'{course.name} exam {number + 1}',
+                    course=course,
+                    subject=subjects[0],
+                    duration_minutes=60,
+                    questions_to_display=30,
+                    is_active=True,
+                    created_by=instructor,
+                )
+                pool = rng.sample(questions, 40)
+                ExamQuestion.objects.bulk_create([
+                    ExamQuestion(exam=exam, question=question, order=order)
+                    for order, question in enumerate(pool)
+                ])
+                refresh_total_marks([exam.id])
+                exams.append((exam, pool))
+
+        # Students with a finished attempt on the first exam of their course
+        history = User.objects.bulk_create([
+            User(
+                email=f'student{number}@bench.local', username=f'bench-student-{number}',
+                first_name='Bench', last_name=f'Student {number}',
+                user_type='student', is_email_verified=True, password=password,
+            )
+            for number in range(students)
+        ])
+        CourseEnrollment.objects.bulk_create([
+            CourseEnrollment(student=student, course=courses[number % len(courses)])
+            for number, student in enumerate(history)
+        ])
+        attempts = []
+        answers = []
+        for number, student in enumerate(history):
+            exam, pool = exams[(number % len(courses)) * 2]
+            selected = rng.sample(pool, exam.questions_to_display)
+            start_time = now - timedelta(days=rng.randint(1, 30))
+            attempt = ExamAttempt(
+                student=student, exam=exam, status='completed', aggregated=True,
+                start_time=start_time, end_time=start_time + timedelta(minutes=40),
+                deadline=start_time + timedelta(minutes=exam.duration_minutes),
+                total_questions=len(selected), time_taken_minutes=40,
+                max_score=sum(question.marks for question in selected),
+            )
+            for question in selected:
+                selected_answer = rng.choice('ABCD')
+                is_correct = selected_answer == question.correct_answer
+                attempt.correct_answers += is_correct
+                attempt.score += question.marks if is_correct else 0
+                answers.append(StudentAnswer(
+                    attempt=attempt, question=question,
+                    selected_answer=selected_answer, is_correct=is_correct,
+                ))
+            attempts.append(attempt)
+        ExamAttempt.objects.bulk_create(attempts, batch_size=1000)
+        StudentAnswer.objects.bulk_create(answers, batch_size=1000)
+
+        # Fresh candidates, one per measured exam start
+        candidates = User.objects.bulk_create([
+            User(
+                email=f'candidate{number}@bench.local', username=f'bench-candidate-{number}',
+                first_name='Bench', last_name=f'Candidate {number}',
+                user_type='student', is_email_verified=True, password=password,
+            )
+            for number in range(repeats)
+        ])
+        CourseEnrollment.objects.bulk_create([
+            CourseEnrollment(student=candidate, course=courses[0]) for candidate in candidates
+        ])
+
+        for exam, _ in exams:
+            rebuild_exam_performance(exam)
+        rebuild_question_stats(Question.objects.filter(course__in=courses).values_list('id', flat=True))
+        refresh_all()
+
+        return {
+            'admin': admin,
+            'instructor': instructor,
+            'candidates': candidates,
+            'exam': exams[1][0],
+        }
+
+    def measure(self, samples, view, request, expected_status):
+        """Time one request, recording its queries, latency and peak memory"""
+        tracemalloc.reset_peak()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = request()
+            elapsed = (time.perf_counter() - started) * 1000
+        peak = tracemalloc.get_traced_memory()[1]
+        if response.status_code != expected_status:
+            raise CommandError(f'{view} returned {response.status_code}, expected {expected_status}')
+        samples.setdefault(view, []).append((len(context.captured_queries), elapsed, peak))
+        return response
+
+    def run_benchmark(self, dataset):
+        samples = {}
+        exam = dataset['exam']
+        tracemalloc.start()
+        try:
+            for candidate in dataset['candidates']:
+                client = Client()
+                self.measure(samples, 'login_view', lambda: client.post(
+                    reverse('authentication:login'), {'email': candidate.email, 'password': PASSWORD}
+                ), 302)
+                self.measure(samples, 'dashboard (student)', lambda: client.get(reverse('core:dashboard')), 200)
+                self.measure(samples, 'exam_list', lambda: client.get(reverse('exams:exam_list')), 200)
+                self.measure(samples, 'start_exam', lambda: client.get(
+                    reverse('exams:start_exam', args=[exam.id])
+                ), 302)
+
+                attempt = ExamAttempt.objects.get(student=candidate, exam=exam)
+                response = self.measure(samples, 'take_exam', lambda: client.get(
+                    reverse('exams:take_exam', args=[attempt.id])
+                ), 200)
+                answers = {
+                    str(question['id']): random.choice('ABCD')
+                    for question in response.context['questions']
+                }
+                self.measure(samples, 'submit_exam', lambda: client.post(
+                    reverse('exams:submit_exam', args=[attempt.id]),
+                    json.dumps({'answers': answers}),
+                    content_type='application/json',
+                ), 200)
+                self.measure(samples, 'exam_result', lambda: client.get(
+                    reverse('exams:exam_result', args=[attempt.id])
+                ), 200)
+
+            for role in ('instructor', 'admin'):
+                client = Client()
+                client.force_login(dataset[role])
+                for _ in dataset['candidates']:
+                    self.measure(samples, f'dashboard ({role})', lambda: client.get(reverse('core:dashboard')), 200)
+        finally:
+            tracemalloc.stop()
+        return samples
+
+    def report(self, results):
+        self.stdout.write(self.style.SUCCESS('=== VIEW BENCHMARK ==='))
+        self.stdout.write(f'{"View":<24} {"Queries":>8} {"p50 (ms)":>9} {"p95 (ms)":>9} {"Peak (KiB)":>11}')
+        for view, result in results.items():
+            self.stdout.write(
+                f'{view:<24} {result["queries"]:>8} {result["p50_ms"]:>9.1f} '
+                f'{result["p95_ms"]:>9.1f} {result["peak_kib"]:>11.1f}'
+            )
+        self.stdout.write('Latency is measured with tracemalloc running; compare it only with budgets recorded the same way.')
+
+    def check_budgets(self, results, budgets, tolerance):
+        failures = []
+        for view, result in results.items():
+            budget = budgets.get(view)
+            if budget is None:
+                failures.append(f'{view}: no budget recorded')
+                continue
+            # Query counts are deterministic, so they get no tolerance
+            if result['queries'] > budget['queries']:
+                failures.append(f'{view}: {result["queries"]} queries > budget {budget["queries"]}')
+            if result['p95_ms'] > budget['p95_ms'] * (1 + tolerance):
+                failures.append(f'{view}: p95 {result["p95_ms"]} ms > budget {budget["p95_ms"]} ms')
+            if result['peak_kib'] > budget['peak_kib'] * (1 + tolerance):
+                failures.append(f'{view}: peak {result["peak_kib"]} KiB > budget {budget["peak_kib"]} KiB')
+        return failures
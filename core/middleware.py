@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from .profiling import track_queries
+
+
+class QueryStatsMiddleware:
+    """
+    Add X-DB-Queries and X-DB-Time-Ms headers to every response.
+
+    Only active when QUERY_STATS_HEADERS is set, so load tests such as
+    simulate_exam_day can attribute database work to each endpoint.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_STATS_HEADERS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with track_queries() as stats:
+            response = self.get_response(request)
+        response['X-DB-Queries'] = stats['queries']
+        response['X-DB-Time-Ms'] = f"{stats['time_ms']:.1f}"
+        return response
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('exams', '0006_examattempt_scheduled'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(choices=[('total_courses', 'Total Courses'), ('active_courses', 'Active Courses'), ('total_exams', 'Total Exams'), ('active_exams', 'Active Exams'), ('total_questions', 'Total Questions'), ('total_students', 'Total Students'), ('total_instructors', 'Total Instructors'), ('pending_instructors', 'Pending Instructors'), ('total_attempts', 'Total Attempts')], max_length=50, unique=True)),
+                ('value', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['key'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CourseStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('active_enrollments', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='exams.course')),
+            ],
+        ),
+    ]
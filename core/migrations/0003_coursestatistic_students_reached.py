@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursestatistic',
+            name='students_reached',
+            field=models.IntegerField(default=0, help_text="Distinct students who have taken one of the course's exams"),
+        ),
+    ]
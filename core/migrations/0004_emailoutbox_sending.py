@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_coursestatistic_students_reached'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emailoutbox',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text="When the message is due; while sending, when the worker's lease runs out"),
+        ),
+        migrations.AlterField(
+            model_name='emailoutbox',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('dead', 'Dead')], default='pending', max_length=10),
+        ),
+    ]
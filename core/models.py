@@ -1,3 +1,74 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class PlatformStatistic(models.Model):
+    """Materialized platform-wide counter shown on the admin dashboard"""
+    KEY_CHOICES = [
+        ('total_courses', 'Total Courses'),
+        ('active_courses', 'Active Courses'),
+        ('total_exams', 'Total Exams'),
+        ('active_exams', 'Active Exams'),
+        ('total_questions', 'Total Questions'),
+        ('total_students', 'Total Students'),
+        ('total_instructors', 'Total Instructors'),
+        ('pending_instructors', 'Pending Instructors'),
+        ('total_attempts', 'Total Attempts'),
+    ]
+    
+    key = models.CharField(max_length=50, choices=KEY_CHOICES, unique=True)
+    value = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.get_key_display()}: {self.value}"
+    
+    class Meta:
+        ordering = ['key']
+
+
+class CourseStatistic(models.Model):
+    """Materialized per-course counters shown on the admin dashboard"""
+    course = models.OneToOneField('exams.Course', on_delete=models.CASCADE, related_name='statistics')
+    active_enrollments = models.IntegerField(default=0)
+    students_reached = models.IntegerField(default=0, help_text="Distinct students who have taken one of the course's exams")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.course.name}: {self.active_enrollments} enrollments"
+
+
+class EmailOutbox(models.Model):
+    """Outgoing email queued by requests and delivered in batches by a Celery worker"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),
+    ]
+    MAX_ATTEMPTS = 6
+    
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(help_text="List of recipient addresses")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now, help_text="When the message is due; while sending, when the worker's lease runs out"
+    )
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Outgoing Email"
+        verbose_name_plural = "Email Outbox"
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='core_outbox_status_due'),
+        ]
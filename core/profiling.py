@@ -0,0 +1,31 @@
+"""Helpers shared by the benchmarks and the load test instrumentation."""
+import math
+import time
+from contextlib import contextmanager
+from django.db import connection
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a list of numbers"""
+    values = sorted(values)
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+@contextmanager
+def track_queries():
+    """
+    Count the queries run on the default connection and the time spent in
+    them, without needing DEBUG. Yields a dict with 'queries' and 'time_ms'.
+    """
+    stats = {'queries': 0, 'time_ms': 0.0}
+
+    def wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            stats['queries'] += 1
+            stats['time_ms'] += (time.perf_counter() - started) * 1000
+
+    with connection.execute_wrapper(wrapper):
+        yield stats
@@ -0,0 +1,117 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from authentication.models import CustomUser, CourseEnrollment
+from exams.models import Course, Exam, ExamAttempt, Question
+from .statistics import adjust_counter, refresh_course_statistics
+
+# Counters each row contributes to, by the fields they depend on
+COUNTED = {
+    Course: (('is_active',), lambda course: {
+        'total_courses': 1,
+        'active_courses': int(course['is_active']),
+    }),
+    Exam: (('is_active',), lambda exam: {
+        'total_exams': 1,
+        'active_exams': int(exam['is_active']),
+    }),
+    CustomUser: (('user_type', 'is_approved'), lambda user: {
+        'total_students': int(user['user_type'] == 'student'),
+        'total_instructors': int(user['user_type'] == 'instructor'),
+        'pending_instructors': int(user['user_type'] == 'instructor' and not user['is_approved']),
+    }),
+}
+
+
+def _tracked(sender, update_fields):
+    fields, _ = COUNTED[sender]
+    return not update_fields or bool(set(fields) & set(update_fields))
+
+
+def _contribution(sender, values):
+    _, counters = COUNTED[sender]
+    return counters(values) if values is not None else {}
+
+
+def _snapshot(sender, instance, previous=None, update_fields=None):
+    """Counted field values of instance; fields left out of a partial save keep their previous values"""
+    fields, _ = COUNTED[sender]
+    return {
+        field: previous[field] if previous is not None and update_fields and field not in update_fields
+        else getattr(instance, field)
+        for field in fields
+    }
+
+
+def _adjust(before, after):
+    for key in before.keys() | after.keys():
+        delta = after.get(key, 0) - before.get(key, 0)
+        if delta:
+            adjust_counter(key, delta)
+
+
+@receiver(pre_save, sender=Course)
+@receiver(pre_save, sender=Exam)
+@receiver(pre_save, sender=CustomUser)
+def remember_counted_fields(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login; skip saves that cannot change a counter
+    if not _tracked(sender, update_fields):
+        return
+    previous = None
+    if not instance._state.adding:
+        fields, _ = COUNTED[sender]
+        previous = sender.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._counted_before = previous
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Exam)
+@receiver(post_save, sender=CustomUser)
+def counted_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not _tracked(sender, update_fields):
+        return
+    previous = instance.__dict__.pop('_counted_before', None)
+    _adjust(
+        _contribution(sender, previous),
+        _contribution(sender, _snapshot(sender, instance, previous, update_fields)),
+    )
+    if created and sender is Course:
+        refresh_course_statistics([instance.id])
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Exam)
+@receiver(post_delete, sender=CustomUser)
+def counted_deleted(sender, instance, **kwargs):
+    _adjust(_contribution(sender, _snapshot(sender, instance)), {})
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, created, **kwargs):
+    if created:
+        adjust_counter('total_questions', 1)
+
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, **kwargs):
+    adjust_counter('total_questions', -1)
+
+
+@receiver(post_save, sender=ExamAttempt)
+def attempt_saved(sender, instance, created, **kwargs):
+    if created and instance.status != 'scheduled':
+        adjust_counter('total_attempts', 1)
+
+
+@receiver(post_delete, sender=ExamAttempt)
+def attempt_deleted(sender, instance, **kwargs):
+    if instance.status != 'scheduled':
+        adjust_counter('total_attempts', -1)
+
+
+@receiver([post_save, post_delete], sender=CourseEnrollment)
+def enrollment_changed(sender, instance, **kwargs):
+    # After commit, so a course deleted together with its enrollments is
+    # not given a fresh statistics row
+    course_id = instance.course_id
+    transaction.on_commit(lambda: refresh_course_statistics([course_id]))
@@ -0,0 +1,114 @@
+"""
+Materialized admin dashboard statistics.
+
+Counters are adjusted incrementally by signals as rows are created,
+changed or deleted, and fully recomputed by a periodic Celery task to
+correct any drift (e.g. from bulk operations that bypass signals).
+"""
+from django.db.models import Count, F
+from django.utils import timezone
+from authentication.models import CustomUser, CourseEnrollment
+from exams.models import Course, Exam, ExamAttempt, Question
+from .models import PlatformStatistic, CourseStatistic
+
+COUNTERS = {
+    'total_courses': lambda: Course.objects.count(),
+    'active_courses': lambda: Course.objects.filter(is_active=True).count(),
+    'total_exams': lambda: Exam.objects.count(),
+    'active_exams': lambda: Exam.objects.filter(is_active=True).count(),
+    'total_questions': lambda: Question.objects.count(),
+    'total_students': lambda: CustomUser.objects.filter(user_type='student').count(),
+    'total_instructors': lambda: CustomUser.objects.filter(user_type='instructor').count(),
+    'pending_instructors': lambda: CustomUser.objects.filter(user_type='instructor', is_approved=False).count(),
+    'total_attempts': lambda: ExamAttempt.objects.exclude(status='scheduled').count(),
+}
+
+
+def refresh_counters(keys=None):
+    """Recompute the given platform counters (all by default)"""
+    now = timezone.now()
+    PlatformStatistic.objects.bulk_create(
+        [
+            PlatformStatistic(key=key, value=COUNTERS[key](), updated_at=now)
+            for key in (keys or COUNTERS)
+        ],
+        update_conflicts=True,
+        unique_fields=['key'],
+        update_fields=['value', 'updated_at'],
+    )
+
+
+def adjust_counter(key, delta):
+    """Incrementally add delta to a platform counter"""
+    updated = PlatformStatistic.objects.filter(key=key).update(
+        value=F('value') + delta,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        refresh_counters([key])
+
+
+def refresh_course_statistics(course_ids=None):
+    """Recompute per-course counters for the given courses (all by default), one aggregate each"""
+    courses = Course.objects.all()
+    if course_ids is not None:
+        courses = courses.filter(id__in=course_ids)
+
+    enrollments = CourseEnrollment.objects.filter(is_active=True)
+    if course_ids is not None:
+        enrollments = enrollments.filter(course_id__in=course_ids)
+    counts = dict(
+        enrollments.values('course_id').annotate(total=Count('id')).values_list('course_id', 'total')
+    )
+    attempts = ExamAttempt.objects.exclude(status='scheduled')
+    if course_ids is not None:
+        attempts = attempts.filter(exam__course_id__in=course_ids)
+    reached = dict(
+        attempts.values('exam__course_id').annotate(total=Count('student', distinct=True))
+        .values_list('exam__course_id', 'total')
+    )
+
+    now = timezone.now()
+    CourseStatistic.objects.bulk_create(
+        [
+            CourseStatistic(
+                course_id=course_id,
+                active_enrollments=counts.get(course_id, 0),
+                students_reached=reached.get(course_id, 0),
+                updated_at=now,
+            )
+            for course_id in courses.values_list('id', flat=True)
+        ],
+        update_conflicts=True,
+        unique_fields=['course'],
+        update_fields=['active_enrollments', 'students_reached', 'updated_at'],
+    )
+
+
+def refresh_all():
+    refresh_counters()
+    refresh_course_statistics()
+
+
+def get_dashboard_statistics():
+    """
+    Return ({key: value}, course statistics, last updated) for the admin dashboard.
+
+    The tables are populated on first use after deployment.
+    """
+    rows = list(PlatformStatistic.objects.values_list('key', 'value', 'updated_at'))
+    if len(rows) < len(COUNTERS):
+        refresh_all()
+        rows = list(PlatformStatistic.objects.values_list('key', 'value', 'updated_at'))
+
+    course_stats = list(
+        CourseStatistic.objects.filter(course__is_active=True)
+        .select_related('course__instructor')
+        .order_by('course__name')
+    )
+    counters = {key: value for key, value, _ in rows}
+    last_updated = max(
+        [updated_at for _, _, updated_at in rows] + [stat.updated_at for stat in course_stats],
+        default=None,
+    )
+    return counters, course_stats, last_updated
@@ -0,0 +1,15 @@
+from celery import shared_task
+from .mail import drain_outbox
+from .statistics import refresh_all
+
+
+@shared_task
+def refresh_dashboard_statistics():
+    """Recompute every materialized admin dashboard counter"""
+    refresh_all()
+
+
+@shared_task(soft_time_limit=5 * 60)
+def deliver_outbox(batch_size=100):
+    """Send queued email that is due, retrying failed messages with backoff"""
+    return drain_outbox(batch_size=batch_size)
@@ -0,0 +1,31 @@
+"""
+Test runner that keeps the suite off Redis.
+
+Tests get a local-memory cache and run Celery tasks eagerly, so neither a
+cache server nor a broker has to be up, and cache invalidation is really
+exercised instead of being logged and skipped as a Redis outage.
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+from cbt_system.celery import app as celery_app
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'cbt-tests',
+    }
+}
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_settings = override_settings(CACHES=TEST_CACHES)
+        self.cache_settings.enable()
+        self.celery_settings = (celery_app.conf.task_always_eager, celery_app.conf.task_eager_propagates)
+        celery_app.conf.task_always_eager = celery_app.conf.task_eager_propagates = True
+
+    def teardown_test_environment(self, **kwargs):
+        celery_app.conf.task_always_eager, celery_app.conf.task_eager_propagates = self.celery_settings
+        self.cache_settings.disable()
+        super().teardown_test_environment(**kwargs)
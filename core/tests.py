@@ -1,3 +1,265 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from unittest import mock
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from redis.exceptions import RedisError
+from authentication.models import CustomUser, CourseEnrollment
+from core.management.commands.benchmark_views import DEFAULT_BUDGETS, PASSWORD, Command as BenchmarkViews
+from exams import answer_key
+from exams.models import Course, Exam, ExamAttempt, Subject
+from .cache import BUMP_ATTEMPTS, bump_version, get_or_set
+from .mail import LEASE, claim_messages, drain_outbox, enqueue_email, send_outbox_batch
+from .models import CourseStatistic, EmailOutbox, PlatformStatistic
+from .statistics import COUNTERS, refresh_all
 
-# Create your tests here.
+
+class FailingConnection:
+    """Mail connection that rejects every message"""
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        raise ConnectionError('mail server said no')
+
+
+class OutboxTests(TestCase):
+    def test_delivery(self):
+        for number in range(5):
+            enqueue_email(f'Subject {number}', 'Body', [f'user{number}@test.local'], html_body='<p>Body</p>')
+        self.assertEqual(mail.outbox, [])
+
+        self.assertEqual(drain_outbox(batch_size=2), (5, 0))
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertEqual(EmailOutbox.objects.filter(status='sent', attempts=1, sent_at__isnull=False).count(), 5)
+        self.assertEqual(drain_outbox(), (0, 0))
+
+    def test_failures_back_off_then_give_up(self):
+        message = enqueue_email('Subject', 'Body', ['user@test.local'])
+        with mock.patch('core.mail.get_connection', return_value=FailingConnection()):
+            self.assertEqual(send_outbox_batch(), (0, 1))
+            message.refresh_from_db()
+            self.assertEqual((message.status, message.attempts, message.last_error), ('pending', 1, 'mail server said no'))
+            self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=50))
+            # Not due yet
+            self.assertEqual(send_outbox_batch(), (0, 0))
+
+            for attempts in range(2, EmailOutbox.MAX_ATTEMPTS + 1):
+                EmailOutbox.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+                self.assertEqual(send_outbox_batch(), (0, 1))
+            message.refresh_from_db()
+            self.assertEqual((message.status, message.attempts), ('dead', EmailOutbox.MAX_ATTEMPTS))
+        self.assertEqual(drain_outbox(), (0, 0))
+
+    def test_claimed_messages_are_leased(self):
+        messages = [enqueue_email(f'Subject {number}', 'Body', ['user@test.local']) for number in range(3)]
+        now = timezone.now()
+        claimed = claim_messages(2, now)
+        self.assertEqual([message.id for message in claimed], [message.id for message in messages[:2]])
+        self.assertEqual(EmailOutbox.objects.filter(status='sending', next_attempt_at=now + LEASE).count(), 2)
+        # Another worker only gets what is left
+        self.assertEqual([message.id for message in claim_messages(10, now)], [messages[2].id])
+        self.assertEqual(claim_messages(10, now), [])
+
+        # The first worker died; its lease runs out and the messages are due again
+        later = now + LEASE
+        self.assertEqual(len(claim_messages(10, later)), 3)
+        EmailOutbox.objects.filter(pk=messages[0].pk).update(attempts=EmailOutbox.MAX_ATTEMPTS)
+        self.assertEqual(len(claim_messages(10, later + LEASE)), 2)
+        messages[0].refresh_from_db()
+        self.assertEqual(messages[0].status, 'dead')
+
+    def test_admin_retry_ignores_messages_being_sent(self):
+        admin = CustomUser.objects.create_superuser(email='admin@test.local', username='admin', password='pw')
+        pending, sending = enqueue_email('Pending', 'Body', ['a@test.local']), enqueue_email('Sending', 'Body', ['b@test.local'])
+        later = timezone.now() + timedelta(hours=1)
+        EmailOutbox.objects.update(next_attempt_at=later)
+        EmailOutbox.objects.filter(pk=sending.pk).update(status='sending')
+        self.client.force_login(admin)
+        self.client.post('/admin/core/emailoutbox/', {'action': 'retry_now', '_selected_action': [pending.pk, sending.pk]})
+        pending.refresh_from_db()
+        sending.refresh_from_db()
+        self.assertLess(pending.next_attempt_at, later)
+        self.assertEqual((sending.status, sending.next_attempt_at), ('sending', later))
+
+
+class StatisticsTests(TestCase):
+    def assertCountersAreLive(self):
+        self.assertEqual(
+            dict(PlatformStatistic.objects.values_list('key', 'value')),
+            {key: count() for key, count in COUNTERS.items()},
+        )
+
+    def test_signals_keep_counters_in_step(self):
+        refresh_all()
+        instructor = CustomUser.objects.create_user(
+            email='instructor@test.local', username='instructor', password='pw', user_type='instructor',
+        )
+        student = CustomUser.objects.create_user(email='student@test.local', username='student', password='pw')
+        course = Course.objects.create(code='fullstack', name='Fullstack', description='Course', instructor=instructor)
+        subject = Subject.objects.create(course=course, name='Basics')
+        exam = Exam.objects.create(title='Midterm', course=course, subject=subject, duration_minutes=30, created_by=instructor)
+        self.assertCountersAreLive()
+
+        instructor.is_approved = True
+        instructor.save()
+        student.user_type = 'instructor'
+        student.save()
+        course.is_active = False
+        course.save()
+        exam.is_active = True
+        exam.save()
+        self.assertCountersAreLive()
+
+        # Saves that cannot change a counted field do not query for the old values
+        with CaptureQueriesContext(connection) as context:
+            course.save(update_fields=['description'])
+        self.assertFalse([query for query in context if 'FROM "exams_course"' in query['sql']])
+
+        ExamAttempt.objects.create(student=student, exam=exam, status='scheduled')
+        self.assertCountersAreLive()
+        course.delete()
+        student.delete()
+        self.assertCountersAreLive()
+
+    def test_course_statistics(self):
+        instructor = CustomUser.objects.create_user(
+            email='instructor@test.local', username='instructor', password='pw', user_type='instructor',
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            course = Course.objects.create(code='fullstack', name='Fullstack', description='Course', instructor=instructor)
+        statistic = CourseStatistic.objects.get(course=course)
+        self.assertEqual((statistic.active_enrollments, statistic.students_reached), (0, 0))
+
+        subject = Subject.objects.create(course=course, name='Basics')
+        exam = Exam.objects.create(title='Midterm', course=course, subject=subject, duration_minutes=30, created_by=instructor)
+        for number in range(3):
+            student = CustomUser.objects.create_user(email=f's{number}@test.local', username=f's{number}', password='pw')
+            with self.captureOnCommitCallbacks(execute=True):
+                CourseEnrollment.objects.create(student=student, course=course)
+            ExamAttempt.objects.create(
+                student=student, exam=exam, status='scheduled' if number else 'completed', deadline=timezone.now(),
+            )
+        statistic.refresh_from_db()
+        self.assertEqual(statistic.active_enrollments, 3)
+        refresh_all()
+        statistic.refresh_from_db()
+        self.assertEqual(statistic.students_reached, 1)
+
+
+class CacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_versions(self):
+        loader = mock.Mock(side_effect=[1, 2])
+        self.assertEqual(get_or_set('courses', ['list'], loader), 1)
+        self.assertEqual(get_or_set('courses', ['list'], loader), 1)
+        bump_version('courses')
+        self.assertEqual(get_or_set('courses', ['list'], loader), 2)
+
+        # Bumping a namespace the value depends on retires it too
+        self.assertEqual(get_or_set('exam:1', ['key'], lambda: 'old', versions=['courses']), 'old')
+        bump_version('courses')
+        self.assertEqual(get_or_set('exam:1', ['key'], lambda: 'new', versions=['courses']), 'new')
+
+    def test_outage_falls_back_to_the_database(self):
+        with mock.patch('core.cache.cache.get', side_effect=RedisError('down')):
+            self.assertEqual(get_or_set('courses', ['list'], lambda: 'loaded'), 'loaded')
+        with mock.patch('core.cache.cache.set', side_effect=RedisError('down')):
+            self.assertEqual(get_or_set('courses', ['list'], lambda: 'loaded'), 'loaded')
+
+    def test_failed_bumps_are_retried_then_raised(self):
+        self.assertEqual(get_or_set('courses', ['list'], lambda: 'old'), 'old')
+        outcomes = iter([RedisError('down')])
+        real_incr = cache.incr
+
+        def incr(key):
+            # Down for the first try only
+            for error in outcomes:
+                raise error
+            return real_incr(key)
+
+        with mock.patch('core.cache.time.sleep') as sleep:
+            with mock.patch('core.cache.cache.incr', side_effect=incr) as failing:
+                bump_version('courses')
+            self.assertEqual((failing.call_count, sleep.call_count), (2, 1))
+            self.assertEqual(get_or_set('courses', ['list'], lambda: 'new'), 'new')
+
+            with mock.patch('core.cache.cache.incr', side_effect=RedisError('down')) as failing, \
+                    self.assertRaises(RedisError):
+                bump_version('courses')
+            self.assertEqual(failing.call_count, BUMP_ATTEMPTS)
+
+
+# Queries per request on the benchmark_views dataset, cold cache; the
+# recorded budgets in core/benchmarks/view_budgets.json must cover them
+VIEW_QUERIES = {
+    'login_view': 9,
+    'dashboard (student)': 7,
+    'exam_list': 2,
+    'start_exam': 12,
+    'take_exam': 4,
+    'submit_exam': 12,
+    'exam_result': 5,
+    'dashboard (instructor)': 7,
+    'dashboard (admin)': 5,
+}
+
+
+class ViewQueryTests(TransactionTestCase):
+    """
+    The benchmark_views request flow with exact query counts. A
+    TransactionTestCase, so transactions in the views are real rather than
+    savepoints and the counts match what the benchmark measures.
+    """
+
+    def setUp(self):
+        cache.clear()
+        answer_key._local.clear()
+        self.dataset = BenchmarkViews().seed(students=30, questions_per_course=40, repeats=1)
+
+    def request(self, view, send, status):
+        with self.assertNumQueries(VIEW_QUERIES[view]):
+            response = send()
+        self.assertEqual(response.status_code, status, view)
+        return response
+
+    def test_budgets_cover_the_counts(self):
+        budgets = json.loads(DEFAULT_BUDGETS.read_text())
+        self.assertEqual(budgets.keys(), VIEW_QUERIES.keys())
+        for view, queries in VIEW_QUERIES.items():
+            self.assertLessEqual(queries, budgets[view]['queries'], view)
+
+    def test_hot_views(self):
+        exam = self.dataset['exam']
+        candidate = self.dataset['candidates'][0]
+        self.request('login_view', lambda: self.client.post(
+            reverse('authentication:login'), {'email': candidate.email, 'password': PASSWORD}
+        ), 302)
+        self.request('dashboard (student)', lambda: self.client.get(reverse('core:dashboard')), 200)
+        self.request('exam_list', lambda: self.client.get(reverse('exams:exam_list')), 200)
+        self.request('start_exam', lambda: self.client.get(reverse('exams:start_exam', args=[exam.id])), 302)
+
+        attempt = ExamAttempt.objects.get(student=candidate, exam=exam)
+        response = self.request('take_exam', lambda: self.client.get(reverse('exams:take_exam', args=[attempt.id])), 200)
+        answers = {str(question['id']): 'A' for question in response.context['questions']}
+        self.request('submit_exam', lambda: self.client.post(
+            reverse('exams:submit_exam', args=[attempt.id]), json.dumps({'answers': answers}),
+            content_type='application/json',
+        ), 200)
+        self.request('exam_result', lambda: self.client.get(reverse('exams:exam_result', args=[attempt.id])), 200)
+
+        for role in ('instructor', 'admin'):
+            self.client.force_login(self.dataset[role])
+            self.request(f'dashboard ({role})', lambda: self.client.get(reverse('core:dashboard')), 200)
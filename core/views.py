@@ -1,7 +1,11 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Q
-from exams.models import Exam, ExamAttempt, Question, Course
+from django.db.models import Count, Sum
+from exams.models import Exam, ExamAttempt, Question
+from exams.availability import get_student_overview
+from exams.cache import get_active_courses
+from .models import CourseStatistic
+from .statistics import get_dashboard_statistics
 from authentication.models import CustomUser
 
 def custom_404(request, exception):
@@ -18,10 +22,10 @@ def home(request):
         return redirect('core:dashboard')
     
     # Show N-TECH course information
-    courses = Course.objects.filter(is_active=True).order_by('name')
+    courses = get_active_courses()
     context = {
         'courses': courses,
-        'total_courses': courses.count(),
+        'total_courses': len(courses),
     }
     return render(request, 'core/home.html', context)
 
@@ -31,30 +35,17 @@ def dashboard(request):
     
     if request.user.is_student:
         # Student dashboard - show only exams for their enrolled courses
-        enrolled_courses = request.user.get_enrolled_courses()
-        available_exams = Exam.objects.filter(
-            is_active=True,
-            course__in=enrolled_courses
-        ).exclude(
-            examattempt__student=request.user
-        )
-        completed_attempts = ExamAttempt.objects.filter(
-            student=request.user, 
-            status='completed'
-        ).order_by('-start_time')
+        overview = get_student_overview(request.user)
+        completed_attempts = overview['completed_attempts']
         
-        # Calculate latest score percentage safely
+        # Latest released score, out of the marks on that attempt's paper
         latest_score_percentage = 0
-        if completed_attempts.exists():
-            latest_attempt = completed_attempts.first()
-            if latest_attempt.exam.total_marks > 0:
-                latest_score_percentage = round((latest_attempt.score / latest_attempt.exam.total_marks) * 100, 1)
+        if completed_attempts and completed_attempts[0]['exam']['results_available']:
+            latest_score_percentage = round(completed_attempts[0]['percentage'], 1)
         
+        context.update(overview)
         context.update({
-            'enrolled_courses': enrolled_courses,
-            'available_exams': available_exams,
-            'completed_attempts': completed_attempts,
-            'total_completed': completed_attempts.count(),
+            'total_completed': len(completed_attempts),
             'latest_score_percentage': latest_score_percentage,
         })
         
@@ -66,23 +57,31 @@ def dashboard(request):
         instructor_questions = Question.objects.filter(
             created_by=request.user,
             course__in=assigned_courses
-        )
-        instructor_exams = Exam.objects.filter(
+        ).select_related('subject')
+        instructor_exams = list(Exam.objects.filter(
             created_by=request.user,
             course__in=assigned_courses
-        )
+        ).select_related('subject', 'performance').annotate(
+            question_count=Count('examquestion')
+        ))
         
         # Students who took instructor's exams
         student_attempts = ExamAttempt.objects.filter(
             exam__created_by=request.user,
             exam__course__in=assigned_courses
-        ).select_related('student', 'exam').order_by('-start_time')
+        ).exclude(status='scheduled').select_related('student', 'exam').order_by('-start_time')
         
-        # Statistics for instructor
+        # Statistics for instructor, totals come from the per-exam and per-course aggregates
         total_questions_created = instructor_questions.count()
-        total_exams_created = instructor_exams.count()
-        total_student_attempts = student_attempts.count()
-        unique_students = student_attempts.values('student').distinct().count()
+        total_exams_created = len(instructor_exams)
+        total_student_attempts = sum(
+            exam.performance.attempt_count
+            for exam in instructor_exams
+            if hasattr(exam, 'performance')
+        )
+        unique_students = CourseStatistic.objects.filter(course__in=assigned_courses).aggregate(
+            total=Sum('students_reached')
+        )['total'] or 0
         
         context.update({
             'assigned_courses': assigned_courses,
@@ -98,19 +97,11 @@ def dashboard(request):
         return render(request, 'core/instructor_dashboard.html', context)
     
     elif request.user.is_admin or request.user.is_superuser:
-        # Super Admin dashboard - shows everything
-        total_courses = Course.objects.count()
-        active_courses = Course.objects.filter(is_active=True).count()
-        total_exams = Exam.objects.count()
-        active_exams = Exam.objects.filter(is_active=True).count()
-        total_questions = Question.objects.count()
-        total_students = CustomUser.objects.filter(user_type='student').count()
-        total_instructors = CustomUser.objects.filter(user_type='instructor').count()
-        pending_instructors = CustomUser.objects.filter(user_type='instructor', is_approved=False).count()
-        total_attempts = ExamAttempt.objects.count()
+        # Super Admin dashboard - counters are materialized by core.statistics
+        counters, course_statistics, statistics_updated_at = get_dashboard_statistics()
         
-        recent_attempts = ExamAttempt.objects.select_related(
-            'student', 'exam'
+        recent_attempts = ExamAttempt.objects.exclude(status='scheduled').select_related(
+            'student', 'exam__subject'
         ).order_by('-start_time')[:15]
         
         recent_instructor_registrations = CustomUser.objects.filter(
@@ -118,28 +109,20 @@ def dashboard(request):
         ).order_by('-date_joined')[:5]
         
         # Course enrollment statistics
-        from authentication.models import CourseEnrollment
-        course_stats = []
-        for course in Course.objects.filter(is_active=True):
-            enrollment_count = CourseEnrollment.objects.filter(course=course, is_active=True).count()
-            course_stats.append({
-                'course': course,
-                'enrollments': enrollment_count
-            })
+        course_stats = [
+            {
+                'course': statistic.course,
+                'enrollments': statistic.active_enrollments
+            }
+            for statistic in course_statistics
+        ]
         
+        context.update(counters)
         context.update({
-            'total_courses': total_courses,
-            'active_courses': active_courses,
-            'total_exams': total_exams,
-            'active_exams': active_exams,
-            'total_questions': total_questions,
-            'total_students': total_students,
-            'total_instructors': total_instructors,
-            'pending_instructors': pending_instructors,
-            'total_attempts': total_attempts,
             'recent_attempts': recent_attempts,
             'recent_instructor_registrations': recent_instructor_registrations,
             'course_stats': course_stats,
+            'statistics_updated_at': statistics_updated_at,
         })
         
         return render(request, 'core/admin_dashboard.html', context)
@@ -1,6 +1,12 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ORDER_VAR
 from django.db.models import Count
-from .models import Subject, Question, Exam, ExamQuestion, ExamAttempt, StudentAnswer
+from kombu.exceptions import OperationalError
+from . import duplicates, regrade, search, tasks
+from .models import (
+    Subject, Question, Exam, ExamQuestion, ExamAttempt, StudentAnswer, DuplicateCluster, DuplicateClusterMember,
+    ExamAnalysisReport,
+)
 
 @admin.register(Subject)
 class SubjectAdmin(admin.ModelAdmin):
@@ -13,15 +19,46 @@ class SubjectAdmin(admin.ModelAdmin):
 
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
-    list_display = ('question_text_short', 'subject', 'difficulty', 'marks', 'correct_answer', 'created_by', 'created_at')
+    list_display = ('question_text_short', 'subject', 'difficulty', 'marks', 'correct_answer', 'served', 'facility', 'discrimination', 'created_by', 'created_at')
     list_filter = ('subject', 'difficulty', 'marks', 'created_at')
-    search_fields = ('question_text', 'subject__name')
+    list_select_related = ('subject__course', 'created_by', 'stats')
+    search_fields = ('question_text', 'option_a', 'option_b', 'option_c', 'option_d', 'explanation')
+    search_help_text = 'Searches question text, options and explanation by whole words; the last word may be a prefix.'
     list_editable = ('difficulty', 'marks')
+    actions = ['regrade_answers']
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Served by the full-text index instead of LIKE scans over search_fields.
+        # The changelist sorts before searching, so the matches come best
+        # first unless a column was sorted explicitly
+        results = search.search_questions(queryset, search_term)
+        if ORDER_VAR in request.GET:
+            results = results.order_by(*queryset.query.order_by)
+        return results, False
     
     def question_text_short(self, obj):
         return obj.question_text[:50] + "..." if len(obj.question_text) > 50 else obj.question_text
     question_text_short.short_description = 'Question'
     
+    # Item statistics; questions never served have no stats row yet
+    def served(self, obj):
+        stats = getattr(obj, 'stats', None)
+        return stats.served_count if stats else 0
+    
+    def facility(self, obj):
+        stats = getattr(obj, 'stats', None)
+        return stats.facility if stats and stats.facility is not None else '-'
+    facility.short_description = 'Facility (p)'
+    
+    def discrimination(self, obj):
+        stats = getattr(obj, 'stats', None)
+        return stats.discrimination if stats and stats.discrimination is not None else '-'
+    
+    def regrade_answers(self, request, queryset):
+        answers, attempts, exams = regrade.regrade_questions(queryset.values_list('id', flat=True))
+        self.message_user(request, f'{answers} answer(s) corrected; {attempts} attempt(s) in {exams} exam(s) re-scored.')
+    regrade_answers.short_description = "Re-grade stored answers to selected questions"
+    
     def save_model(self, request, obj, form, change):
         if not change:  # If creating new object
             obj.created_by = request.user
@@ -39,6 +76,7 @@ class ExamAdmin(admin.ModelAdmin):
     search_fields = ('title', 'description')
     list_editable = ('is_active',)
     inlines = [ExamQuestionInline]
+    actions = ['release_results', 'regrade_answers', 'analyze_results', 'detect_collusion']
     
     def question_count(self, obj):
         return obj.questions.count()
@@ -48,6 +86,38 @@ class ExamAdmin(admin.ModelAdmin):
         return obj.examattempt_set.count()
     attempt_count.short_description = 'Attempts'
     
+    def _dispatch(self, request, task, queryset, done):
+        """Queue task for each selected exam instead of running it inside the request"""
+        exam_ids = list(queryset.values_list('id', flat=True))
+        try:
+            for exam_id in exam_ids:
+                task.delay(exam_id)
+        except OperationalError as e:
+            self.message_user(request, f'Could not queue the job: the task broker is unreachable ({e})', messages.ERROR)
+        else:
+            self.message_user(request, f'{done} queued for {len(exam_ids)} exam(s).')
+    
+    def release_results(self, request, queryset):
+        # The worker marks the exams released, queues the emails and starts delivering them
+        self._dispatch(request, tasks.release_exam_results, queryset, 'Results release')
+    release_results.short_description = "Release results and email students"
+    
+    def regrade_answers(self, request, queryset):
+        totals = [regrade.regrade_exam(exam) for exam in queryset]
+        self.message_user(
+            request,
+            f'{sum(t[0] for t in totals)} answer(s) corrected; {sum(t[1] for t in totals)} attempt(s) re-scored.'
+        )
+    regrade_answers.short_description = "Re-grade all answers of selected exams"
+    
+    def analyze_results(self, request, queryset):
+        self._dispatch(request, tasks.analyze_exam_results, queryset, 'Psychometric analysis')
+    analyze_results.short_description = "Analyse results (reliability, item and distractor statistics)"
+    
+    def detect_collusion(self, request, queryset):
+        self._dispatch(request, tasks.detect_exam_collusion, queryset, 'Collusion check')
+    detect_collusion.short_description = "Check for suspiciously similar answer sheets"
+    
     def save_model(self, request, obj, form, change):
         if not change:  # If creating new object
             obj.created_by = request.user
@@ -55,10 +125,15 @@ class ExamAdmin(admin.ModelAdmin):
 
 @admin.register(ExamAttempt)
 class ExamAttemptAdmin(admin.ModelAdmin):
-    list_display = ('student', 'exam', 'status', 'score', 'correct_answers', 'total_questions', 'time_taken_minutes', 'start_time')
-    list_filter = ('status', 'exam', 'start_time')
+    list_display = ('student', 'exam', 'status', 'score', 'correct_answers', 'total_questions', 'time_taken_minutes', 'start_time', 'result_email_status')
+    list_filter = ('status', 'exam', 'start_time', 'result_email__status')
     search_fields = ('student__email', 'student__first_name', 'student__last_name', 'exam__title')
-    readonly_fields = ('id', 'start_time', 'time_taken_minutes')
+    readonly_fields = ('id', 'start_time', 'time_taken_minutes', 'result_email')
+    list_select_related = ('student', 'exam', 'result_email')
+    
+    def result_email_status(self, obj):
+        return obj.result_email.get_status_display() if obj.result_email else '-'
+    result_email_status.short_description = 'Result email'
     
     def has_add_permission(self, request):
         return False  # Prevent manual creation of attempts
@@ -76,3 +151,68 @@ class StudentAnswerAdmin(admin.ModelAdmin):
     
     def has_add_permission(self, request):
         return False  # Prevent manual creation of answers
+
+class DuplicateClusterMemberInline(admin.TabularInline):
+    model = DuplicateClusterMember
+    extra = 0
+    can_delete = False
+    fields = ('question', 'question_text', 'course', 'subject', 'similarity')
+    readonly_fields = fields
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('question__course', 'question__subject')
+    
+    def question_text(self, obj):
+        return obj.question.question_text
+    
+    def course(self, obj):
+        return obj.question.course
+    
+    def subject(self, obj):
+        return obj.question.subject.name
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+@admin.register(DuplicateCluster)
+class DuplicateClusterAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'size', 'similarity', 'status', 'first_question', 'detected_at', 'resolved_at')
+    list_filter = ('status', 'detected_at')
+    readonly_fields = ('status', 'size', 'similarity', 'canonical', 'detected_at', 'resolved_at')
+    inlines = [DuplicateClusterMemberInline]
+    actions = ['merge_clusters', 'dismiss_clusters']
+    
+    def first_question(self, obj):
+        member = obj.members.select_related('question').first()
+        return member.question.question_text[:80] if member else '-'
+    first_question.short_description = 'Question'
+    
+    def merge_clusters(self, request, queryset):
+        totals = [duplicates.merge_cluster(cluster) for cluster in queryset.filter(status='open')]
+        self.message_user(
+            request,
+            f'{len(totals)} cluster(s) merged into their first question: {sum(t[0] for t in totals)} exam(s) updated, '
+            f'{sum(t[1] for t in totals)} unused duplicate(s) deleted.'
+        )
+    merge_clusters.short_description = "Merge selected open clusters into their first question"
+    
+    def dismiss_clusters(self, request, queryset):
+        clusters = list(queryset.filter(status='open'))
+        for cluster in clusters:
+            duplicates.dismiss_cluster(cluster)
+        self.message_user(request, f'{len(clusters)} cluster(s) dismissed; they will not be reported again.')
+    dismiss_clusters.short_description = "Dismiss selected open clusters"
+    
+    def has_add_permission(self, request):
+        return False  # Clusters come from find_duplicate_questions
+
+@admin.register(ExamAnalysisReport)
+class ExamAnalysisReportAdmin(admin.ModelAdmin):
+    list_display = ('exam', 'kind', 'attempt_count', 'duration_ms', 'generated_at')
+    list_filter = ('kind', 'generated_at')
+    search_fields = ('exam__title',)
+    readonly_fields = ('exam', 'kind', 'attempt_count', 'report', 'duration_ms', 'generated_at')
+    list_select_related = ('exam',)
+    
+    def has_add_permission(self, request):
+        return False  # Reports come from the analysis commands, tasks and exam actions
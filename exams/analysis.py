@@ -0,0 +1,254 @@
+"""
+Psychometric analysis of an exam's finished attempts.
+
+Answers are streamed from the database into dense NumPy matrices (one row
+per attempt, one column per question): the chosen option (0 for no
+answer, 1-4 for A-D, int8) and whether the question was on the
+attempt's paper. Row and column positions are found with searchsorted
+on each fetched chunk, so no Python work is done per answer beyond
+reading it. Everything else is vectorized over the matrices:
+
+- KR-20 reliability and the standard error of measurement;
+- per question: facility, corrected point-biserial correlation (with the
+  rest score, i.e. the total without that question) and flags;
+- distractor analysis: share, mean rest score and point-biserial of each
+  option, and omissions;
+- the distribution of attempt percentages.
+
+Exams that draw a subset of their pool give each attempt different
+questions; statistics are then computed over the attempts that were
+served each question, and KR-20 uses the mean paper length.
+"""
+import time
+from itertools import islice
+import numpy as np
+from django.utils import timezone
+from .answer_key import answer_key_for
+from .models import ExamAnalysisReport, ExamAttempt, ExamQuestion, StudentAnswer
+from .performance import FINISHED_STATUSES
+from .selection import SelectedQuestion
+
+OPTIONS = 'ABCD'
+HISTOGRAM_BINS = 10
+
+# Item flags (classical test theory rules of thumb)
+EASY_FACILITY = 0.9
+HARD_FACILITY = 0.2
+LOW_DISCRIMINATION = 0.2
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _positions(values, index):
+    """Positions of values in the sorted index array, -1 where absent"""
+    positions = np.searchsorted(index, values)
+    positions[positions >= len(index)] = 0
+    return np.where(index[positions] == values, positions, -1)
+
+
+class ResponseMatrix:
+    """Dense answers of an exam's finished attempts"""
+
+    def __init__(self, exam, chunk_size=20000):
+        attempts = list(
+            ExamAttempt.objects.filter(exam=exam, status__in=FINISHED_STATUSES)
+            .order_by('student_id')
+            .values_list('student_id', 'score', 'max_score')
+        )
+        # A student has at most one attempt per exam, so the student id identifies a row
+        self.student_ids = np.array([row[0] for row in attempts], dtype=np.int64)
+        scores = np.array([row[1] for row in attempts], dtype=np.float64)
+        max_scores = np.array([row[2] for row in attempts], dtype=np.float64)
+        self.percentages = np.divide(scores * 100, max_scores, out=np.zeros_like(scores), where=max_scores > 0)
+
+        question_ids = set(ExamQuestion.objects.filter(exam=exam).values_list('question_id', flat=True))
+        finished = {'examattempt__exam': exam, 'examattempt__status__in': FINISHED_STATUSES}
+        # Questions dropped from the pool after being served still have answers
+        question_ids.update(
+            SelectedQuestion.objects.filter(**finished).exclude(question_id__in=question_ids)
+            .values_list('question_id', flat=True).distinct()
+        )
+        self.question_ids = np.array(sorted(question_ids), dtype=np.int64)
+
+        shape = (len(self.student_ids), len(self.question_ids))
+        self.choices = np.zeros(shape, dtype=np.int8)
+        self.served = np.zeros(shape, dtype=bool)
+
+        selections = SelectedQuestion.objects.filter(**finished)
+        if selections.count() == self.served.size:
+            # Every attempt was served every question (no extras were found
+            # above, and selections are unique per attempt)
+            self.served[:] = True
+        else:
+            served = selections.values_list('examattempt__student_id', 'question_id')
+            for chunk in _chunks(served.iterator(chunk_size=chunk_size), chunk_size):
+                rows, columns = self._locate(chunk)
+                self.served[rows, columns] = True
+
+        answers = StudentAnswer.objects.filter(
+            attempt__exam=exam, attempt__status__in=FINISHED_STATUSES
+        ).values_list('attempt__student_id', 'question_id', 'selected_answer')
+        for chunk in _chunks(answers.iterator(chunk_size=chunk_size), chunk_size):
+            rows, columns = self._locate(chunk)
+            codes = np.frombuffer(''.join(row[2] for row in chunk).encode('ascii'), dtype=np.uint8)
+            valid = columns >= 0
+            self.choices[rows[valid], columns[valid]] = (codes[valid] - ord('A') + 1).astype(np.int8)
+            # An answer proves the question was on the paper
+            self.served[rows[valid], columns[valid]] = True
+
+        key = answer_key_for(exam.id, self.question_ids.tolist())
+        self.key = np.array(
+            [OPTIONS.index(key[question_id][0]) + 1 for question_id in self.question_ids.tolist()], dtype=np.int8
+        )
+        self.correct = (self.choices == self.key) & self.served
+
+    def _locate(self, chunk):
+        """Matrix rows and columns of (student id, question id, ...) rows; -1 columns for unknown rows"""
+        students = np.fromiter((row[0] for row in chunk), dtype=np.int64, count=len(chunk))
+        questions = np.fromiter((row[1] for row in chunk), dtype=np.int64, count=len(chunk))
+        rows = _positions(students, self.student_ids)
+        columns = _positions(questions, self.question_ids)
+        columns[rows < 0] = -1
+        return rows, columns
+
+
+def _masked_correlation(x, y, mask):
+    """Column-wise Pearson correlation of x and y (n x k) over the rows where mask is set"""
+    weights = mask.astype(np.float64)
+    counts = weights.sum(axis=0)
+    safe_counts = np.where(counts > 0, counts, 1)
+    x_mean = (x * weights).sum(axis=0) / safe_counts
+    y_mean = (y * weights).sum(axis=0) / safe_counts
+    x_dev = (x - x_mean) * weights
+    y_dev = (y - y_mean) * weights
+    covariance = (x_dev * y_dev).sum(axis=0)
+    spread = np.sqrt((x_dev ** 2).sum(axis=0) * (y_dev ** 2).sum(axis=0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(spread > 0, covariance / spread, np.nan)
+
+
+def _number(value, digits=3):
+    """JSON-friendly rounded float, None for NaN"""
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+
+def analyze_responses(matrix):
+    """Report dict computed from a ResponseMatrix"""
+    attempts, items = matrix.choices.shape
+    served = matrix.served
+    correct = matrix.correct.astype(np.float64)
+    totals = correct.sum(axis=1)
+    rest = totals[:, None] - correct
+
+    served_counts = served.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        facility = np.where(served_counts > 0, correct.sum(axis=0) / served_counts, np.nan)
+    point_biserial = _masked_correlation(correct, rest, served)
+
+    # KR-20 over the mean paper length: k/(k-1) * (1 - k * mean(pq) / var(total))
+    paper_length = served.sum(axis=1).mean() if attempts else 0
+    item_variance = facility * (1 - facility)
+    total_variance = totals.var() if attempts else 0
+    kr20 = np.nan
+    if paper_length > 1 and total_variance > 0 and not np.all(np.isnan(item_variance)):
+        kr20 = paper_length / (paper_length - 1) * (1 - paper_length * np.nanmean(item_variance) / total_variance)
+    sem = np.sqrt(total_variance * (1 - kr20)) if not np.isnan(kr20) and kr20 < 1 else np.nan
+
+    option_stats = {}
+    for code, option in enumerate(OPTIONS, start=1):
+        chosen = matrix.choices == code
+        counts = chosen.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_rest = np.where(counts > 0, (rest * chosen).sum(axis=0) / np.where(counts > 0, counts, 1), np.nan)
+        option_stats[option] = (counts, mean_rest, _masked_correlation(chosen.astype(np.float64), rest, served))
+    omitted = (served & (matrix.choices == 0)).sum(axis=0)
+
+    question_rows = []
+    for column, question_id in enumerate(matrix.question_ids.tolist()):
+        key = OPTIONS[matrix.key[column] - 1]
+        options = {}
+        for option, (counts, mean_rest, correlation) in option_stats.items():
+            options[option] = {
+                'count': int(counts[column]),
+                'share': _number(counts[column] / served_counts[column]) if served_counts[column] else None,
+                'mean_rest_score': _number(mean_rest[column], 2),
+                'point_biserial': _number(correlation[column]),
+            }
+        flags = []
+        if not np.isnan(facility[column]):
+            if facility[column] > EASY_FACILITY:
+                flags.append('too_easy')
+            elif facility[column] < HARD_FACILITY:
+                flags.append('too_hard')
+        if not np.isnan(point_biserial[column]) and point_biserial[column] < LOW_DISCRIMINATION:
+            flags.append('low_discrimination')
+        if any(
+            stats['point_biserial'] is not None and stats['point_biserial'] > 0
+            for option, stats in options.items() if option != key
+        ):
+            flags.append('distractor_attracts_strong_candidates')
+        question_rows.append({
+            'question_id': question_id,
+            'correct_answer': key,
+            'served': int(served_counts[column]),
+            'omitted': int(omitted[column]),
+            'facility': _number(facility[column]),
+            'point_biserial': _number(point_biserial[column]),
+            'options': options,
+            'flags': flags,
+        })
+
+    percentages = matrix.percentages
+    histogram = np.bincount(
+        np.minimum((percentages // (100 / HISTOGRAM_BINS)).astype(np.int64), HISTOGRAM_BINS - 1),
+        minlength=HISTOGRAM_BINS,
+    ) if attempts else np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+    quartiles = np.percentile(percentages, [25, 50, 75]) if attempts else [np.nan] * 3
+
+    return {
+        'attempts': attempts,
+        'questions': items,
+        'mean_paper_length': _number(paper_length, 2),
+        'kr20': _number(kr20),
+        'sem': _number(sem, 2),
+        'scores': {
+            'mean_correct': _number(totals.mean(), 2) if attempts else None,
+            'sd_correct': _number(totals.std(), 2) if attempts else None,
+            'mean_percentage': _number(percentages.mean(), 2) if attempts else None,
+            'sd_percentage': _number(percentages.std(), 2) if attempts else None,
+            'min_percentage': _number(percentages.min(), 2) if attempts else None,
+            'max_percentage': _number(percentages.max(), 2) if attempts else None,
+            'quartiles': [_number(value, 2) for value in quartiles],
+            'histogram': histogram.tolist(),
+        },
+        'items': question_rows,
+    }
+
+
+def save_report(exam, kind, report, started):
+    """Store report as the exam's latest analysis of this kind; started is a perf_counter() value"""
+    report['generated_at'] = timezone.now().isoformat()
+    analysis, _ = ExamAnalysisReport.objects.update_or_create(
+        exam=exam,
+        kind=kind,
+        defaults={
+            'attempt_count': report['attempts'],
+            'report': report,
+            'duration_ms': int((time.perf_counter() - started) * 1000),
+        },
+    )
+    return analysis
+
+
+def analyze_exam(exam):
+    """Run the psychometric analysis of an exam and store it as its latest report"""
+    started = time.perf_counter()
+    return save_report(exam, 'psychometrics', analyze_responses(ResponseMatrix(exam)), started)
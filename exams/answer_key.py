@@ -0,0 +1,95 @@
+"""
+Per-exam answer keys for grading.
+
+An answer key maps each question of an exam's pool to its correct option
+and marks. It is built with one query, stored in Redis under the exam's
+cache namespace and also kept in process memory. The process copy is
+tagged with the namespace version it was read under, so the signals that
+invalidate an exam (question, ExamQuestion and exam changes, bumped once
+the change is committed) retire both tiers at once; a lookup costs one
+version read and no database query. Process copies also expire after
+LOCAL_TTL seconds, and are skipped when Redis cannot be reached, since
+the version cannot be checked then. The process that commits a change
+also drops its own copies directly (discard_local), whatever Redis does.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from redis.exceptions import RedisError
+from core.cache import get_or_set, get_version
+from .cache import exam_namespace
+from .models import ExamQuestion, Question
+
+logger = logging.getLogger(__name__)
+
+# Exams whose keys are kept in process memory; the least recently used go first
+LOCAL_MAX_EXAMS = 256
+# Seconds a process copy is trusted, whatever its version
+LOCAL_TTL = 60
+
+_local = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _load(exam_id):
+    return {
+        question_id: (correct_answer, marks)
+        for question_id, correct_answer, marks in ExamQuestion.objects.filter(
+            exam_id=exam_id
+        ).values_list('question_id', 'question__correct_answer', 'question__marks')
+    }
+
+
+def discard_local(exam_ids):
+    """Drop this process's copies of the exams' answer keys"""
+    with _local_lock:
+        for exam_id in exam_ids:
+            _local.pop(exam_id, None)
+
+
+def get_answer_key(exam_id):
+    """{question_id: (correct_answer, marks)} for every question in the exam's pool"""
+    namespace = exam_namespace(exam_id)
+    try:
+        version = get_version(namespace)
+    except RedisError as e:
+        logger.warning(f"Cache read failed for {namespace}: {e}")
+        return _load(exam_id)
+
+    now = time.monotonic()
+    with _local_lock:
+        entry = _local.get(exam_id)
+        if entry is not None and entry[0] == version and entry[1] > now:
+            _local.move_to_end(exam_id)
+            return entry[2]
+
+    key = get_or_set(namespace, ['answer_key'], lambda: _load(exam_id))
+    with _local_lock:
+        _local[exam_id] = (version, now + LOCAL_TTL, key)
+        _local.move_to_end(exam_id)
+        while len(_local) > LOCAL_MAX_EXAMS:
+            _local.popitem(last=False)
+    return key
+
+
+def answer_key_for(exam_id, question_ids):
+    """
+    The exam's answer key restricted to question_ids.
+
+    Papers are frozen when an attempt starts, so a question removed from
+    the pool afterwards is still graded; only such leftovers are read from
+    the question table.
+    """
+    key = get_answer_key(exam_id)
+    missing = [question_id for question_id in question_ids if question_id not in key]
+    result = {question_id: key[question_id] for question_id in question_ids if question_id in key}
+    if missing:
+        result.update(
+            (question_id, (correct_answer, marks))
+            for question_id, correct_answer, marks in Question.objects.filter(
+                id__in=missing
+            ).values_list('id', 'correct_answer', 'marks')
+        )
+    return result
+
@@ -0,0 +1,153 @@
+"""
+Student exam availability.
+
+The student dashboard and the exam list both show the exams a student can
+still start and the attempts they completed. Exams are cached per course,
+annotated with their question counts, and the student's own enrollments
+and attempts are cached per student, so a warm page load does not touch
+the database at all and a cold one runs a fixed number of queries per
+enrolled course.
+"""
+from django.db import transaction
+from core.cache import bump_version, get_or_set
+from .cache import get_exam_metadata
+from .models import Course, Exam, ExamAttempt, ExamQuestion
+
+
+def course_exams_namespace(course_id):
+    return f'course_exams:{course_id}'
+
+
+def student_namespace(student_id):
+    return f'student:{student_id}'
+
+
+# Bumped when scores change for many students at once (re-grading), which
+# retires every cached student overview without a key per student
+GRADES_NAMESPACE = 'grades'
+
+
+def get_course_exams(course_id):
+    """
+    Active exams of a course as template-ready dicts, with question_count,
+    display_count and the marks a paper can carry (min_paper_marks and
+    max_paper_marks; total_marks covers the whole pool).
+    """
+    def load():
+        # Plain values, like the student state below: pickled model
+        # instances break when a deploy changes the schema
+        exams = list(
+            Exam.objects.filter(course_id=course_id, is_active=True)
+            .order_by('-created_at')
+            .values(
+                'id', 'title', 'description', 'subject__name', 'duration_minutes', 'total_marks',
+                'questions_to_display', 'is_active',
+            )
+        )
+        pool_marks = {}
+        for exam_id, marks in ExamQuestion.objects.filter(
+            exam__course_id=course_id, exam__is_active=True
+        ).values_list('exam_id', 'question__marks'):
+            pool_marks.setdefault(exam_id, []).append(marks)
+        for exam in exams:
+            exam['subject'] = {'name': exam.pop('subject__name')}
+            marks = sorted(pool_marks.get(exam['id'], []))
+            exam['question_count'] = len(marks)
+            exam['display_count'] = min(len(marks), exam['questions_to_display'])
+            # A paper draws display_count questions from the pool, so its
+            # marks lie between the cheapest and the dearest such draw
+            exam['min_paper_marks'] = sum(marks[:exam['display_count']])
+            exam['max_paper_marks'] = sum(marks[len(marks) - exam['display_count']:])
+        return exams
+    return get_or_set(course_exams_namespace(course_id), ['active'], load)
+
+
+def _load_student_state(student_id):
+    return {
+        'enrolled_courses': list(
+            Course.objects.filter(
+                enrollments__student_id=student_id,
+                enrollments__is_active=True,
+            ).order_by('name').values('id', 'code', 'name')
+        ),
+        # Provisioned attempts that were never opened do not count as taken
+        'attempted_exam_ids': set(
+            ExamAttempt.objects.filter(student_id=student_id)
+            .exclude(status='scheduled')
+            .values_list('exam_id', flat=True)
+        ),
+        # Plain values: model instances would pin whole rows (and their
+        # exams' release state) in the cache
+        'completed_attempts': list(
+            ExamAttempt.objects.filter(student_id=student_id, status='completed')
+            .order_by('-start_time')
+            .values('id', 'exam_id', 'exam__title', 'start_time', 'score', 'max_score')
+        ),
+    }
+
+
+def _completed_attempt(row):
+    """Template-ready completed attempt; release state comes from the exam's cached metadata"""
+    exam = get_exam_metadata(row['exam_id']) or {}
+    return {
+        'id': row['id'],
+        'start_time': row['start_time'],
+        'score': row['score'],
+        'max_score': row['max_score'],
+        'percentage': round(row['score'] * 100 / row['max_score'], 2) if row['max_score'] else 0,
+        'exam': {
+            'id': row['exam_id'],
+            'title': row['exam__title'],
+            'results_available': bool(exam.get('show_results_immediately') or exam.get('results_released_at')),
+        },
+    }
+
+
+def get_student_overview(student):
+    """
+    Return enrolled_courses, available_exams and completed_attempts of a
+    student as lists of dicts, ready to render.
+    """
+    state = get_or_set(
+        student_namespace(student.id), ['overview'],
+        lambda: _load_student_state(student.id),
+        versions=[GRADES_NAMESPACE],
+    )
+    available_exams = [
+        exam
+        for course in state['enrolled_courses']
+        for exam in get_course_exams(course['id'])
+        if exam['id'] not in state['attempted_exam_ids']
+    ]
+    return {
+        'enrolled_courses': state['enrolled_courses'],
+        'available_exams': available_exams,
+        'completed_attempts': [_completed_attempt(row) for row in state['completed_attempts']],
+    }
+
+
+def invalidate_course_exams(course_ids):
+    """Drop the courses' cached exam listings once the current transaction commits"""
+    course_ids = {course_id for course_id in course_ids if course_id is not None}
+
+    def bump():
+        for course_id in course_ids:
+            bump_version(course_exams_namespace(course_id))
+
+    transaction.on_commit(bump)
+
+
+def invalidate_students(student_ids):
+    """Drop the students' cached overviews once the current transaction commits"""
+    student_ids = set(student_ids)
+
+    def bump():
+        for student_id in student_ids:
+            bump_version(student_namespace(student_id))
+
+    transaction.on_commit(bump)
+
+
+def invalidate_all_students():
+    """Drop every student's cached overview once the current transaction commits"""
+    transaction.on_commit(lambda: bump_version(GRADES_NAMESPACE))
@@ -0,0 +1,86 @@
+"""Read-through caches for the course catalog and exam data."""
+from django.db import transaction
+from core.cache import bump_version, get_or_set
+from .models import Course, Exam, ExamQuestion
+
+COURSES_NAMESPACE = 'courses'
+
+
+def exam_namespace(exam_id):
+    return f'exam:{exam_id}'
+
+
+def get_active_courses():
+    """Active courses ordered by name, as dicts of id, code, name and description"""
+    # Plain values: pickled model instances break, or come back with a stale
+    # set of fields, once a deploy changes the schema
+    return get_or_set(
+        COURSES_NAMESPACE, ['active'],
+        lambda: list(
+            Course.objects.filter(is_active=True).order_by('name').values('id', 'code', 'name', 'description')
+        ),
+    )
+
+
+def get_exam_metadata(exam_id):
+    """Plain dict describing an exam, or None if it does not exist"""
+    def load():
+        exam = Exam.objects.filter(id=exam_id).select_related('course', 'subject').first()
+        if exam is None:
+            return None
+        return {
+            'id': exam.id,
+            'title': exam.title,
+            'course_id': exam.course_id,
+            'course_name': exam.course.name if exam.course else None,
+            'subject_id': exam.subject_id,
+            'subject_name': exam.subject.name,
+            'duration_minutes': exam.duration_minutes,
+            'total_marks': exam.total_marks,
+            'questions_to_display': exam.questions_to_display,
+            'randomize_questions': exam.randomize_questions,
+            'difficulty_distribution': exam.difficulty_distribution,
+            'show_results_immediately': exam.show_results_immediately,
+            'results_released_at': exam.results_released_at,
+            'is_active': exam.is_active,
+            'start_time': exam.start_time,
+            'end_time': exam.end_time,
+        }
+    return get_or_set(exam_namespace(exam_id), ['meta'], load)
+
+
+def get_exam_question_strata(exam_id):
+    """Ids of the exam's question pool as {difficulty: {subject_id: [question ids]}}"""
+    def load():
+        strata = {}
+        rows = ExamQuestion.objects.filter(exam_id=exam_id).order_by('order', 'id').values_list(
+            'question_id', 'question__difficulty', 'question__subject_id'
+        )
+        for question_id, difficulty, subject_id in rows:
+            strata.setdefault(difficulty, {}).setdefault(subject_id, []).append(question_id)
+        return strata
+    return get_or_set(exam_namespace(exam_id), ['question_strata'], load)
+
+
+def invalidate_courses():
+    """Retire the cached course list once the current transaction commits (see invalidate_exams)"""
+    transaction.on_commit(lambda: bump_version(COURSES_NAMESPACE))
+
+
+def invalidate_exams(exam_ids):
+    """
+    Retire the exams' cached data (metadata, pools, answer keys) once the
+    current transaction commits; bumping earlier would let a concurrent
+    reader cache the old rows under the new version. This process's copies
+    of the answer keys are dropped first, so they are gone even when Redis
+    fails to take the bump.
+    """
+    from .answer_key import discard_local  # answer_key imports this module
+    exam_ids = set(exam_ids)
+
+    def bump():
+        discard_local(exam_ids)
+        for exam_id in exam_ids:
+            bump_version(exam_namespace(exam_id))
+
+    transaction.on_commit(bump)
@@ -0,0 +1,167 @@
+"""
+Answer-pattern collusion detection.
+
+Two candidates who pick the same wrong option on many questions are more
+suspicious than two who share correct answers. Each finished attempt's
+wrong answers are bit-packed into uint64 words twice: one bit per
+(question, wrong option chosen) and one bit per question answered
+wrongly. For every pair of attempts, popcounts of the ANDed words give
+the identical wrong answers and the questions both got wrong, without a
+query per pair.
+
+Pairs are compared in blocks of rows against the rest of the matrix
+(upper triangle only), sized so each block's work arrays stay within
+BLOCK_BYTES. Each pair is then scored against chance: if both candidates
+got n questions wrong, they would pick the same wrong option about n * p
+times, where p is the exam-wide chance that two wrong answers to a
+question match. The collusion index is the binomial z-score of the
+observed count. Pairs above both thresholds are reported, highest index
+first; the index threshold rises with the number of pairs compared, so
+large exams do not flag pairs by chance alone.
+"""
+import math
+import time
+import numpy as np
+from .analysis import ResponseMatrix, save_report
+from .models import ExamAttempt
+
+MIN_IDENTICAL_WRONG = 5
+# Pairs of honest candidates expected above the default index threshold.
+# The threshold grows with the number of pairs: an exam of 5,000
+# candidates has 12.5 million, and chance alone puts a few above 5.
+CHANCE_FLAGS = 0.01
+MIN_INDEX = 3.0
+REPORTED_PAIRS = 100
+# Bytes of packed words ANDed at once; bounds memory whatever the exam size
+BLOCK_BYTES = 32 * 1024 * 1024
+
+
+def _pack(mask):
+    """Bit-pack the rows of a boolean matrix into uint64 words"""
+    packed = np.packbits(mask, axis=1)
+    padding = -packed.shape[1] % 8
+    if padding or not packed.shape[1]:
+        packed = np.pad(packed, ((0, 0), (0, padding or 8)))
+    return np.ascontiguousarray(packed).view(np.uint64)
+
+
+def _common_bits(packed, start, stop):
+    """Bits rows start:stop share with each row from start on (block x remaining rows)"""
+    return np.bitwise_count(packed[start:stop, None, :] & packed[None, start:, :]).sum(axis=2, dtype=np.int32)
+
+
+def match_probability(matrix, wrong):
+    """Chance that two wrong answers to the same question pick the same option"""
+    counts = np.stack([(wrong & (matrix.choices == code)).sum(axis=0) for code in range(1, 5)]).astype(np.float64)
+    totals = counts.sum(axis=0)
+    pairs = (totals * (totals - 1)).sum()
+    return float((counts * (counts - 1)).sum() / pairs) if pairs else 0.0
+
+
+def index_threshold(pairs):
+    """Index above which about CHANCE_FLAGS of that many independent pairs would land (normal tail)"""
+    tail = CHANCE_FLAGS / max(pairs, 1)
+    low, high = 0.0, 40.0
+    for _ in range(60):
+        middle = (low + high) / 2
+        if math.erfc(middle / math.sqrt(2)) / 2 > tail:
+            low = middle
+        else:
+            high = middle
+    return max(MIN_INDEX, round(high, 2))
+
+
+def find_colluding_pairs(matrix, min_identical_wrong=MIN_IDENTICAL_WRONG, min_index=None, limit=REPORTED_PAIRS):
+    """
+    Suspicious pairs of a ResponseMatrix as (row_a, row_b, identical_wrong,
+    both_wrong, index) arrays sorted by index, at most limit of them, plus
+    the number of pairs compared, the number flagged, the match
+    probability and the index threshold used (index_threshold() unless
+    min_index is given).
+    """
+    attempts = matrix.choices.shape[0]
+    pairs_compared = attempts * (attempts - 1) // 2
+    if min_index is None:
+        min_index = index_threshold(pairs_compared)
+    wrong = matrix.served & (matrix.choices > 0) & ~matrix.correct
+    probability = match_probability(matrix, wrong)
+    identical = _pack(np.hstack([wrong & (matrix.choices == code) for code in range(1, 5)]))
+    both = _pack(wrong)
+
+    spread_unit = np.sqrt(probability * (1 - probability))
+    block_rows = max(1, BLOCK_BYTES // max(1, attempts * identical.shape[1] * 8))
+    found = [np.empty(0, dtype=np.int64)] * 2 + [np.empty(0, dtype=np.int32)] * 2 + [np.empty(0)]
+    flagged = 0
+    for start in range(0, attempts, block_rows):
+        stop = min(start + block_rows, attempts)
+        same = _common_bits(identical, start, stop)
+        common = _common_bits(both, start, stop)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            index = (same - common * probability) / (np.sqrt(common) * spread_unit)
+        # Column k of the block is row start + k; keep each pair once
+        upper = np.arange(start, attempts)[None, :] > np.arange(start, stop)[:, None]
+        rows, columns = np.nonzero(upper & (same >= min_identical_wrong) & (index >= min_index))
+        flagged += len(rows)
+        block = (rows + start, columns + start, same[rows, columns], common[rows, columns], index[rows, columns])
+        found = [np.concatenate(parts) for parts in zip(found, block)]
+        if len(found[0]) > 4 * limit:
+            top = np.argpartition(-found[4], limit)[:limit]
+            found = [values[top] for values in found]
+
+    order = np.argsort(-found[4], kind='stable')[:limit]
+    return [values[order] for values in found], pairs_compared, flagged, probability, min_index
+
+
+def collusion_report(exam, matrix, **options):
+    """Report dict of the suspicious pairs among an exam's attempts"""
+    (row_a, row_b, identical_wrong, both_wrong, index), compared, flagged, probability, min_index = (
+        find_colluding_pairs(matrix, **options)
+    )
+    wrong_counts = (matrix.served & (matrix.choices > 0) & ~matrix.correct).sum(axis=1)
+
+    student_ids = matrix.student_ids[np.concatenate([row_a, row_b])].tolist()
+    attempts = {
+        student_id: (str(attempt_id), email, start_time)
+        for student_id, attempt_id, email, start_time in ExamAttempt.objects.filter(
+            exam=exam, student_id__in=set(student_ids)
+        ).values_list('student_id', 'id', 'student__email', 'start_time')
+    }
+
+    def candidate(row):
+        student_id = int(matrix.student_ids[row])
+        attempt_id, email, start_time = attempts[student_id]
+        return {
+            'student_id': student_id,
+            'email': email,
+            'attempt_id': attempt_id,
+            'started_at': start_time.isoformat(),
+            'percentage': round(float(matrix.percentages[row]), 2),
+            'wrong_answers': int(wrong_counts[row]),
+        }
+
+    return {
+        'attempts': int(matrix.choices.shape[0]),
+        'questions': int(matrix.choices.shape[1]),
+        'pairs_compared': compared,
+        'pairs_flagged': flagged,
+        'match_probability': round(probability, 4),
+        'min_identical_wrong': options.get('min_identical_wrong', MIN_IDENTICAL_WRONG),
+        'min_index': min_index,
+        'pairs': [
+            {
+                'a': candidate(a),
+                'b': candidate(b),
+                'identical_wrong': int(same),
+                'both_wrong': int(common),
+                'expected_identical_wrong': round(float(common * probability), 2),
+                'index': round(float(score), 2),
+            }
+            for a, b, same, common, score in zip(row_a, row_b, identical_wrong, both_wrong, index)
+        ],
+    }
+
+
+def detect_collusion(exam, **options):
+    """Look for colluding pairs among an exam's finished attempts and store the report"""
+    started = time.perf_counter()
+    return save_report(exam, 'collusion', collusion_report(exam, ResponseMatrix(exam), **options), started)
@@ -0,0 +1,232 @@
+"""
+Near-duplicate question detection.
+
+Each question's text and options are normalized and cut into
+SHINGLE_SIZE-byte shingles, and a MinHash signature of NUM_PERM values
+summarizes the set; signatures are computed for batches of questions
+with numpy. Signatures are split into BANDS bands (locality-sensitive hashing): two
+questions land in the same bucket of a band when the whole band agrees,
+which is likely for similar questions and unlikely for others. Each
+question is only compared with the first question of the buckets it
+lands in, so the scan stays linear in the size of the bank; candidates
+whose signatures agree on at least the threshold share of values are
+joined into clusters.
+
+Clusters are stored for review. Merging a cluster points the exam pools
+at one canonical question and deletes the duplicates nobody has answered
+yet; answered duplicates are kept so past attempts stay intact.
+"""
+import re
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from .cache import invalidate_exams
+from .models import (
+    DuplicateCluster, DuplicateClusterMember, ExamQuestion, Question, StudentAnswer,
+    refresh_total_marks,
+)
+from .selection import SelectedQuestion
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 16  # of NUM_PERM // BANDS rows; pairs above ~0.7 similarity usually share a band
+DEFAULT_THRESHOLD = 0.8
+# Documents hashed together; bounds the (shingles x NUM_PERM) work array
+MINHASH_BATCH = 64
+
+# Fixed seed: signatures must be comparable between runs
+_random = np.random.RandomState(20250601)
+_PERM_A = _random.randint(0, 1 << 63, size=NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)  # odd
+_PERM_B = _random.randint(0, 1 << 63, size=NUM_PERM, dtype=np.uint64)
+
+WORD = re.compile(r'\w+')
+
+
+def question_document(question_text, *options):
+    """Normalized text compared between questions"""
+    return ' '.join(WORD.findall(' '.join([question_text, *options]).casefold()))
+
+
+def minhash(documents):
+    """
+    MinHash signatures (one row of NUM_PERM uint32 values per document) of
+    the documents' SHINGLE_SIZE-byte shingles, computed for the whole
+    batch at once.
+    """
+    encoded = [document.encode('utf-8').ljust(SHINGLE_SIZE) for document in documents]
+    lengths = np.array([len(data) - SHINGLE_SIZE + 1 for data in encoded])
+    buffer = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64)
+
+    # A shingle of up to 8 bytes is its own hash: pack its bytes into an integer
+    windows = np.lib.stride_tricks.sliding_window_view(buffer, SHINGLE_SIZE)
+    packed = windows @ (np.uint64(256) ** np.arange(SHINGLE_SIZE - 1, -1, -1, dtype=np.uint64))
+    # Keep the windows that start and end inside the same document
+    starts = np.concatenate(([0], np.cumsum(lengths + SHINGLE_SIZE - 1)[:-1]))
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    hashes = packed[np.repeat(starts, lengths) + offsets]
+
+    # Multiply-shift hashing: the high 32 bits of (a * x + b) mod 2**64
+    permuted = ((np.outer(_PERM_A, hashes) + _PERM_B[:, None]) >> np.uint64(32)).astype(np.uint32)
+    first_columns = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return np.minimum.reduceat(permuted, first_columns, axis=1).T
+
+
+def find_duplicates(questions=None, threshold=DEFAULT_THRESHOLD, chunk_size=2000):
+    """
+    Near-duplicate groups among questions (a Question queryset, all by
+    default), as lists of (question_id, similarity to the group's first
+    question) sorted by id.
+    """
+    questions = (Question.objects.all() if questions is None else questions).order_by('id')
+    rows = questions.values_list('id', 'question_text', 'option_a', 'option_b', 'option_c', 'option_d')
+
+    ids = []
+    signatures = []
+    batch_ids, batch = [], []
+    for question_id, *texts in rows.iterator(chunk_size=chunk_size):
+        document = question_document(*texts)
+        if document:
+            batch_ids.append(question_id)
+            batch.append(document)
+        if len(batch) >= MINHASH_BATCH:
+            ids.extend(batch_ids)
+            signatures.append(minhash(batch))
+            batch_ids, batch = [], []
+    if batch:
+        ids.extend(batch_ids)
+        signatures.append(minhash(batch))
+    if not ids:
+        return []
+    signatures = np.vstack(signatures)
+
+    # Pair each question with the first question of every bucket it shares
+    rows_per_band = NUM_PERM // BANDS
+    candidates = set()
+    for band in range(BANDS):
+        first_in_bucket = {}
+        for index, key in enumerate(signatures[:, band * rows_per_band:(band + 1) * rows_per_band]):
+            first = first_in_bucket.setdefault(key.tobytes(), index)
+            if first != index:
+                candidates.add((first, index))
+    if not candidates:
+        return []
+
+    pairs = np.array(sorted(candidates))
+    agreement = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+
+    # Union-find over the pairs that pass the threshold
+    parent = list(range(len(ids)))
+
+    def root(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    for (first, second), score in zip(pairs, agreement):
+        if score >= threshold:
+            a, b = root(int(first)), root(int(second))
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+
+    groups = {}
+    for index in range(len(ids)):
+        groups.setdefault(root(index), []).append(index)
+
+    duplicates = []
+    for head, members in sorted(groups.items()):
+        if len(members) < 2:
+            continue
+        scores = (signatures[members] == signatures[head]).mean(axis=1)
+        duplicates.append([(ids[index], round(float(score), 3)) for index, score in zip(members, scores)])
+    return duplicates
+
+
+def detect_duplicates(questions=None, threshold=DEFAULT_THRESHOLD):
+    """
+    Replace the open duplicate clusters with a fresh scan. Groups already
+    merged or dismissed (or a subset of one) are not reported again.
+    Returns the number of clusters stored.
+    """
+    groups = find_duplicates(questions, threshold)
+
+    resolved = {}
+    for cluster_id, question_id in DuplicateClusterMember.objects.exclude(
+        cluster__status='open'
+    ).values_list('cluster_id', 'question_id'):
+        resolved.setdefault(cluster_id, set()).add(question_id)
+    resolved = list(resolved.values())
+
+    new_groups = [
+        group for group in groups
+        if not any({question_id for question_id, _ in group} <= members for members in resolved)
+    ]
+
+    with transaction.atomic():
+        DuplicateCluster.objects.filter(status='open').delete()
+        clusters = DuplicateCluster.objects.bulk_create([
+            DuplicateCluster(size=len(group), similarity=min(score for _, score in group))
+            for group in new_groups
+        ])
+        DuplicateClusterMember.objects.bulk_create([
+            DuplicateClusterMember(cluster=cluster, question_id=question_id, similarity=score)
+            for cluster, group in zip(clusters, new_groups)
+            for question_id, score in group
+        ], batch_size=1000)
+    return len(clusters)
+
+
+def merge_cluster(cluster, canonical_id=None):
+    """
+    Merge a cluster into canonical_id (its first question by default).
+
+    Exam pools holding a duplicate get the canonical question instead (or
+    just lose the duplicate if they already hold it). Duplicates without
+    stored answers or attempt selections are deleted. Returns
+    (exams updated, questions deleted).
+    """
+    member_ids = list(cluster.members.values_list('question_id', flat=True))
+    if canonical_id is None and member_ids:
+        canonical_id = member_ids[0]
+    duplicate_ids = [question_id for question_id in member_ids if question_id != canonical_id]
+
+    with transaction.atomic():
+        pool_rows = list(
+            ExamQuestion.objects.filter(question_id__in=duplicate_ids).order_by('order', 'id').values_list('id', 'exam_id')
+        )
+        exam_ids = {exam_id for _, exam_id in pool_rows}
+        holding_canonical = set(
+            ExamQuestion.objects.filter(question_id=canonical_id, exam_id__in=exam_ids).values_list('exam_id', flat=True)
+        )
+        repoint, drop = [], []
+        for row_id, exam_id in pool_rows:
+            if exam_id in holding_canonical:
+                drop.append(row_id)
+            else:
+                # The first duplicate in an exam takes the canonical question's place
+                repoint.append(row_id)
+                holding_canonical.add(exam_id)
+        ExamQuestion.objects.filter(id__in=repoint).update(question_id=canonical_id)
+        ExamQuestion.objects.filter(id__in=drop).delete()
+        refresh_total_marks(exam_ids)
+        invalidate_exams(exam_ids)
+
+        # Duplicates on past papers or with stored answers stay for the record
+        in_use = set(
+            StudentAnswer.objects.filter(question_id__in=duplicate_ids).values_list('question_id', flat=True)
+        ) | set(
+            SelectedQuestion.objects.filter(question_id__in=duplicate_ids).values_list('question_id', flat=True)
+        )
+        _, deleted = Question.objects.filter(id__in=set(duplicate_ids) - in_use).delete()
+
+        cluster.status = 'merged'
+        cluster.canonical_id = canonical_id
+        cluster.resolved_at = timezone.now()
+        cluster.save(update_fields=['status', 'canonical', 'resolved_at'])
+    return len(exam_ids), deleted.get(Question._meta.label, 0)
+
+
+def dismiss_cluster(cluster):
+    cluster.status = 'dismissed'
+    cluster.resolved_at = timezone.now()
+    cluster.save(update_fields=['status', 'resolved_at'])
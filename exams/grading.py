@@ -0,0 +1,244 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from .answer_key import answer_key_for
+from .availability import invalidate_students
+from .models import ExamAttempt, StudentAnswer
+from .papers import get_paper
+from .performance import FINISHED_STATUSES, lock_performance, record_finished_attempts
+from .question_stats import lock_stats, record_graded_answers, record_served
+from .results import notify_results
+from .selection import SelectedQuestion
+
+VALID_OPTIONS = ('A', 'B', 'C', 'D')
+# Submissions are accepted this long after the deadline, for the
+# countdown's final request in flight; the sweeper waits as long
+SUBMIT_GRACE = timedelta(seconds=30)
+
+
+def clean_answers(answers):
+    """Normalize a {question_id: option} mapping posted by the exam page"""
+    cleaned = {}
+    for question_id, selected_answer in answers.items():
+        try:
+            question_id = int(question_id)
+        except (TypeError, ValueError):
+            continue
+        selected_answer = str(selected_answer).strip().upper()
+        if selected_answer in VALID_OPTIONS:
+            cleaned[question_id] = selected_answer
+    return cleaned
+
+
+def save_answers(attempt, answers):
+    """
+    Upsert the given answers of an in-progress attempt.
+
+    Only questions on the attempt's paper are accepted. Correctness is
+    computed from the exam's cached answer key and all rows are written
+    with a single bulk upsert. Returns the number of rows saved.
+    """
+    answers = clean_answers(answers)
+    paper_ids = {question['id'] for question in get_paper(attempt)}
+    answers = {
+        question_id: selected_answer
+        for question_id, selected_answer in answers.items()
+        if question_id in paper_ids
+    }
+    if not answers:
+        return 0
+
+    answer_key = answer_key_for(attempt.exam_id, answers.keys())
+    now = timezone.now()
+    rows = [
+        StudentAnswer(
+            attempt=attempt,
+            question_id=question_id,
+            selected_answer=selected_answer,
+            is_correct=selected_answer == answer_key[question_id][0],
+            answered_at=now,
+        )
+        for question_id, selected_answer in answers.items()
+        if question_id in answer_key
+    ]
+    StudentAnswer.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['attempt', 'question'],
+        update_fields=['selected_answer', 'is_correct', 'answered_at'],
+    )
+    return len(rows)
+
+
+def score_answers(exam_id, correct_question_ids):
+    """Total marks of the correctly answered questions, from the exam's answer key"""
+    answer_key = answer_key_for(exam_id, correct_question_ids)
+    return sum(answer_key[question_id][1] for question_id in correct_question_ids if question_id in answer_key)
+
+
+def finalize_attempt(attempt, status='completed', end_time=None):
+    """
+    Close an attempt and total the answers already stored for it.
+
+    The attempt is only updated while it is still in progress, so a
+    submission racing the deadline sweeper cannot close it twice. The end
+    time is clamped to the deadline, so time taken never exceeds the
+    exam's duration. Once committed, the result email is queued if the
+    exam already shows results. Returns False when the attempt had
+    already been closed.
+    """
+    end_time = min(end_time or timezone.now(), attempt.deadline)
+    correct_ids = list(attempt.answers.filter(is_correct=True).values_list('question_id', flat=True))
+
+    elapsed_time = end_time - attempt.start_time
+    values = {
+        'status': status,
+        'end_time': end_time,
+        'correct_answers': len(correct_ids),
+        'score': score_answers(attempt.exam_id, correct_ids),
+        'time_taken_minutes': max(0, int(elapsed_time.total_seconds() / 60)),
+    }
+    with transaction.atomic():
+        updated = ExamAttempt.objects.filter(pk=attempt.pk, status='in_progress').update(**values)
+        if not updated:
+            return False
+
+        for field, value in values.items():
+            setattr(attempt, field, value)
+        invalidate_students([attempt.student_id])
+        # Email the result now unless the exam holds results until release
+        if attempt.exam.results_available:
+            transaction.on_commit(lambda: notify_results([attempt.id]))
+    return True
+
+
+def finalize_expired_attempts(now=None, batch_size=500):
+    """
+    Time out every in-progress attempt whose deadline (plus SUBMIT_GRACE)
+    has passed.
+
+    Attempts are closed in batches: one indexed query picks the batch, one
+    query reads the answers already saved for all of them, the
+    cached answer keys give their marks and one bulk update writes the
+    results. Returns the number of attempts closed.
+    """
+    now = now or timezone.now()
+    finalized = 0
+
+    while True:
+        with transaction.atomic():
+            attempts = list(
+                ExamAttempt.objects.select_for_update(skip_locked=True)
+                .filter(status='in_progress', deadline__lte=now - SUBMIT_GRACE)
+                .only('id', 'student', 'exam', 'start_time', 'deadline', 'total_questions', 'max_score')
+                .order_by('deadline')[:batch_size]
+            )
+            if not attempts:
+                break
+
+            correct = defaultdict(list)
+            for attempt_id, question_id in StudentAnswer.objects.filter(
+                attempt__in=attempts, is_correct=True
+            ).values_list('attempt_id', 'question_id'):
+                correct[attempt_id].append(question_id)
+
+            for attempt in attempts:
+                question_ids = correct[attempt.id]
+                attempt.status = 'timeout'
+                attempt.end_time = attempt.deadline
+                attempt.correct_answers = len(question_ids)
+                attempt.score = score_answers(attempt.exam_id, question_ids)
+                elapsed_time = attempt.deadline - attempt.start_time
+                attempt.time_taken_minutes = max(0, int(elapsed_time.total_seconds() / 60))
+
+            ExamAttempt.objects.bulk_update(attempts, [
+                'status', 'end_time', 'correct_answers', 'score', 'time_taken_minutes'
+            ])
+            invalidate_students(attempt.student_id for attempt in attempts)
+            attempt_ids = [attempt.id for attempt in attempts]
+            transaction.on_commit(lambda: notify_results(attempt_ids))
+
+        finalized += len(attempts)
+        if len(attempts) < batch_size:
+            break
+
+    return finalized
+
+
+def aggregate_finished_attempts(batch_size=500):
+    """
+    Fold finished attempts not yet aggregated into their exams'
+    performance rows and their questions' statistics.
+
+    Starting and grading attempts leave this to a periodic task so that
+    submissions never queue on shared rows. Each batch locks the pending
+    attempts, skipping any another worker holds, then the performance
+    rows of their exams and the statistics rows of their questions (each
+    in id order, so concurrent folds cannot deadlock), and marks the
+    attempts aggregated in the same transaction. Returns the number of
+    attempts folded.
+    """
+    aggregated = 0
+
+    while True:
+        with transaction.atomic():
+            pending = ExamAttempt.objects.filter(status__in=FINISHED_STATUSES, aggregated=False)
+            exam_ids = list(pending.order_by().values_list('exam_id', flat=True).distinct()[:batch_size])
+            if not exam_ids:
+                break
+
+            attempts = list(
+                pending.select_for_update(skip_locked=True)
+                .filter(exam_id__in=exam_ids)
+                .only('id', 'exam', 'score', 'max_score', 'time_taken_minutes')
+                .order_by('id')[:batch_size]
+            )
+            if not attempts:
+                break
+
+            served = list(
+                SelectedQuestion.objects.filter(examattempt__in=attempts).values_list('question_id', flat=True)
+            )
+            answers = defaultdict(list)
+            for attempt_id, *answer in StudentAnswer.objects.filter(
+                attempt__in=attempts
+            ).values_list('attempt_id', 'question_id', 'selected_answer', 'is_correct'):
+                answers[attempt_id].append(answer)
+
+            performances = lock_performance({attempt.exam_id for attempt in attempts})
+            lock_stats(served + [answer[0] for rows in answers.values() for answer in rows])
+            record_finished_attempts(attempts, performances)
+            record_served(served)
+            record_graded_answers([(attempt, answers[attempt.id]) for attempt in attempts])
+            ExamAttempt.objects.filter(id__in=[attempt.id for attempt in attempts]).update(aggregated=True)
+
+        aggregated += len(attempts)
+        if len(attempts) < batch_size:
+            break
+
+    return aggregated
+
+
+def grade_attempt(attempt, answers=None, status='completed'):
+    """
+    Store any answers not yet autosaved and close the attempt.
+
+    Answers are upserted in bulk and the totals are aggregated from the
+    stored rows inside one transaction, so the query count does not grow
+    with the number of questions. A submission arriving later than
+    SUBMIT_GRACE after the deadline only times the attempt out: its
+    answers are discarded and the autosaved ones are graded. Returns
+    False when the attempt had already been closed.
+    """
+    if timezone.now() > attempt.deadline + SUBMIT_GRACE:
+        answers = None
+        status = 'timeout'
+    with transaction.atomic():
+        if answers:
+            save_answers(attempt, answers)
+        if not finalize_attempt(attempt, status=status):
+            # Closed meanwhile, e.g. by the deadline sweeper
+            transaction.set_rollback(True)
+            return False
+    return True
@@ -0,0 +1,256 @@
+"""
+Streaming question bank import.
+
+Readers turn markdown (the sample_questions.md layout), CSV and JSONL
+files into (line_number, row) pairs one question at a time, and
+import_questions validates and inserts them in batches. Memory use only
+depends on the batch size, never on the size of the file.
+"""
+import csv
+import json
+import re
+from core.statistics import adjust_counter
+from .models import Course, Question, Subject, question_content_hash
+
+ANSWERS = ('A', 'B', 'C', 'D')
+DIFFICULTIES = dict(Question.DIFFICULTY_CHOICES)
+
+# Aliases accepted for each column in CSV/JSONL files and markdown fields
+FIELD_ALIASES = {
+    'question_text': ('question_text', 'text', 'question'),
+    'option_a': ('option_a', 'a'),
+    'option_b': ('option_b', 'b'),
+    'option_c': ('option_c', 'c'),
+    'option_d': ('option_d', 'd'),
+    'correct_answer': ('correct_answer', 'answer'),
+    'difficulty': ('difficulty',),
+    'marks': ('marks',),
+    'explanation': ('explanation',),
+    'course': ('course',),
+    'subject': ('subject',),
+}
+ALIASES = {alias: field for field, aliases in FIELD_ALIASES.items() for alias in aliases}
+
+MARKDOWN_FIELD = re.compile(r'^\*\*(?P<key>[^*]+)\*\*\s*:\s*(?P<value>.*)$')
+
+
+def _canonical(row):
+    return {
+        ALIASES[str(key).strip().lower()]: value
+        for key, value in row.items()
+        if key is not None and str(key).strip().lower() in ALIASES
+    }
+
+
+def read_markdown(handle):
+    """
+    Yield questions written as in sample_questions.md:
+
+        ## Subject name
+        ### Question 1
+        **Text**: ...
+        **A**: ...   (B, C and D likewise)
+        **Answer**: C
+        **Difficulty**: Easy
+
+    A "## " heading sets the subject of the questions below it unless a
+    question has its own **Subject** field. Lines without a field continue
+    the previous field's value.
+    """
+    heading = None
+    question = None
+    start_line = None
+    last_key = None
+
+    for line_number, line in enumerate(handle, start=1):
+        line = line.rstrip('\n')
+        stripped = line.strip()
+        if stripped.startswith(('## ', '### ')):
+            if question:
+                yield start_line, _canonical(question)
+            question = None
+            last_key = None
+            if stripped.startswith('### '):
+                question = {'subject': heading} if heading else {}
+                start_line = line_number
+            else:
+                heading = stripped[3:].strip()
+            continue
+
+        if question is None or not stripped:
+            continue
+        match = MARKDOWN_FIELD.match(stripped)
+        if match:
+            last_key = match.group('key').strip().lower()
+            question[last_key] = match.group('value').strip()
+        elif last_key:
+            question[last_key] = f'{question[last_key]}\n{stripped}'
+
+    if question:
+        yield start_line, _canonical(question)
+
+
+def read_csv(handle):
+    reader = csv.DictReader(handle)
+    for row in reader:
+        yield reader.line_num, _canonical(row)
+
+
+def read_jsonl(handle):
+    for line_number, line in enumerate(handle, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, {'_error': f'invalid JSON: {e.msg}'}
+            continue
+        if not isinstance(row, dict):
+            yield line_number, {'_error': 'expected a JSON object'}
+            continue
+        yield line_number, _canonical(row)
+
+
+READERS = {
+    'md': read_markdown,
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+}
+
+
+class SubjectCache:
+    """Resolve course codes/names and subject names with one lookup each"""
+
+    def __init__(self, create_subjects=True):
+        # With create_subjects off (dry runs) unknown subjects are returned unsaved
+        self.courses = {}
+        for course in Course.objects.all():
+            self.courses[course.code.lower()] = course
+            self.courses[course.name.lower()] = course
+        self.subjects = {}
+        self.create_subjects = create_subjects
+
+    def course(self, value):
+        return self.courses.get(str(value).strip().lower())
+
+    def subject(self, course, name):
+        key = (course.id, name.lower())
+        if key not in self.subjects:
+            subject = Subject.objects.filter(course=course, name__iexact=name).first()
+            if subject is None:
+                subject = Subject(course=course, name=name)
+                if self.create_subjects:
+                    subject.save()
+            self.subjects[key] = subject
+        return self.subjects[key]
+
+
+def clean_question(row, subjects, default_course=None, default_subject=None):
+    """Validate one row. Returns (field values, None) or (None, error message)."""
+    if '_error' in row:
+        return None, row['_error']
+
+    def text(field):
+        return str(row.get(field) or '').strip()
+
+    values = {field: text(field) for field in ('question_text', 'option_a', 'option_b', 'option_c', 'option_d')}
+    missing = [field for field, value in values.items() if not value]
+    if missing:
+        return None, f'missing {", ".join(missing)}'
+    if any(len(values[field]) > 255 for field in ('option_a', 'option_b', 'option_c', 'option_d')):
+        return None, 'options are limited to 255 characters'
+
+    answer = text('correct_answer').upper().removeprefix('OPTION ').strip()
+    if answer not in ANSWERS:
+        return None, f'answer must be one of {", ".join(ANSWERS)}'
+
+    difficulty = text('difficulty').lower() or 'medium'
+    if difficulty not in DIFFICULTIES:
+        return None, f'difficulty must be one of {", ".join(DIFFICULTIES)}'
+
+    try:
+        marks = int(text('marks') or 1)
+    except ValueError:
+        marks = 0
+    if marks < 1:
+        return None, 'marks must be a positive whole number'
+
+    course = subjects.course(text('course')) if text('course') else default_course
+    if course is None:
+        return None, f'unknown course "{text("course")}"' if text('course') else 'no course given'
+    subject_name = text('subject') or default_subject
+    if not subject_name:
+        return None, 'no subject given'
+    subject = subjects.subject(course, subject_name[:100])
+
+    values.update({
+        'course': course,
+        'subject': subject,
+        'correct_answer': answer,
+        'difficulty': difficulty,
+        'marks': marks,
+        'explanation': text('explanation'),
+    })
+    values['content_hash'] = question_content_hash(
+        values['question_text'], values['option_a'], values['option_b'], values['option_c'], values['option_d']
+    )
+    return values, None
+
+
+def import_questions(rows, created_by, default_course=None, default_subject=None,
+                     batch_size=500, dry_run=False, on_error=None, on_batch=None):
+    """
+    Validate and insert (line_number, row) pairs in batches.
+
+    A question is a duplicate when its course already has a question with
+    the same content hash, in the database or earlier in the file; these
+    are skipped. Each batch costs one lookup of existing hashes and one
+    bulk insert. on_error(line_number, message) is called for rejected
+    rows and on_batch(totals) after each batch. Returns the totals.
+    """
+    subjects = SubjectCache(create_subjects=not dry_run)
+    totals = {'rows': 0, 'created': 0, 'duplicates': 0, 'invalid': 0}
+    batch = {}
+
+    def flush():
+        if not batch:
+            return
+        existing = set(
+            Question.objects.filter(
+                content_hash__in={content_hash for _, content_hash in batch}
+            ).values_list('course_id', 'content_hash')
+        )
+        new = [values for key, values in batch.items() if key not in existing]
+        totals['duplicates'] += len(batch) - len(new)
+        if new and not dry_run:
+            Question.objects.bulk_create(
+                [Question(created_by=created_by, **values) for values in new],
+                batch_size=batch_size,
+            )
+        totals['created'] += len(new)
+        batch.clear()
+        if on_batch:
+            on_batch(totals)
+
+    for line_number, row in rows:
+        totals['rows'] += 1
+        values, error = clean_question(row, subjects, default_course, default_subject)
+        if error:
+            totals['invalid'] += 1
+            if on_error:
+                on_error(line_number, error)
+            continue
+
+        key = (values['course'].id, values['content_hash'])
+        if key in batch:
+            totals['duplicates'] += 1
+            continue
+        batch[key] = values
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    if totals['created'] and not dry_run:
+        # Bulk inserts bypass the counter signals
+        adjust_counter('total_questions', totals['created'])
+    return totals
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from exams.analysis import analyze_exam
+from exams.models import Exam
+from exams.performance import FINISHED_STATUSES
+
+
+class Command(BaseCommand):
+    help = 'Compute reliability, item and distractor statistics of exams from their finished attempts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, help='Only analyse this exam (default: every exam with finished attempts)')
+
+    def handle(self, *args, **options):
+        if options['exam']:
+            exams = Exam.objects.filter(id=options['exam'])
+            if not exams.exists():
+                raise CommandError(f'Exam {options["exam"]} does not exist')
+        else:
+            exams = Exam.objects.filter(examattempt__status__in=FINISHED_STATUSES).distinct()
+
+        for exam in exams.order_by('id'):
+            report = analyze_exam(exam)
+            kr20 = report.report['kr20']
+            self.stdout.write(self.style.SUCCESS(
+                f'📊 {exam.title}: {report.attempt_count} attempt(s), {report.report["questions"]} question(s), '
+                f'KR-20 {kr20 if kr20 is not None else "n/a"}, '
+                f'{sum(1 for item in report.report["items"] if item["flags"])} flagged item(s) '
+                f'in {report.duration_ms}ms'
+            ))
@@ -0,0 +1,121 @@
+import random
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from exams.models import Course, Subject, Question, Exam, ExamQuestion, ExamAttempt
+from exams.answer_key import get_answer_key
+from exams.grading import grade_attempt
+from exams.papers import build_paper, paper_max_score
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark exam grading and check the query count stays flat as questions grow'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=str,
+            default='10,50,100,200',
+            help='Comma separated number of questions per attempt'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted({int(size) for size in options['sizes'].split(',') if size.strip()})
+        except ValueError:
+            raise CommandError('--sizes must be a comma separated list of integers')
+        if not sizes or sizes[0] < 1:
+            raise CommandError('--sizes must contain positive integers')
+
+        # Everything is created inside a transaction that is rolled back
+        with transaction.atomic():
+            results = self.run_benchmark(sizes)
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('=== GRADING BENCHMARK ==='))
+        self.stdout.write(f'{"Questions":>10} {"Queries":>8} {"Batches":>8} {"Time (ms)":>10}')
+        for size, queries, batches, elapsed in results:
+            self.stdout.write(f'{size:>10} {queries:>8} {batches:>8} {elapsed:>10.1f}')
+
+        # Backends with a bind parameter limit (SQLite) split the upsert into
+        # several INSERT batches; anything beyond that is per-question work.
+        query_counts = {queries - batches for _, queries, batches, _ in results}
+        if len(query_counts) > 1:
+            raise CommandError(f'Query count grows with exam size: {sorted(query_counts)}')
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Query count is flat at {query_counts.pop()} per submission plus one per insert batch'
+        ))
+
+    def run_benchmark(self, sizes):
+        rng = random.Random(42)
+        instructor = User.objects.create(
+            email='grading-benchmark@cbt.local',
+            username='grading-benchmark',
+            user_type='instructor',
+            is_approved=True,
+        )
+        course = Course.objects.create(code='grading_bench', name='Grading Benchmark', description='Benchmark data')
+        subject = Subject.objects.create(course=course, name='Grading Benchmark')
+        exam = Exam.objects.create(
+            title='Grading Benchmark',
+            course=course,
+            subject=subject,
+            duration_minutes=60,
+            questions_to_display=max(sizes),
+            created_by=instructor,
+        )
+        questions = Question.objects.bulk_create([
+            Question(
+                course=course,
+                subject=subject,
+                question_text=f'Benchmark question {number}',
+                option_a='A', option_b='B', option_c='C', option_d='D',
+                correct_answer=rng.choice('ABCD'),
+                created_by=instructor,
+            )
+            for number in range(max(sizes))
+        ])
+        ExamQuestion.objects.bulk_create([
+            ExamQuestion(exam=exam, question=question, order=order)
+            for order, question in enumerate(questions)
+        ])
+        # The answer key is cached by the first graded attempt; load it up
+        # front so every size measures the steady state
+        get_answer_key(exam.id)
+
+        results = []
+        for size in sizes:
+            student = User.objects.create(
+                email=f'grading-benchmark-{size}@cbt.local',
+                username=f'grading-benchmark-{size}',
+                user_type='student',
+            )
+            paper = build_paper(questions[:size])
+            attempt = ExamAttempt.objects.create(
+                student=student,
+                exam=exam,
+                deadline=timezone.now() + timedelta(minutes=exam.duration_minutes),
+                total_questions=size,
+                max_score=paper_max_score(paper),
+                paper=paper,
+            )
+            attempt.selected_questions.set(questions[:size])
+            answers = {str(question.id): rng.choice('ABCD') for question in questions[:size]}
+
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                grade_attempt(attempt, answers)
+                elapsed = (time.perf_counter() - started) * 1000
+            batch_size = connection.ops.bulk_batch_size(
+                ['attempt', 'question', 'selected_answer', 'is_correct', 'answered_at'], answers
+            ) or size
+            batches = -(-size // batch_size)
+            results.append((size, len(context.captured_queries), batches, elapsed))
+
+        return results
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from exams.collusion import MIN_IDENTICAL_WRONG, REPORTED_PAIRS, detect_collusion
+from exams.models import Exam
+
+
+class Command(BaseCommand):
+    help = 'Flag pairs of attempts in an exam that share suspiciously many identical wrong answers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, required=True, help='Exam to check')
+        parser.add_argument('--min-index', type=float, help='Collusion index (z-score) a pair must reach (default: grows with the number of pairs)')
+        parser.add_argument('--min-identical-wrong', type=int, default=MIN_IDENTICAL_WRONG, help='Identical wrong answers a pair must share')
+        parser.add_argument('--limit', type=int, default=REPORTED_PAIRS, help='Most suspicious pairs to keep in the report')
+
+    def handle(self, *args, **options):
+        exam = Exam.objects.filter(id=options['exam']).first()
+        if exam is None:
+            raise CommandError(f'Exam {options["exam"]} does not exist')
+
+        report = detect_collusion(
+            exam,
+            min_index=options['min_index'],
+            min_identical_wrong=options['min_identical_wrong'],
+            limit=options['limit'],
+        )
+        data = report.report
+        self.stdout.write(self.style.SUCCESS(
+            f'🔍 {exam.title}: {data["pairs_compared"]} pair(s) of {report.attempt_count} attempt(s) compared, '
+            f'{data["pairs_flagged"]} flagged at index {data["min_index"]} or more in {report.duration_ms}ms'
+        ))
+        for pair in data['pairs'][:10]:
+            self.stdout.write(
+                f'  ⚠️ {pair["a"]["email"]} / {pair["b"]["email"]}: {pair["identical_wrong"]} identical wrong answer(s) '
+                f'(expected {pair["expected_identical_wrong"]}), index {pair["index"]}'
+            )
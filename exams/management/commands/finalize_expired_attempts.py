@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from exams.grading import finalize_expired_attempts
+
+
+class Command(BaseCommand):
+    help = 'Time out and grade every in-progress exam attempt past its deadline'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of attempts finalized per transaction'
+        )
+
+    def handle(self, *args, **options):
+        finalized = finalize_expired_attempts(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✅ Finalized {finalized} expired attempt(s)'))
@@ -0,0 +1,37 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from exams.duplicates import DEFAULT_THRESHOLD, detect_duplicates
+from exams.models import Course, DuplicateCluster, Question
+
+
+class Command(BaseCommand):
+    help = 'Find near-duplicate questions (MinHash/LSH) and store the clusters for review in the admin'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help=f'Estimated similarity needed to report a pair (default {DEFAULT_THRESHOLD})')
+        parser.add_argument('--course', help='Only scan questions of this course code')
+
+    def handle(self, *args, **options):
+        threshold = options['threshold']
+        if not 0 < threshold <= 1:
+            raise CommandError('--threshold must be between 0 and 1')
+
+        questions = Question.objects.all()
+        if options['course']:
+            course = Course.objects.filter(code=options['course']).first()
+            if course is None:
+                raise CommandError(f'Course "{options["course"]}" does not exist')
+            questions = questions.filter(course=course)
+
+        self.stdout.write(f'🔍 Scanning {questions.count()} question(s) for near-duplicates...')
+        started = time.perf_counter()
+        found = detect_duplicates(questions, threshold)
+
+        for cluster in DuplicateCluster.objects.filter(status='open').order_by('-size', 'id')[:10]:
+            member = cluster.members.select_related('question').first()
+            self.stdout.write(f'  🧩 {cluster.size} questions, similarity ≥ {cluster.similarity}: {member.question.question_text[:60]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {found} duplicate cluster(s) found in {time.perf_counter() - started:.1f}s; '
+            f'review them under Duplicate clusters in the admin'
+        ))
@@ -0,0 +1,274 @@
+import random
+import time
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from authentication.models import CourseEnrollment
+from core.statistics import refresh_all
+from exams.models import Course, Subject, Question, Exam, ExamQuestion, ExamAttempt, StudentAnswer, refresh_total_marks
+from exams.papers import build_paper, paper_max_score
+from exams.performance import rebuild_exam_performance
+from exams.question_stats import rebuild_question_stats
+
+User = get_user_model()
+
+OPTIONS = 'ABCD'
+
+SelectedQuestion = ExamAttempt.selected_questions.through
+
+
+def insert_statement(model, fields):
+    """Parameterized INSERT of the given fields, quoted for the default database"""
+    return 'INSERT INTO {table} ({columns}) VALUES ({placeholders})'.format(
+        table=connection.ops.quote_name(model._meta.db_table),
+        columns=', '.join(connection.ops.quote_name(model._meta.get_field(name).column) for name in fields),
+        placeholders=', '.join(['%s'] * len(fields)),
+    )
+
+
+class Command(BaseCommand):
+    help = 'Generate a large synthetic exam-day dataset with chunked bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000, help='Number of students to create')
+        parser.add_argument('--courses', type=int, default=3, help=f'Number of courses to use (max {len(Course.COURSE_CHOICES)})')
+        parser.add_argument('--questions', type=int, default=500, help='Questions per course')
+        parser.add_argument('--exams', type=int, default=6, help='Exams in total, spread over the courses')
+        parser.add_argument('--questions-per-exam', type=int, default=50, help='Questions each candidate answers')
+        parser.add_argument('--attempts', type=int, default=2, help='Finished attempts per student')
+        parser.add_argument('--days', type=int, default=90, help='Spread attempts over this many past days')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per bulk insert')
+        parser.add_argument('--prefix', type=str, default='load', help='Prefix for generated usernames and emails')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, so runs are reproducible')
+
+    def handle(self, *args, **options):
+        if not 1 <= options['courses'] <= len(Course.COURSE_CHOICES):
+            raise CommandError(f'--courses must be between 1 and {len(Course.COURSE_CHOICES)}')
+        if options['exams'] < options['courses']:
+            raise CommandError('--exams must be at least --courses')
+        if options['questions'] < options['questions_per_exam']:
+            raise CommandError('--questions must be at least --questions-per-exam')
+        if min(options['students'], options['questions_per_exam'], options['chunk_size']) < 1 or options['attempts'] < 0:
+            raise CommandError('Sizes must be positive')
+
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(f'Users with prefix "{prefix}" already exist; pass a different --prefix')
+
+        self.rng = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+        # Built here rather than at import, when the database connection may not be configured yet
+        self.answer_insert = insert_statement(
+            StudentAnswer, ('attempt', 'question', 'selected_answer', 'is_correct', 'answered_at')
+        )
+        self.selection_insert = insert_statement(SelectedQuestion, ('examattempt', 'question'))
+        self.now = timezone.now()
+        started = time.perf_counter()
+
+        instructor = self.create_instructor(prefix)
+        courses = self.create_courses(options['courses'], instructor)
+        pools = {course.id: self.create_questions(course, options['questions'], instructor) for course in courses}
+        course_exams = self.create_exams(courses, pools, options['exams'], options['questions_per_exam'], instructor)
+
+        totals = {'students': 0, 'attempts': 0, 'answers': 0}
+        password = make_password(f'{prefix}-pass-123')  # hashed once, shared by every student
+        for offset in range(0, options['students'], self.chunk_size):
+            count = min(self.chunk_size, options['students'] - offset)
+            with transaction.atomic():
+                attempts, answers = self.create_students(
+                    prefix, offset, count, password, courses, course_exams,
+                    options['attempts'], options['days'],
+                )
+            totals['students'] += count
+            totals['attempts'] += attempts
+            totals['answers'] += answers
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'👥 {totals["students"]} students, {totals["attempts"]} attempts, '
+                f'{totals["answers"]} answers ({totals["answers"] / elapsed:,.0f} answers/s)'
+            )
+
+        self.stdout.write('📊 Rebuilding aggregates...')
+        for exams in course_exams.values():
+            for exam, _ in exams:
+                rebuild_exam_performance(exam)
+        rebuild_question_stats(
+            ExamQuestion.objects.filter(
+                exam__in=[exam for exams in course_exams.values() for exam, _ in exams]
+            ).values_list('question_id', flat=True)
+        )
+        refresh_all()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Generated {totals["students"]} students, {totals["attempts"]} attempts and '
+            f'{totals["answers"]} answers in {time.perf_counter() - started:.1f}s'
+        ))
+
+    def create_instructor(self, prefix):
+        return User.objects.create(
+            email=f'{prefix}-instructor@load.local',
+            username=f'{prefix}-instructor',
+            first_name='Load',
+            last_name='Instructor',
+            user_type='instructor',
+            is_approved=True,
+            is_email_verified=True,
+            password=make_password(None),
+        )
+
+    def create_courses(self, count, instructor):
+        courses = []
+        for code, name in Course.COURSE_CHOICES[:count]:
+            course, _ = Course.objects.get_or_create(
+                code=code,
+                defaults={'name': name, 'description': f'{name} course', 'instructor': instructor},
+            )
+            courses.append(course)
+        return courses
+
+    def create_questions(self, course, count, instructor):
+        subject, _ = Subject.objects.get_or_create(course=course, name='Load Test')
+        questions = [
+            Question(
+                course=course,
+                subject=subject,
+                question_text=f'{course.name} load question {number}: which option is correct?',
+                option_a='First option', option_b='Second option',
+                option_c='Third option', option_d='Fourth option',
+                correct_answer=self.rng.choice(OPTIONS),
+                difficulty=self.rng.choice(['easy', 'medium', 'hard']),
+                created_by=instructor,
+            )
+            for number in range(count)
+        ]
+        # bulk_create skips save(), which fills in the duplicate-detection hash
+        for question in questions:
+            question.content_hash = question.compute_content_hash()
+        Question.objects.bulk_create(questions, batch_size=self.chunk_size)
+        return questions
+
+    def create_exams(self, courses, pools, count, questions_per_exam, instructor):
+        course_exams = {course.id: [] for course in courses}
+        for number in range(count):
+            course = courses[number % len(courses)]
+            pool = self.rng.sample(pools[course.id], min(len(pools[course.id]), questions_per_exam * 2))
+            exam = Exam.objects.create(
+                title=f'{course.name} Load Exam {number + 1}',
+                course=course,
+                subject=pool[0].subject,
+                duration_minutes=60,
+                questions_to_display=questions_per_exam,
+                is_active=True,
+                created_by=instructor,
+            )
+            ExamQuestion.objects.bulk_create([
+                ExamQuestion(exam=exam, question=question, order=order)
+                for order, question in enumerate(pool)
+            ], batch_size=self.chunk_size)
+            refresh_total_marks([exam.id])
+            course_exams[course.id].append((exam, pool))
+        return course_exams
+
+    def create_students(self, prefix, offset, count, password, courses, course_exams, attempts_per_student, days):
+        """Create one chunk of students with their enrollment and graded history"""
+        students = User.objects.bulk_create([
+            User(
+                email=f'{prefix}-student{number}@load.local',
+                username=f'{prefix}-student-{number}',
+                first_name='Load',
+                last_name=f'Student {number}',
+                user_type='student',
+                is_email_verified=True,
+                password=password,
+            )
+            for number in range(offset, offset + count)
+        ], batch_size=self.chunk_size)
+
+        attempt_field = StudentAnswer._meta.get_field('attempt').target_field
+        enrollments = []
+        attempts = []
+        selections = []
+        answers = []
+        attempt_count = 0
+        answer_count = 0
+        for student in students:
+            course = self.rng.choice(courses)
+            enrollments.append(CourseEnrollment(student_id=student.id, course_id=course.id))
+            ability = self.rng.betavariate(5, 3)
+
+            exams = course_exams[course.id]
+            for exam, pool in self.rng.sample(exams, min(attempts_per_student, len(exams))):
+                start_time = self.now - timedelta(days=self.rng.uniform(1, days))
+                time_taken = self.rng.randint(10, exam.duration_minutes)
+                attempt = ExamAttempt(
+                    student_id=student.id,
+                    exam_id=exam.id,
+                    status='completed',
+                    aggregated=True,  # counted by the rebuild below
+                    start_time=start_time,
+                    end_time=start_time + timedelta(minutes=time_taken),
+                    deadline=start_time + timedelta(minutes=exam.duration_minutes),
+                    total_questions=exam.questions_to_display,
+                    time_taken_minutes=time_taken,
+                )
+                attempt_db_id = attempt_field.get_db_prep_value(attempt.id, connection)
+                questions = self.rng.sample(pool, exam.questions_to_display)
+                attempt.paper = build_paper(questions)
+                attempt.max_score = paper_max_score(attempt.paper)
+                for question in questions:
+                    selections.append((attempt_db_id, question.id))
+                    if self.rng.random() < ability:
+                        selected_answer = question.correct_answer
+                    else:
+                        selected_answer = self.rng.choice(OPTIONS)
+                    is_correct = selected_answer == question.correct_answer
+                    if is_correct:
+                        attempt.correct_answers += 1
+                        attempt.score += question.marks
+                    answered_at = start_time + timedelta(seconds=self.rng.uniform(0, time_taken * 60))
+                    answers.append((
+                        attempt_db_id,
+                        question.id,
+                        selected_answer,
+                        is_correct,
+                        connection.ops.adapt_datetimefield_value(answered_at),
+                    ))
+                attempts.append(attempt)
+
+                # Attempts must exist before their papers and answers are inserted
+                if len(answers) >= self.chunk_size:
+                    attempt_count += self.flush_attempts(attempts)
+                    self.flush_rows(self.selection_insert, selections)
+                    answer_count += self.flush_rows(self.answer_insert, answers)
+
+        CourseEnrollment.objects.bulk_create(enrollments, batch_size=self.chunk_size)
+        attempt_count += self.flush_attempts(attempts)
+        self.flush_rows(self.selection_insert, selections)
+        answer_count += self.flush_rows(self.answer_insert, answers)
+        return attempt_count, answer_count
+
+    def flush_attempts(self, attempts):
+        ExamAttempt.objects.bulk_create(attempts, batch_size=self.chunk_size)
+        count = len(attempts)
+        attempts.clear()
+        return count
+
+    def flush_rows(self, statement, rows):
+        """
+        Insert answer or paper selection rows with a plain executemany.
+
+        These make up nearly all generated rows, and building a model
+        instance and compiling an INSERT for each of them costs several
+        times more than writing them. This also lets answered_at be set,
+        which auto_now_add would otherwise overwrite.
+        """
+        if not rows:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.executemany(statement, rows)
+        count = len(rows)
+        rows.clear()
+        return count
@@ -0,0 +1,92 @@
+import csv
+from pathlib import Path
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from exams.importers import READERS, SubjectCache, import_questions
+
+User = get_user_model()
+
+EXTENSIONS = {'.md': 'md', '.markdown': 'md', '.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+
+class Command(BaseCommand):
+    help = 'Import questions from markdown (sample_questions.md layout), CSV or JSONL, skipping duplicates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='File to import')
+        parser.add_argument('--format', choices=sorted(READERS), help='File format (default: from the file extension)')
+        parser.add_argument('--course', type=str, help='Course code or name for rows without a course')
+        parser.add_argument('--subject', type=str, help='Subject for rows without one (created if missing)')
+        parser.add_argument('--created-by', type=str, help='Email of the question author (default: the course instructor or first admin)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Questions inserted per batch')
+        parser.add_argument('--error-report', type=str, help='Also write rejected rows to this CSV file')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the file without creating anything')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'File not found: {path}')
+        file_format = options['format'] or EXTENSIONS.get(path.suffix.lower())
+        if file_format is None:
+            raise CommandError('Cannot tell the file format from its extension; pass --format')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        default_course = None
+        if options['course']:
+            default_course = SubjectCache(create_subjects=False).course(options['course'])
+            if default_course is None:
+                raise CommandError(f'Unknown course: {options["course"]}')
+        created_by = self.get_author(options['created_by'], default_course)
+
+        error_file = open(options['error_report'], 'w', newline='') if options['error_report'] else None
+        error_writer = csv.writer(error_file) if error_file else None
+        if error_writer:
+            error_writer.writerow(['line', 'error'])
+
+        def on_error(line_number, message):
+            self.stderr.write(f'⚠️ line {line_number}: {message}')
+            if error_writer:
+                error_writer.writerow([line_number, message])
+
+        def on_batch(totals):
+            self.stdout.write(
+                f'📥 {totals["rows"]} rows: {totals["created"]} new, '
+                f'{totals["duplicates"]} duplicates, {totals["invalid"]} rejected'
+            )
+
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as handle:
+                totals = import_questions(
+                    READERS[file_format](handle),
+                    created_by,
+                    default_course=default_course,
+                    default_subject=options['subject'],
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                    on_error=on_error,
+                    on_batch=on_batch,
+                )
+        finally:
+            if error_file:
+                error_file.close()
+
+        action = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {action} {totals["rows"]} rows: {totals["created"]} new questions, '
+            f'{totals["duplicates"]} duplicates skipped, {totals["invalid"]} rejected'
+        ))
+
+    def get_author(self, email, course):
+        if email:
+            author = User.objects.filter(email=email).first()
+            if author is None:
+                raise CommandError(f'No user with email {email}')
+            return author
+        if course is not None and course.instructor_id:
+            return course.instructor
+        author = User.objects.filter(Q(user_type='admin') | Q(is_superuser=True)).order_by('id').first()
+        if author is None:
+            raise CommandError('No admin user to own the questions; pass --created-by')
+        return author
@@ -0,0 +1,49 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from exams.models import Exam
+from exams.provisioning import provision_exam, provision_upcoming_exams
+
+
+class Command(BaseCommand):
+    help = 'Pre-create exam attempts and question selections for enrolled students before an exam window opens'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, help='Provision a single exam by id')
+        parser.add_argument(
+            '--lead-minutes',
+            type=int,
+            default=15,
+            help='Provision active exams starting within this many minutes (ignored with --exam)'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Students per bulk insert')
+
+    def handle(self, *args, **options):
+        if options['exam']:
+            try:
+                exam = Exam.objects.get(id=options['exam'])
+            except Exam.DoesNotExist:
+                raise CommandError(f'Exam {options["exam"]} does not exist')
+            started = time.perf_counter()
+            created = provision_exam(exam, batch_size=options['batch_size'])
+            report = [{
+                'exam_id': exam.id,
+                'created': created,
+                'seconds': round(time.perf_counter() - started, 3),
+            }]
+        else:
+            report = provision_upcoming_exams(
+                lead_minutes=options['lead_minutes'],
+                batch_size=options['batch_size'],
+            )
+
+        if not report:
+            self.stdout.write('No exams to provision.')
+            return
+
+        for row in report:
+            rate = row['created'] / row['seconds'] if row['seconds'] else 0
+            self.stdout.write(
+                f"📋 Exam {row['exam_id']}: provisioned {row['created']} student(s) "
+                f"in {row['seconds']:.3f}s ({rate:.0f} students/s)"
+            )
+        self.stdout.write(self.style.SUCCESS('✅ Provisioning completed!'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from exams.grading import aggregate_finished_attempts
+from exams.models import Exam
+from exams.performance import rebuild_exam_performance
+
+
+class Command(BaseCommand):
+    help = 'Fold pending attempts, then recompute per-exam performance aggregates from finished attempts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, help='Rebuild a single exam by id')
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.all()
+        if options['exam']:
+            exams = exams.filter(id=options['exam'])
+
+        # Attempts finished since the last periodic fold would otherwise be left out
+        aggregate_finished_attempts()
+        for exam in exams:
+            performance = rebuild_exam_performance(exam)
+            self.stdout.write(f'📊 {exam.title}: {performance.attempt_count} attempt(s), mean {performance.mean_percentage}%')
+        self.stdout.write(self.style.SUCCESS('✅ Exam performance rebuilt!'))
@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from exams.models import Exam, Question
+from exams.question_stats import rebuild_question_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-question item statistics from stored answers and papers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, help='Only rebuild the questions in this exam\'s pool')
+
+    def handle(self, *args, **options):
+        questions = Question.objects.all()
+        if options['exam']:
+            exam = Exam.objects.filter(id=options['exam']).first()
+            if exam is None:
+                raise CommandError(f'Exam {options["exam"]} does not exist')
+            questions = questions.filter(examquestion__exam=exam)
+
+        started = time.perf_counter()
+        question_ids = list(questions.values_list('id', flat=True))
+        rebuild_question_stats(question_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Item statistics rebuilt for {len(question_ids)} question(s) in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from exams.models import Question
+from exams.search import install_search_index
+
+
+class Command(BaseCommand):
+    help = 'Create or repair the question full-text index and re-index every question'
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            self.stdout.write(f'ℹ️  {connection.vendor} has no full-text index; search uses icontains matching')
+            return
+
+        started = time.perf_counter()
+        install_search_index(connection)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Indexed {Question.objects.count()} question(s) in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from exams.models import Exam, Question
+from exams.regrade import regrade_exam, regrade_questions
+
+
+class Command(BaseCommand):
+    help = 'Re-grade stored answers and attempt scores after answer keys or marks changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, help='Re-grade every question in this exam\'s pool')
+        parser.add_argument('--question', type=int, action='append', help='Re-grade this question (repeatable)')
+
+    def handle(self, *args, **options):
+        if not options['exam'] and not options['question']:
+            raise CommandError('Pass --exam or --question')
+
+        started = time.perf_counter()
+        if options['exam']:
+            exam = Exam.objects.filter(id=options['exam']).first()
+            if exam is None:
+                raise CommandError(f'Exam {options["exam"]} does not exist')
+            answers, attempts, exams = regrade_exam(exam)
+        else:
+            missing = set(options['question']) - set(
+                Question.objects.filter(id__in=options['question']).values_list('id', flat=True)
+            )
+            if missing:
+                raise CommandError(f'Unknown question(s): {", ".join(map(str, sorted(missing)))}')
+            answers, attempts, exams = regrade_questions(options['question'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Re-graded in {time.perf_counter() - started:.1f}s: {answers} answer(s) corrected, '
+            f'{attempts} attempt(s) in {exams} exam(s) re-scored'
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.mail import drain_outbox
+from exams.models import Exam
+from exams.results import release_results, result_delivery_summary
+
+
+class Command(BaseCommand):
+    help = 'Release an exam\'s results and queue a result email for every student who finished it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, required=True, help='Exam whose results are released')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Emails rendered and queued per batch')
+        parser.add_argument('--send', action='store_true', help='Deliver the queued email now instead of leaving it to the outbox worker')
+
+    def handle(self, *args, **options):
+        exam = Exam.objects.filter(id=options['exam']).first()
+        if exam is None:
+            raise CommandError(f'Exam {options["exam"]} does not exist')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        queued = release_results(exam, chunk_size=options['chunk_size'])
+        self.stdout.write(f'📬 {queued} result email(s) queued for "{exam.title}"')
+
+        if options['send']:
+            sent, failed = drain_outbox()
+            self.stdout.write(f'📤 {sent} email(s) sent, {failed} failed (failures are retried by the outbox worker)')
+
+        summary = result_delivery_summary(exam)
+        self.stdout.write(
+            f'📊 Delivery: {summary["sent"]} sent, {summary["sending"]} sending, {summary["pending"]} pending, '
+            f'{summary["dead"]} failed permanently, {summary["not_queued"]} not queued'
+        )
+        self.stdout.write(self.style.SUCCESS('✅ Results released!'))
@@ -0,0 +1,277 @@
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+import requests
+from requests.adapters import HTTPAdapter
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.urls import reverse
+from core.profiling import percentile
+from exams.models import Exam, ExamAttempt
+
+User = get_user_model()
+
+ENDPOINTS = ['login_view', 'start_exam', 'take_exam', 'autosave_answers', 'take_exam (reload)', 'submit_exam']
+QUESTION_INPUT = re.compile(r'name="question_(\d+)"')
+ATTEMPT_URL = re.compile(r'/exams/([0-9a-f-]{36})/take/')
+
+
+class Command(BaseCommand):
+    help = 'Simulate an exam day against a running server and report latency, errors and database usage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, required=True, help='Exam the simulated students take')
+        parser.add_argument('--base-url', type=str, default='http://127.0.0.1:8000', help='Server to load')
+        parser.add_argument('--students', type=int, default=100, help='Number of simulated students')
+        parser.add_argument('--password', type=str, default='load-pass-123', help='Password shared by the students')
+        parser.add_argument(
+            '--curve',
+            choices=['burst', 'linear', 'poisson'],
+            default='linear',
+            help='Arrival curve of students over --ramp seconds'
+        )
+        parser.add_argument('--ramp', type=float, default=60.0, help='Seconds over which students arrive')
+        parser.add_argument('--think-time', type=float, default=2.0, help='Mean pause between a student\'s requests')
+        parser.add_argument('--autosaves', type=int, default=3, help='Autosaves per student before submitting')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Request timeout in seconds')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for arrivals and answers')
+
+    def handle(self, *args, **options):
+        exam = Exam.objects.filter(id=options['exam']).first()
+        if exam is None:
+            raise CommandError(f'Exam {options["exam"]} does not exist')
+        if not exam.is_active:
+            raise CommandError(f'Exam "{exam.title}" is not active')
+
+        # Enrolled students who have not started this exam yet (provisioned ones are fine)
+        emails = list(
+            User.objects.filter(
+                user_type='student',
+                is_active=True,
+                is_email_verified=True,
+                course_enrollments__course_id=exam.course_id,
+                course_enrollments__is_active=True,
+            ).exclude(
+                id__in=ExamAttempt.objects.filter(exam=exam).exclude(status='scheduled').values('student_id')
+            ).order_by('id').values_list('email', flat=True)[:options['students']]
+        )
+        if len(emails) < options['students']:
+            raise CommandError(
+                f'Only {len(emails)} eligible students for "{exam.title}"; '
+                f'generate more with generate_load_data or lower --students'
+            )
+
+        self.options = options
+        self.exam = exam
+        self.rng = random.Random(options['seed'])
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        offsets = self.arrival_offsets(len(emails))
+
+        self.stdout.write(
+            f'🚀 Simulating {len(emails)} students on "{exam.title}" '
+            f'({options["curve"]} arrivals over {options["ramp"]:.0f}s) against {options["base_url"]}'
+        )
+        stop_sampling = threading.Event()
+        connection_samples = []
+        sampler = threading.Thread(
+            target=self.sample_connections, args=(stop_sampling, connection_samples), daemon=True
+        )
+        sampler.start()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(emails)) as executor:
+            students = [
+                executor.submit(self.run_student, email, started + offset, random.Random(self.rng.random()))
+                for email, offset in zip(emails, offsets)
+            ]
+            finished = sum(1 for student in students if student.result())
+        elapsed = time.perf_counter() - started
+
+        stop_sampling.set()
+        sampler.join()
+        self.report(len(emails), finished, elapsed, connection_samples)
+
+    def arrival_offsets(self, count):
+        """Seconds after the start at which each student arrives"""
+        ramp = self.options['ramp']
+        if self.options['curve'] == 'burst':
+            return [0.0] * count
+        if self.options['curve'] == 'linear':
+            return [ramp * number / count for number in range(count)]
+        offsets = []
+        offset = 0.0
+        for _ in range(count):
+            offset += self.rng.expovariate(count / ramp)
+            offsets.append(offset)
+        return offsets
+
+    def run_student(self, email, start_at, rng):
+        """Walk one student through the exam. Returns True when they submitted."""
+        time.sleep(max(0.0, start_at - time.perf_counter()))
+        session = requests.Session()
+        session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+        def think():
+            time.sleep(rng.expovariate(1 / self.options['think_time']) if self.options['think_time'] > 0 else 0)
+
+        try:
+            # The login page sets the CSRF cookie
+            session.get(self.url(reverse('authentication:login')), timeout=self.options['timeout'])
+            response = self.request(session, 'login_view', 'post', reverse('authentication:login'), 302, data={
+                'email': email,
+                'password': self.options['password'],
+                'csrfmiddlewaretoken': session.cookies.get('csrftoken', ''),
+            })
+            if response is None:
+                return False
+            think()
+
+            response = self.request(session, 'start_exam', 'get', reverse('exams:start_exam', args=[self.exam.id]), 302)
+            if response is None:
+                return False
+            match = ATTEMPT_URL.search(response.headers.get('Location', ''))
+            if not match:
+                # Redirected elsewhere, e.g. back to the dashboard with an error
+                with self.lock:
+                    self.errors['start_exam (no attempt)'] += 1
+                return False
+            attempt_id = match.group(1)
+            take_url = reverse('exams:take_exam', args=[attempt_id])
+
+            response = self.request(session, 'take_exam', 'get', take_url, 200)
+            if response is None:
+                return False
+            question_ids = list(dict.fromkeys(QUESTION_INPUT.findall(response.text)))
+            answers = {question_id: rng.choice('ABCD') for question_id in question_ids}
+
+            # Answer the paper in a few autosaved slices, then reload the page
+            autosaves = max(1, self.options['autosaves'])
+            items = list(answers.items())
+            for number in range(autosaves):
+                think()
+                chunk = dict(items[number::autosaves])
+                self.request(session, 'autosave_answers', 'post', reverse('exams:autosave_answers', args=[attempt_id]), 200, json_body={'answers': chunk})
+            think()
+            self.request(session, 'take_exam (reload)', 'get', take_url, 200)
+            think()
+
+            response = self.request(session, 'submit_exam', 'post', reverse('exams:submit_exam', args=[attempt_id]), 200, json_body={'answers': answers})
+            return response is not None
+        finally:
+            session.close()
+
+    def url(self, path):
+        return urljoin(self.options['base_url'], path)
+
+    def request(self, session, endpoint, method, path, expected_status, data=None, json_body=None):
+        """Send one request and record it. Returns the response, or None on failure."""
+        headers = {'X-CSRFToken': session.cookies.get('csrftoken', ''), 'Referer': self.url(path)}
+        kwargs = {'headers': headers, 'allow_redirects': False, 'timeout': self.options['timeout']}
+        if data is not None:
+            kwargs['data'] = data
+        if json_body is not None:
+            kwargs['data'] = json.dumps(json_body)
+            headers['Content-Type'] = 'application/json'
+
+        with self.lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        started = time.perf_counter()
+        try:
+            response = session.request(method, self.url(path), **kwargs)
+        except requests.RequestException:
+            response = None
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self.lock:
+                self.in_flight -= 1
+
+        ok = response is not None and response.status_code == expected_status
+        self.record(endpoint, elapsed, ok, response)
+        return response if ok else None
+
+    def record(self, endpoint, elapsed, ok, response=None):
+        queries = db_time = None
+        if response is not None and 'X-DB-Queries' in response.headers:
+            queries = int(response.headers['X-DB-Queries'])
+            db_time = float(response.headers['X-DB-Time-Ms'])
+        with self.lock:
+            self.samples[endpoint].append((elapsed, ok, queries, db_time))
+
+    def sample_connections(self, stop, samples):
+        """Sample the server's open and active database connections once a second (PostgreSQL only)"""
+        if connection.vendor != 'postgresql':
+            return
+        try:
+            with connection.cursor() as cursor:
+                while not stop.is_set():
+                    # Excludes this sampler's own connection
+                    cursor.execute(
+                        "SELECT count(*), count(*) FILTER (WHERE state = 'active') "
+                        "FROM pg_stat_activity WHERE datname = current_database() AND pid <> pg_backend_pid()"
+                    )
+                    samples.append(cursor.fetchone())
+                    stop.wait(1.0)
+        finally:
+            connections.close_all()
+
+    def report(self, students, finished, elapsed, connection_samples):
+        self.stdout.write(self.style.SUCCESS('=== EXAM DAY SIMULATION ==='))
+        self.stdout.write(
+            f'{"Endpoint":<20} {"Requests":>8} {"Errors":>7} {"Error %":>8} {"p50 ms":>8} '
+            f'{"p95 ms":>8} {"p99 ms":>8} {"DB q/req":>9} {"DB ms/req":>10}'
+        )
+        total_requests = 0
+        total_errors = 0
+        for endpoint in ENDPOINTS:
+            samples = self.samples.get(endpoint)
+            if not samples:
+                continue
+            latencies = [sample[0] for sample in samples]
+            errors = sum(1 for sample in samples if not sample[1])
+            with_stats = [sample for sample in samples if sample[2] is not None]
+            if with_stats:
+                db_queries = f'{sum(sample[2] for sample in with_stats) / len(with_stats):.1f}'
+                db_time = f'{sum(sample[3] for sample in with_stats) / len(with_stats):.1f}'
+            else:
+                db_queries = db_time = 'n/a'
+            total_requests += len(samples)
+            total_errors += errors
+            self.stdout.write(
+                f'{endpoint:<20} {len(samples):>8} {errors:>7} {errors / len(samples) * 100:>7.1f}% '
+                f'{percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f} '
+                f'{percentile(latencies, 99):>8.1f} {db_queries:>9} {db_time:>10}'
+            )
+
+        self.stdout.write(
+            f'👥 {finished}/{students} students submitted in {elapsed:.1f}s, '
+            f'{total_requests / elapsed:.1f} requests/s, peak {self.peak_in_flight} requests in flight'
+        )
+        if connection_samples:
+            self.stdout.write(
+                f'🗄️  Database connections: peak {max(sample[0] for sample in connection_samples)} open, '
+                f'peak {max(sample[1] for sample in connection_samples)} active'
+            )
+        else:
+            self.stdout.write('🗄️  Database connection sampling needs PostgreSQL')
+        if not any(sample[2] is not None for samples in self.samples.values() for sample in samples):
+            self.stdout.write('ℹ️  Start the server with QUERY_STATS_HEADERS=True to see per-endpoint database usage')
+
+        for reason, count in self.errors.items():
+            total_errors += count
+            self.stdout.write(self.style.WARNING(f'⚠️ {reason}: {count}'))
+        if total_errors:
+            self.stdout.write(self.style.WARNING(f'⚠️ {total_errors} of {total_requests} requests failed'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ No failed requests'))
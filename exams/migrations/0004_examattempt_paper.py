@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0003_course_exam_course_question_course_subject_course_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examattempt',
+            name='paper',
+            field=models.JSONField(blank=True, default=list, help_text='Frozen, ordered question paper shown to the student'),
+        ),
+    ]
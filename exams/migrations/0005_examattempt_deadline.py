@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:33
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_deadlines(apps, schema_editor):
+    Exam = apps.get_model('exams', 'Exam')
+    ExamAttempt = apps.get_model('exams', 'ExamAttempt')
+    for exam_id, duration_minutes in Exam.objects.values_list('id', 'duration_minutes'):
+        ExamAttempt.objects.filter(exam_id=exam_id, deadline__isnull=True).update(
+            deadline=F('start_time') + timedelta(minutes=duration_minutes)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0004_examattempt_paper'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examattempt',
+            name='deadline',
+            field=models.DateTimeField(blank=True, help_text='When the attempt is automatically closed', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='examattempt',
+            index=models.Index(fields=['status', 'deadline'], name='exams_attempt_status_deadline'),
+        ),
+        migrations.RunPython(backfill_deadlines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0005_examattempt_deadline'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='examattempt',
+            name='start_time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='examattempt',
+            name='status',
+            field=models.CharField(choices=[('scheduled', 'Scheduled'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('timeout', 'Timeout'), ('cancelled', 'Cancelled')], default='in_progress', max_length=20),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0006_examattempt_scheduled'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamPerformance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('passed_count', models.PositiveIntegerField(default=0)),
+                ('score_total', models.PositiveBigIntegerField(default=0)),
+                ('percentage_total', models.FloatField(default=0)),
+                ('time_taken_total', models.PositiveBigIntegerField(default=0, help_text='Sum of time taken in minutes')),
+                ('score_counts', models.JSONField(default=dict, help_text='Number of attempts per score, for the median')),
+                ('histogram', models.JSONField(default=list, help_text='Number of attempts per 10% percentage band')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('exam', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='performance', to='exams.exam')),
+            ],
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:01
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def content_hash(question):
+    # Frozen copy of exams.models.question_content_hash
+    normalized = '\x1f'.join(
+        ' '.join(str(value).split()).casefold()
+        for value in (question.question_text, question.option_a, question.option_b, question.option_c, question.option_d)
+    )
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def backfill_content_hashes(apps, schema_editor):
+    Question = apps.get_model('exams', 'Question')
+    batch = []
+    for question in Question.objects.only(
+        'id', 'question_text', 'option_a', 'option_b', 'option_c', 'option_d'
+    ).iterator(chunk_size=2000):
+        question.content_hash = content_hash(question)
+        batch.append(question)
+        if len(batch) >= 2000:
+            Question.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+    if batch:
+        Question.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0007_examperformance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Hash of the normalized text and options, used to detect duplicates', max_length=64),
+        ),
+        migrations.RunPython(backfill_content_hashes, migrations.RunPython.noop),
+    ]
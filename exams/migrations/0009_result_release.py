@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_emailoutbox'),
+        ('exams', '0008_question_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='results_released_at',
+            field=models.DateTimeField(blank=True, help_text='When results were released to students', null=True),
+        ),
+        migrations.AddField(
+            model_name='examattempt',
+            name='result_email',
+            field=models.ForeignKey(blank=True, help_text='Queued result notification; its status is the delivery state', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.emailoutbox'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:24
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_marks(apps, schema_editor):
+    Exam = apps.get_model('exams', 'Exam')
+    ExamQuestion = apps.get_model('exams', 'ExamQuestion')
+    ExamAttempt = apps.get_model('exams', 'ExamAttempt')
+
+    pool_marks = ExamQuestion.objects.filter(
+        exam=OuterRef('pk')
+    ).order_by().values('exam').annotate(total=Sum('question__marks')).values('total')
+    Exam.objects.update(total_marks=Coalesce(Subquery(pool_marks), 0))
+
+    # Frozen papers carry each question's marks
+    batch = []
+    for attempt in ExamAttempt.objects.exclude(paper=[]).only('id', 'paper').iterator(chunk_size=2000):
+        attempt.max_score = sum(question['marks'] for question in attempt.paper)
+        batch.append(attempt)
+        if len(batch) >= 2000:
+            ExamAttempt.objects.bulk_update(batch, ['max_score'])
+            batch = []
+    if batch:
+        ExamAttempt.objects.bulk_update(batch, ['max_score'])
+
+    # Older attempts only have their selected questions
+    SelectedQuestion = ExamAttempt.selected_questions.through
+    selected_marks = SelectedQuestion.objects.filter(
+        examattempt=OuterRef('pk')
+    ).order_by().values('examattempt').annotate(total=Sum('question__marks')).values('total')
+    ExamAttempt.objects.filter(paper=[]).update(max_score=Coalesce(Subquery(selected_marks), 0))
+
+    # Attempts with neither (bulk generated data) fall back to the questions they answered
+    StudentAnswer = apps.get_model('exams', 'StudentAnswer')
+    answered_marks = StudentAnswer.objects.filter(
+        attempt=OuterRef('pk')
+    ).order_by().values('attempt').annotate(total=Sum('question__marks')).values('total')
+    ExamAttempt.objects.filter(max_score=0).update(max_score=Coalesce(Subquery(answered_marks), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0009_result_release'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examattempt',
+            name='max_score',
+            field=models.PositiveIntegerField(default=0, help_text="Marks available on this attempt's paper"),
+        ),
+        migrations.AlterField(
+            model_name='exam',
+            name='total_marks',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text="Sum of the marks of the exam's question pool, kept up to date automatically"),
+        ),
+        migrations.RunPython(backfill_marks, migrations.RunPython.noop),
+    ]
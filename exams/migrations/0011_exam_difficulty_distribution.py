@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0010_attempt_max_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='difficulty_distribution',
+            field=models.JSONField(blank=True, default=dict, help_text='Percentage of each attempt drawn per difficulty, e.g. {"easy": 30, "medium": 50, "hard": 20}. Leave empty to follow the mix of the question pool.'),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:45
+
+from django.db import migrations
+
+# The SQL is inlined so that this migration keeps working as exams.search
+# changes; exams.search.install_search_index creates the same objects.
+#
+# PostgreSQL: search_document is a stored generated column. The database
+# refuses to alter the type of a column a generated column is computed
+# from, so a later migration changing question_text, option_a-d or
+# explanation must drop search_document first (uninstall below) and add
+# it back afterwards (rebuild_search_index, or install below).
+#
+# SQLite: Django rebuilds the whole table for most AlterField operations,
+# which drops the triggers that keep exams_question_fts in sync. The
+# exams app re-installs them after every migrate (post_migrate, see
+# exams.search.repair_search_index).
+
+POSTGRES_INSTALL = [
+    "ALTER TABLE exams_question ADD COLUMN IF NOT EXISTS search_document tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(question_text, '')), 'A') || "
+    "setweight(to_tsvector('english', concat_ws(' ', option_a, option_b, option_c, option_d)), 'B') || "
+    "setweight(to_tsvector('english', coalesce(explanation, '')), 'C')"
+    ") STORED",
+    'CREATE INDEX IF NOT EXISTS exams_question_search_gin ON exams_question USING gin (search_document)',
+]
+POSTGRES_UNINSTALL = [
+    'DROP INDEX IF EXISTS exams_question_search_gin',
+    'ALTER TABLE exams_question DROP COLUMN IF EXISTS search_document',
+]
+
+SQLITE_COLUMNS = 'question_text, option_a, option_b, option_c, option_d, explanation'
+SQLITE_NEW = 'new.question_text, new.option_a, new.option_b, new.option_c, new.option_d, new.explanation'
+SQLITE_OLD = 'old.question_text, old.option_a, old.option_b, old.option_c, old.option_d, old.explanation'
+SQLITE_INSTALL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS exams_question_fts USING fts5({SQLITE_COLUMNS}, "
+    f"content='exams_question', content_rowid='id', tokenize='porter unicode61')",
+    f'CREATE TRIGGER IF NOT EXISTS exams_question_fts_ai AFTER INSERT ON exams_question BEGIN '
+    f'INSERT INTO exams_question_fts(rowid, {SQLITE_COLUMNS}) VALUES (new.id, {SQLITE_NEW}); END',
+    f'CREATE TRIGGER IF NOT EXISTS exams_question_fts_ad AFTER DELETE ON exams_question BEGIN '
+    f"INSERT INTO exams_question_fts(exams_question_fts, rowid, {SQLITE_COLUMNS}) "
+    f"VALUES ('delete', old.id, {SQLITE_OLD}); END",
+    f'CREATE TRIGGER IF NOT EXISTS exams_question_fts_au AFTER UPDATE ON exams_question BEGIN '
+    f"INSERT INTO exams_question_fts(exams_question_fts, rowid, {SQLITE_COLUMNS}) "
+    f"VALUES ('delete', old.id, {SQLITE_OLD}); "
+    f'INSERT INTO exams_question_fts(rowid, {SQLITE_COLUMNS}) VALUES (new.id, {SQLITE_NEW}); END',
+    # Index the rows already in the table
+    "INSERT INTO exams_question_fts(exams_question_fts) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS exams_question_fts_ai',
+    'DROP TRIGGER IF EXISTS exams_question_fts_ad',
+    'DROP TRIGGER IF EXISTS exams_question_fts_au',
+    'DROP TABLE IF EXISTS exams_question_fts',
+]
+
+STATEMENTS = {
+    'postgresql': (POSTGRES_INSTALL, POSTGRES_UNINSTALL),
+    'sqlite': (SQLITE_INSTALL, SQLITE_UNINSTALL),
+}
+
+
+def _run(schema_editor, which):
+    # Other databases have no full-text index; search falls back to icontains
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    if statements:
+        for statement in statements[which]:
+            schema_editor.execute(statement, params=None)
+
+
+def install(apps, schema_editor):
+    _run(schema_editor, 0)
+
+
+def uninstall(apps, schema_editor):
+    _run(schema_editor, 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0011_exam_difficulty_distribution'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0012_question_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('open', 'Open'), ('merged', 'Merged'), ('dismissed', 'Dismissed')], db_index=True, default='open', max_length=10)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('similarity', models.FloatField(default=0, help_text='Lowest estimated similarity of a member to the first question')),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('canonical', models.ForeignKey(blank=True, help_text='Question the duplicates were merged into', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='exams.question')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DuplicateClusterMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('similarity', models.FloatField(default=1, help_text="Estimated Jaccard similarity to the cluster's first question")),
+                ('cluster', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members', to='exams.duplicatecluster')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_memberships', to='exams.question')),
+            ],
+            options={
+                'ordering': ['question_id'],
+                'unique_together': {('cluster', 'question')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0013_duplicate_clusters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('served_count', models.PositiveIntegerField(default=0, help_text='Papers the question was drawn for')),
+                ('answered_count', models.PositiveIntegerField(default=0)),
+                ('correct_count', models.PositiveIntegerField(default=0)),
+                ('option_a_count', models.PositiveIntegerField(default=0)),
+                ('option_b_count', models.PositiveIntegerField(default=0)),
+                ('option_c_count', models.PositiveIntegerField(default=0)),
+                ('option_d_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('score_squares', models.FloatField(default=0)),
+                ('correct_score_sum', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='exams.question')),
+            ],
+            options={
+                'verbose_name_plural': 'question stats',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0014_question_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamAnalysisReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('psychometrics', 'Psychometrics')], max_length=20)),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('report', models.JSONField(default=dict)),
+                ('duration_ms', models.PositiveIntegerField(default=0, help_text='Time the analysis took')),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analysis_reports', to='exams.exam')),
+            ],
+            options={
+                'unique_together': {('exam', 'kind')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0015_exam_analysis_report'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='examanalysisreport',
+            name='kind',
+            field=models.CharField(choices=[('psychometrics', 'Psychometrics'), ('collusion', 'Answer-pattern collusion')], max_length=20),
+        ),
+    ]
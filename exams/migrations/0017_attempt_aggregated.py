@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_finished_attempts(apps, schema_editor):
+    # Attempts finished so far were folded into the aggregates when graded
+    ExamAttempt = apps.get_model('exams', 'ExamAttempt')
+    ExamAttempt.objects.filter(status__in=('completed', 'timeout')).update(aggregated=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_emailoutbox'),
+        ('exams', '0016_exam_analysis_collusion_kind'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examattempt',
+            name='aggregated',
+            field=models.BooleanField(default=False, help_text="Folded into the exam's performance aggregates"),
+        ),
+        migrations.RunPython(mark_finished_attempts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='examattempt',
+            index=models.Index(condition=models.Q(('aggregated', False)), fields=['status'], name='exams_attempt_unaggregated'),
+        ),
+    ]
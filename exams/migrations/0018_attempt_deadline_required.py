@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:35
+
+from datetime import timedelta
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_deadlines(apps, schema_editor):
+    # Started attempts created before deadlines were stored close when their exam's duration runs out
+    ExamAttempt = apps.get_model('exams', 'ExamAttempt')
+    attempts = ExamAttempt.objects.filter(deadline__isnull=True).exclude(status='scheduled')
+    while True:
+        batch = list(attempts.select_related('exam').only('id', 'start_time', 'exam__duration_minutes')[:1000])
+        if not batch:
+            break
+        for attempt in batch:
+            attempt.deadline = attempt.start_time + timedelta(minutes=attempt.exam.duration_minutes)
+        ExamAttempt.objects.bulk_update(batch, ['deadline'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0017_attempt_aggregated'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_deadlines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='examattempt',
+            constraint=models.CheckConstraint(condition=models.Q(('status', 'scheduled'), ('deadline__isnull', False), _connector='OR'), name='exams_attempt_started_has_deadline'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:52
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def recount_served(apps, schema_editor):
+    # Papers used to be counted as served when drawn; they are now counted
+    # when their attempt is folded, so drop the papers of unfolded attempts
+    ExamAttempt = apps.get_model('exams', 'ExamAttempt')
+    QuestionStats = apps.get_model('exams', 'QuestionStats')
+    SelectedQuestion = ExamAttempt.selected_questions.through
+    served = (
+        SelectedQuestion.objects.filter(
+            question_id=models.OuterRef('question_id'),
+            examattempt__status__in=('completed', 'timeout'),
+            examattempt__aggregated=True,
+        )
+        .order_by().values('question_id').annotate(count=models.Count('id')).values('count')
+    )
+    QuestionStats.objects.update(served_count=Coalesce(models.Subquery(served), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0018_attempt_deadline_required'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='questionstats',
+            name='served_count',
+            field=models.PositiveIntegerField(default=0, help_text='Finished papers the question was on'),
+        ),
+        migrations.RunPython(recount_served, migrations.RunPython.noop),
+    ]
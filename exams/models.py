@@ -1,8 +1,21 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.functions import Coalesce
+import hashlib
 import uuid
 
+
+def question_content_hash(question_text, option_a, option_b, option_c, option_d):
+    """SHA-256 of a question's text and options, ignoring case and whitespace differences"""
+    normalized = '\x1f'.join(
+        ' '.join(str(value).split()).casefold()
+        for value in (question_text, option_a, option_b, option_c, option_d)
+    )
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
 class Course(models.Model):
     """N-TECH training courses"""
     COURSE_CHOICES = [
@@ -74,6 +87,13 @@ class Question(models.Model):
     difficulty = models.CharField(max_length=10, choices=DIFFICULTY_CHOICES, default='medium')
     marks = models.PositiveIntegerField(default=1)
     explanation = models.TextField(blank=True, help_text="Explanation for the correct answer")
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        editable=False,
+        help_text="Hash of the normalized text and options, used to detect duplicates"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     
@@ -81,6 +101,11 @@ class Question(models.Model):
         course_name = self.course.name if self.course else "No Course"
         return f"{course_name} - {self.subject.name} - {self.question_text[:50]}..."
     
+    def compute_content_hash(self):
+        return question_content_hash(
+            self.question_text, self.option_a, self.option_b, self.option_c, self.option_d
+        )
+    
     def save(self, *args, **kwargs):
         # Auto-assign course from subject if not provided
         if not self.course and self.subject:
@@ -88,6 +113,10 @@ class Question(models.Model):
         # Ensure subject belongs to the same course
         if self.subject and self.course and self.subject.course != self.course:
             raise ValueError("Subject must belong to the same course")
+        self.content_hash = self.compute_content_hash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content_hash' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'content_hash']
         super().save(*args, **kwargs)
 
 class Exam(models.Model):
@@ -97,7 +126,10 @@ class Exam(models.Model):
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
     questions = models.ManyToManyField(Question, through='ExamQuestion')
     duration_minutes = models.PositiveIntegerField(help_text="Duration in minutes")
-    total_marks = models.PositiveIntegerField(default=0)
+    total_marks = models.PositiveIntegerField(
+        default=0, editable=False,
+        help_text="Sum of the marks of the exam's question pool, kept up to date automatically"
+    )
     is_active = models.BooleanField(default=False)
     start_time = models.DateTimeField(blank=True, null=True)
     end_time = models.DateTimeField(blank=True, null=True)
@@ -106,7 +138,13 @@ class Exam(models.Model):
         default=10, 
         help_text="Number of questions to randomly display to students. Leave blank to use all questions."
     )
+    difficulty_distribution = models.JSONField(
+        default=dict, blank=True,
+        help_text='Percentage of each attempt drawn per difficulty, e.g. {"easy": 30, "medium": 50, "hard": 20}. '
+                  'Leave empty to follow the mix of the question pool.'
+    )
     show_results_immediately = models.BooleanField(default=False)
+    results_released_at = models.DateTimeField(blank=True, null=True, help_text="When results were released to students")
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -114,6 +152,24 @@ class Exam(models.Model):
         course_name = self.course.name if self.course else "No Course"
         return f"{course_name} - {self.title}"
     
+    def clean(self):
+        super().clean()
+        distribution = self.difficulty_distribution
+        if not distribution:
+            return
+        difficulties = dict(Question.DIFFICULTY_CHOICES)
+        if not isinstance(distribution, dict):
+            raise ValidationError({'difficulty_distribution': 'Must map difficulties to percentages.'})
+        unknown = sorted(set(distribution) - set(difficulties))
+        if unknown:
+            raise ValidationError({
+                'difficulty_distribution': f"Unknown difficulties: {', '.join(unknown)}. Use {', '.join(difficulties)}."
+            })
+        if any(not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0 for value in distribution.values()):
+            raise ValidationError({'difficulty_distribution': 'Percentages must be non-negative numbers.'})
+        if sum(distribution.values()) != 100:
+            raise ValidationError({'difficulty_distribution': 'Percentages must add up to 100.'})
+    
     def save(self, *args, **kwargs):
         # Auto-assign course from subject if not provided
         if not self.course and self.subject:
@@ -122,6 +178,11 @@ class Exam(models.Model):
         if self.subject and self.course and self.subject.course != self.course:
             raise ValueError("Subject must belong to the same course")
         super().save(*args, **kwargs)
+    
+    @property
+    def results_available(self):
+        """Students may see their scores once results are released, or straight away if the exam allows it"""
+        return self.show_results_immediately or self.results_released_at is not None
 
 class ExamQuestion(models.Model):
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE)
@@ -132,8 +193,18 @@ class ExamQuestion(models.Model):
         unique_together = ('exam', 'question')
         ordering = ['order']
 
+def refresh_total_marks(exam_ids):
+    """Recompute Exam.total_marks from the exams' question pools in one UPDATE"""
+    pool_marks = ExamQuestion.objects.filter(
+        exam=models.OuterRef('pk')
+    ).order_by().values('exam').annotate(total=models.Sum('question__marks')).values('total')
+    Exam.objects.filter(id__in=set(exam_ids)).update(
+        total_marks=Coalesce(models.Subquery(pool_marks), 0)
+    )
+
 class ExamAttempt(models.Model):
     STATUS_CHOICES = [
+        ('scheduled', 'Scheduled'),
         ('in_progress', 'In Progress'),
         ('completed', 'Completed'),
         ('timeout', 'Timeout'),
@@ -144,19 +215,46 @@ class ExamAttempt(models.Model):
     student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE)
     selected_questions = models.ManyToManyField(Question, blank=True, help_text="Questions randomly selected for this attempt")
-    start_time = models.DateTimeField(auto_now_add=True)
+    paper = models.JSONField(default=list, blank=True, help_text="Frozen, ordered question paper shown to the student")
+    start_time = models.DateTimeField(default=timezone.now)
     end_time = models.DateTimeField(blank=True, null=True)
+    # Set when the attempt starts; only scheduled attempts have none (see constraints)
+    deadline = models.DateTimeField(blank=True, null=True, help_text="When the attempt is automatically closed")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='in_progress')
     score = models.PositiveIntegerField(default=0)
     total_questions = models.PositiveIntegerField(default=0)
     correct_answers = models.PositiveIntegerField(default=0)
     time_taken_minutes = models.PositiveIntegerField(default=0)
+    max_score = models.PositiveIntegerField(default=0, help_text="Marks available on this attempt's paper")
+    result_email = models.ForeignKey(
+        'core.EmailOutbox', on_delete=models.SET_NULL, blank=True, null=True, related_name='+',
+        help_text="Queued result notification; its status is the delivery state"
+    )
+    aggregated = models.BooleanField(default=False, help_text="Folded into the exam's performance aggregates")
     
     class Meta:
         unique_together = ('student', 'exam')
+        indexes = [
+            models.Index(fields=['status', 'deadline'], name='exams_attempt_status_deadline'),
+            # Finished attempts waiting for aggregate_finished_attempts
+            models.Index(fields=['status'], condition=models.Q(aggregated=False), name='exams_attempt_unaggregated'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(status='scheduled') | models.Q(deadline__isnull=False),
+                name='exams_attempt_started_has_deadline',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.student.email} - {self.exam.title} - {self.status}"
+    
+    @property
+    def percentage(self):
+        """Score as a percentage of the marks available on this attempt's paper"""
+        if not self.max_score:
+            return 0
+        return round(self.score * 100 / self.max_score, 2)
 
 class StudentAnswer(models.Model):
     attempt = models.ForeignKey(ExamAttempt, on_delete=models.CASCADE, related_name='answers')
@@ -174,5 +272,155 @@ class StudentAnswer(models.Model):
         unique_together = ('attempt', 'question')
     
     def save(self, *args, **kwargs):
-        self.is_correct = (self.selected_answer == self.question.correct_answer)
+        from .answer_key import answer_key_for  # answer_key imports this module
+        answer_key = answer_key_for(self.attempt.exam_id, [self.question_id])
+        self.is_correct = self.selected_answer == answer_key[self.question_id][0]
         super().save(*args, **kwargs)
+
+class ExamPerformance(models.Model):
+    """Running aggregates over the finished attempts of an exam"""
+    HISTOGRAM_BINS = 10
+    PASS_PERCENTAGE = 50
+    
+    exam = models.OneToOneField(Exam, on_delete=models.CASCADE, related_name='performance')
+    attempt_count = models.PositiveIntegerField(default=0)
+    passed_count = models.PositiveIntegerField(default=0)
+    score_total = models.PositiveBigIntegerField(default=0)
+    percentage_total = models.FloatField(default=0)
+    time_taken_total = models.PositiveBigIntegerField(default=0, help_text="Sum of time taken in minutes")
+    score_counts = models.JSONField(default=dict, help_text="Number of attempts per score, for the median")
+    histogram = models.JSONField(default=list, help_text="Number of attempts per 10% percentage band")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.exam.title} - {self.attempt_count} attempts"
+    
+    @property
+    def mean_score(self):
+        return round(self.score_total / self.attempt_count, 2) if self.attempt_count else 0
+    
+    @property
+    def median_score(self):
+        if not self.attempt_count:
+            return 0
+        scores = sorted((int(score), count) for score, count in self.score_counts.items())
+        lower, upper = (self.attempt_count - 1) // 2, self.attempt_count // 2
+        seen = 0
+        median = []
+        for score, count in scores:
+            for position in (lower, upper):
+                if seen <= position < seen + count:
+                    median.append(score)
+            seen += count
+        return sum(median) / len(median)
+    
+    @property
+    def mean_percentage(self):
+        return round(self.percentage_total / self.attempt_count, 2) if self.attempt_count else 0
+    
+    @property
+    def pass_rate(self):
+        return round(self.passed_count / self.attempt_count * 100, 2) if self.attempt_count else 0
+    
+    @property
+    def mean_time_taken(self):
+        return round(self.time_taken_total / self.attempt_count, 1) if self.attempt_count else 0
+
+class QuestionStats(models.Model):
+    """
+    Running item statistics of a question over the finished attempts that
+    answered it. score_sum, score_squares and correct_score_sum hold the
+    attempts' percentages, so the discrimination index can be derived
+    without rescanning answers.
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='stats')
+    served_count = models.PositiveIntegerField(default=0, help_text="Finished papers the question was on")
+    answered_count = models.PositiveIntegerField(default=0)
+    correct_count = models.PositiveIntegerField(default=0)
+    option_a_count = models.PositiveIntegerField(default=0)
+    option_b_count = models.PositiveIntegerField(default=0)
+    option_c_count = models.PositiveIntegerField(default=0)
+    option_d_count = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    score_squares = models.FloatField(default=0)
+    correct_score_sum = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'question stats'
+    
+    def __str__(self):
+        return f"Stats of question {self.question_id}"
+    
+    @property
+    def facility(self):
+        """Share of answers that were correct (classical p-value), or None before any answer"""
+        return round(self.correct_count / self.answered_count, 3) if self.answered_count else None
+    
+    @property
+    def discrimination(self):
+        """Point-biserial correlation of answering correctly with the attempt percentage"""
+        n, correct = self.answered_count, self.correct_count
+        spread = (n * correct - correct ** 2) * (n * self.score_squares - self.score_sum ** 2)
+        if spread <= 0:
+            return None
+        return round((n * self.correct_score_sum - correct * self.score_sum) / spread ** 0.5, 3)
+    
+    @property
+    def option_distribution(self):
+        return {
+            'A': self.option_a_count,
+            'B': self.option_b_count,
+            'C': self.option_c_count,
+            'D': self.option_d_count,
+        }
+
+class DuplicateCluster(models.Model):
+    """Group of questions detected as near-duplicates, awaiting review"""
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('merged', 'Merged'),
+        ('dismissed', 'Dismissed'),
+    ]
+    
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open', db_index=True)
+    size = models.PositiveIntegerField(default=0)
+    similarity = models.FloatField(default=0, help_text="Lowest estimated similarity of a member to the first question")
+    canonical = models.ForeignKey(
+        Question, on_delete=models.SET_NULL, blank=True, null=True, related_name='+',
+        help_text="Question the duplicates were merged into"
+    )
+    detected_at = models.DateTimeField(auto_now_add=True)
+    resolved_at = models.DateTimeField(blank=True, null=True)
+    
+    def __str__(self):
+        return f"Duplicate cluster {self.id} ({self.size} questions, {self.status})"
+
+class DuplicateClusterMember(models.Model):
+    cluster = models.ForeignKey(DuplicateCluster, on_delete=models.CASCADE, related_name='members')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='duplicate_memberships')
+    similarity = models.FloatField(default=1, help_text="Estimated Jaccard similarity to the cluster's first question")
+    
+    class Meta:
+        unique_together = ('cluster', 'question')
+        ordering = ['question_id']
+
+class ExamAnalysisReport(models.Model):
+    """Latest result of an offline analysis of an exam's finished attempts"""
+    KIND_CHOICES = [
+        ('psychometrics', 'Psychometrics'),
+        ('collusion', 'Answer-pattern collusion'),
+    ]
+    
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='analysis_reports')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    attempt_count = models.PositiveIntegerField(default=0)
+    report = models.JSONField(default=dict)
+    duration_ms = models.PositiveIntegerField(default=0, help_text="Time the analysis took")
+    generated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('exam', 'kind')
+    
+    def __str__(self):
+        return f"{self.exam.title} - {self.get_kind_display()} ({self.attempt_count} attempts)"
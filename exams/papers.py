@@ -0,0 +1,47 @@
+import random
+
+# Question fields a candidate is allowed to see while taking the exam.
+# correct_answer and explanation are deliberately left out.
+PAPER_FIELDS = (
+    'id',
+    'question_text',
+    'option_a',
+    'option_b',
+    'option_c',
+    'option_d',
+    'marks',
+)
+
+
+def build_paper(questions, shuffle=False):
+    """Serialize questions into the ordered paper rendered for one attempt"""
+    paper = [
+        {field: getattr(question, field) for field in PAPER_FIELDS}
+        for question in questions
+    ]
+    if shuffle:
+        random.shuffle(paper)
+    return paper
+
+
+def paper_max_score(paper):
+    """Marks available on a built paper"""
+    return sum(question['marks'] for question in paper)
+
+
+def get_paper(attempt):
+    """
+    Return the frozen paper of an attempt.
+
+    Attempts started before papers were frozen are snapshotted on first
+    access so later reloads render from the attempt row alone.
+    """
+    if not attempt.paper:
+        attempt.paper = build_paper(
+            attempt.selected_questions.all(),
+            shuffle=attempt.exam.randomize_questions,
+        )
+        attempt.max_score = paper_max_score(attempt.paper)
+        attempt.save(update_fields=['paper', 'max_score'])
+    return attempt.paper
+
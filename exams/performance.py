@@ -0,0 +1,132 @@
+"""
+Per-exam performance aggregates.
+
+Finished attempts are folded into their exam's ExamPerformance row by a
+periodic task (grading.aggregate_finished_attempts), not by the grading
+transaction, so submissions of the same exam never wait on its row.
+Instructor pages read one row per exam instead of scanning attempts.
+An attempt's aggregated flag records whether it has been folded in;
+rebuild_exam_performance recomputes a row from the folded attempts.
+"""
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Case, Count, ExpressionWrapper, F, FloatField, Sum, Value, When
+from django.db.models.functions import Floor, Least
+from django.db.models.lookups import GreaterThanOrEqual
+from .models import ExamAttempt, ExamPerformance
+
+FINISHED_STATUSES = ('completed', 'timeout')
+
+
+# SQL counterpart of attempt_percentage, for aggregating in the database
+PERCENTAGE = Case(
+    When(
+        max_score__gt=0,
+        then=ExpressionWrapper(F('score') * 100.0 / F('max_score'), output_field=FloatField()),
+    ),
+    default=Value(0.0),
+    output_field=FloatField(),
+)
+
+
+def attempt_percentage(attempt):
+    """Score as a percentage of the marks on the attempt's paper (unrounded)"""
+    if not attempt.max_score:
+        return 0
+    return attempt.score * 100 / attempt.max_score
+
+
+def _histogram_bin(percentage):
+    return min(int(percentage // 10), ExamPerformance.HISTOGRAM_BINS - 1)
+
+
+def _add(performance, score, percentage, time_taken):
+    if len(performance.histogram) != ExamPerformance.HISTOGRAM_BINS:
+        performance.histogram = [0] * ExamPerformance.HISTOGRAM_BINS
+    performance.attempt_count += 1
+    performance.score_total += score
+    performance.percentage_total += percentage
+    performance.time_taken_total += time_taken
+    if percentage >= ExamPerformance.PASS_PERCENTAGE:
+        performance.passed_count += 1
+    performance.score_counts[str(score)] = performance.score_counts.get(str(score), 0) + 1
+    performance.histogram[_histogram_bin(percentage)] += 1
+
+
+def lock_performance(exam_ids):
+    """
+    {exam_id: ExamPerformance} for the exams, created if missing and
+    locked for update. Rows are always locked in exam_id order, so
+    concurrent callers cannot deadlock.
+    """
+    exam_ids = sorted(set(exam_ids))
+    ExamPerformance.objects.bulk_create(
+        [ExamPerformance(exam_id=exam_id) for exam_id in exam_ids], ignore_conflicts=True
+    )
+    return {
+        performance.exam_id: performance
+        for performance in ExamPerformance.objects.select_for_update().filter(exam_id__in=exam_ids).order_by('exam_id')
+    }
+
+
+def record_finished_attempts(attempts, performances):
+    """Fold finished attempts into their exams' aggregates, as locked by lock_performance"""
+    by_exam = defaultdict(list)
+    for attempt in attempts:
+        by_exam[attempt.exam_id].append(attempt)
+
+    for exam_id, exam_attempts in sorted(by_exam.items()):
+        performance = performances[exam_id]
+        for attempt in exam_attempts:
+            _add(
+                performance,
+                attempt.score,
+                attempt_percentage(attempt),
+                attempt.time_taken_minutes,
+            )
+        performance.save()
+
+
+def rebuild_exam_performance(exam):
+    """
+    Recompute an exam's aggregates from its finished attempts that have
+    been folded in (those still pending are added by the next fold).
+
+    Everything is aggregated in the database (three grouped queries), so
+    the cost does not depend on loading attempts into Python. The row is
+    locked like a fold would, so the two cannot interleave.
+    """
+    with transaction.atomic():
+        performance = lock_performance([exam.id])[exam.id]
+        _rebuild(performance, exam)
+    return performance
+
+
+def _rebuild(performance, exam):
+    finished = ExamAttempt.objects.filter(exam=exam, status__in=FINISHED_STATUSES, aggregated=True)
+
+    totals = finished.aggregate(
+        attempt_count=Count('id'),
+        passed_count=Count('id', filter=GreaterThanOrEqual(PERCENTAGE, ExamPerformance.PASS_PERCENTAGE)),
+        score_total=Sum('score'),
+        percentage_total=Sum(PERCENTAGE),
+        time_taken_total=Sum('time_taken_minutes'),
+    )
+    performance.attempt_count = totals['attempt_count']
+    performance.passed_count = totals['passed_count']
+    performance.score_total = totals['score_total'] or 0
+    performance.percentage_total = float(totals['percentage_total'] or 0)
+    performance.time_taken_total = totals['time_taken_total'] or 0
+
+    performance.score_counts = {
+        str(score): count
+        for score, count in finished.values('score').annotate(count=Count('id')).values_list('score', 'count')
+    }
+    performance.histogram = [0] * ExamPerformance.HISTOGRAM_BINS
+    bands = finished.annotate(
+        band=Least(Floor(PERCENTAGE / 10.0), Value(ExamPerformance.HISTOGRAM_BINS - 1.0))
+    ).values('band').annotate(count=Count('id')).values_list('band', 'count')
+    for band, count in bands:
+        performance.histogram[int(band)] += count
+
+    performance.save()
@@ -0,0 +1,143 @@
+import time
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from authentication.models import CourseEnrollment
+from core.statistics import adjust_counter
+from .availability import invalidate_students
+from .models import Exam, ExamAttempt
+from .papers import PAPER_FIELDS, build_paper, paper_max_score
+from .selection import SelectedQuestion, select_question_ids
+
+
+def provision_exam(exam, batch_size=1000):
+    """
+    Pre-create scheduled attempts for every actively enrolled student.
+
+    The question pool is loaded once and each student's questions are
+    drawn from the cached id strata, then attempts (with their frozen
+    paper) and their question selections are written with chunked bulk
+    inserts. Students who already have an attempt are skipped, so running
+    it again is safe. Returns the number of attempts created.
+    """
+    pool = exam.questions.only(*PAPER_FIELDS).in_bulk()
+    if not pool:
+        return 0
+
+    student_ids = CourseEnrollment.objects.filter(
+        course_id=exam.course_id,
+        is_active=True,
+        student__user_type='student',
+        student__is_active=True,
+    ).exclude(
+        student_id__in=ExamAttempt.objects.filter(exam=exam).values('student_id')
+    ).values_list('student_id', flat=True)
+
+    created = 0
+    batch = []
+    for student_id in student_ids.iterator(chunk_size=batch_size):
+        batch.append(student_id)
+        if len(batch) >= batch_size:
+            created += _provision_batch(exam, pool, batch)
+            batch = []
+    if batch:
+        created += _provision_batch(exam, pool, batch)
+    return created
+
+
+def _provision_batch(exam, pool, student_ids):
+    attempts = []
+    selections = {}
+    for student_id in student_ids:
+        question_ids = select_question_ids(exam.id, exam.questions_to_display, exam.difficulty_distribution)
+        questions = [pool[question_id] for question_id in question_ids if question_id in pool]
+        paper = build_paper(questions, shuffle=exam.randomize_questions)
+        attempt = ExamAttempt(
+            student_id=student_id,
+            exam=exam,
+            status='scheduled',
+            total_questions=len(questions),
+            max_score=paper_max_score(paper),
+            paper=paper,
+        )
+        attempts.append(attempt)
+        selections[attempt.id] = questions
+
+    with transaction.atomic():
+        ExamAttempt.objects.bulk_create(attempts, ignore_conflicts=True)
+        # Students who started the exam meanwhile keep their own attempt
+        created_ids = set(
+            ExamAttempt.objects.filter(
+                id__in=selections.keys()
+            ).values_list('id', flat=True)
+        )
+        selected = [
+            SelectedQuestion(examattempt_id=attempt_id, question_id=question.id)
+            for attempt_id in created_ids
+            for question in selections[attempt_id]
+        ]
+        SelectedQuestion.objects.bulk_create(selected)
+    return len(created_ids)
+
+
+def provision_upcoming_exams(lead_minutes=15, batch_size=1000):
+    """Provision attempts for active exams whose window opens within lead_minutes"""
+    now = timezone.now()
+    exams = Exam.objects.filter(
+        is_active=True,
+        start_time__gt=now,
+        start_time__lte=now + timedelta(minutes=lead_minutes),
+    )
+
+    report = []
+    for exam in exams:
+        started = time.perf_counter()
+        created = provision_exam(exam, batch_size=batch_size)
+        report.append({
+            'exam_id': exam.id,
+            'created': created,
+            'seconds': round(time.perf_counter() - started, 3),
+        })
+    return report
+
+
+def open_provisioned_attempt(student, exam_id):
+    """
+    Start a provisioned attempt with one indexed lookup and one update.
+
+    Returns (attempt, opened): the student's attempt for the active exam,
+    or None when there is none, and whether this call started it. A
+    scheduled attempt of a student no longer actively enrolled in the
+    course is not opened and None is returned, so the caller's enrollment
+    check turns them away as for any other exam.
+    """
+    attempt = ExamAttempt.objects.filter(
+        student=student,
+        exam_id=exam_id,
+        exam__is_active=True,
+    ).annotate(
+        enrolled=Exists(CourseEnrollment.objects.filter(
+            student=student, course_id=OuterRef('exam__course_id'), is_active=True,
+        )),
+    ).select_related('exam').first()
+    if attempt is None or attempt.status != 'scheduled':
+        return attempt, False
+    if not attempt.enrolled:
+        return None, False
+
+    now = timezone.now()
+    deadline = now + timedelta(minutes=attempt.exam.duration_minutes)
+    opened = ExamAttempt.objects.filter(pk=attempt.pk, status='scheduled').update(
+        status='in_progress',
+        start_time=now,
+        deadline=deadline,
+    )
+    if opened:
+        # Queryset updates bypass signals; count the attempt as started
+        adjust_counter('total_attempts', 1)
+        invalidate_students([student.id])
+        attempt.status = 'in_progress'
+        attempt.start_time = now
+        attempt.deadline = deadline
+    return attempt, bool(opened)
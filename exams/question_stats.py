@@ -0,0 +1,185 @@
+"""
+Per-question item statistics.
+
+QuestionStats rows are updated by the same periodic fold as the exam
+aggregates (grading.aggregate_finished_attempts), never by starting or
+submitting an attempt, so candidates do not queue on the rows of the
+questions they share. Each finished attempt counts its paper's questions
+as served and adds its answers (count, correctness, chosen option) and
+its percentage sums for the discrimination index. Each update is a
+single UPDATE adding per-question deltas with CASE expressions (one
+branch per distinct delta), so the cost does not depend on how many
+answers a question already has, and reading a question's statistics is
+one row. rebuild_question_stats recomputes rows from the folded attempts,
+e.g. after re-grading.
+"""
+from collections import Counter, defaultdict
+from django.db import transaction
+from django.db.models import Case, Count, ExpressionWrapper, F, FloatField, Q, Sum, Value, When
+from django.utils import timezone
+from .models import ExamAttempt, QuestionStats, StudentAnswer
+from .performance import FINISHED_STATUSES, attempt_percentage
+
+SelectedQuestion = ExamAttempt.selected_questions.through
+
+OPTION_FIELDS = {
+    'A': 'option_a_count',
+    'B': 'option_b_count',
+    'C': 'option_c_count',
+    'D': 'option_d_count',
+}
+ANSWER_FIELDS = (
+    'answered_count', 'correct_count', *OPTION_FIELDS.values(),
+    'score_sum', 'score_squares', 'correct_score_sum',
+)
+
+# Questions per UPDATE, to keep the CASE expressions bounded
+UPDATE_CHUNK = 200
+
+# PERCENTAGE of the answer's attempt, for aggregating over answers
+ANSWER_PERCENTAGE = Case(
+    When(
+        attempt__max_score__gt=0,
+        then=ExpressionWrapper(F('attempt__score') * 100.0 / F('attempt__max_score'), output_field=FloatField()),
+    ),
+    default=Value(0.0),
+    output_field=FloatField(),
+)
+
+
+def _update(deltas, question_ids, now):
+    updates = {}
+    for field in {field for question_id in question_ids for field in deltas[question_id]}:
+        # One branch per distinct delta: a single submission adds the same
+        # values to most of its questions
+        by_delta = defaultdict(list)
+        for question_id in question_ids:
+            if deltas[question_id].get(field):
+                by_delta[deltas[question_id][field]].append(question_id)
+        output_field = QuestionStats._meta.get_field(field)
+        updates[field] = F(field) + Case(
+            *[When(question_id__in=ids, then=Value(delta)) for delta, ids in by_delta.items()],
+            default=Value(output_field.to_python(0)),
+            output_field=output_field,
+        )
+    return QuestionStats.objects.filter(question_id__in=question_ids).update(updated_at=now, **updates)
+
+
+def _add_deltas(deltas):
+    """Add {question_id: {field: delta}} to the questions' rows, creating missing rows"""
+    question_ids = sorted(deltas)
+    now = timezone.now()
+    for start in range(0, len(question_ids), UPDATE_CHUNK):
+        chunk = question_ids[start:start + UPDATE_CHUNK]
+        if _update(deltas, chunk, now) == len(chunk):
+            continue
+        # First statistics for some of the questions: create their rows
+        # and add the deltas to those rows only
+        existing = set(QuestionStats.objects.filter(question_id__in=chunk).values_list('question_id', flat=True))
+        missing = [question_id for question_id in chunk if question_id not in existing]
+        QuestionStats.objects.bulk_create(
+            [QuestionStats(question_id=question_id) for question_id in missing], ignore_conflicts=True
+        )
+        _update(deltas, missing, now)
+
+
+def lock_stats(question_ids):
+    """
+    Create any missing rows of the questions and lock them for update, in
+    question_id order so that concurrent folds cannot deadlock
+    """
+    question_ids = sorted(set(question_ids))
+    QuestionStats.objects.bulk_create(
+        [QuestionStats(question_id=question_id) for question_id in question_ids], ignore_conflicts=True
+    )
+    list(
+        QuestionStats.objects.select_for_update().filter(question_id__in=question_ids)
+        .order_by('question_id').values_list('question_id', flat=True)
+    )
+
+
+def record_served(question_ids):
+    """Count the questions (ids, repeated once per paper) as served"""
+    _add_deltas({
+        question_id: {'served_count': count}
+        for question_id, count in Counter(question_ids).items()
+    })
+
+
+def record_graded_answers(graded):
+    """
+    Fold finished attempts into their questions' statistics. graded is a
+    list of (attempt, [(question_id, selected_answer, is_correct), ...]);
+    the attempts must carry their final score and max_score.
+    """
+    deltas = defaultdict(Counter)
+    for attempt, answers in graded:
+        percentage = attempt_percentage(attempt)
+        for question_id, selected_answer, is_correct in answers:
+            delta = deltas[question_id]
+            delta['answered_count'] += 1
+            delta[OPTION_FIELDS[selected_answer]] += 1
+            delta['score_sum'] += percentage
+            delta['score_squares'] += percentage * percentage
+            if is_correct:
+                delta['correct_count'] += 1
+                delta['correct_score_sum'] += percentage
+    _add_deltas(deltas)
+
+
+def rebuild_question_stats(question_ids, chunk_size=500):
+    """Recompute the statistics of the given questions from the papers and answers of folded attempts"""
+    question_ids = sorted(set(question_ids))
+    for start in range(0, len(question_ids), chunk_size):
+        chunk = question_ids[start:start + chunk_size]
+        with transaction.atomic():
+            lock_stats(chunk)
+            _rebuild(chunk)
+
+
+def _rebuild(chunk):
+    stats = {question_id: QuestionStats(question_id=question_id) for question_id in chunk}
+
+    correct = Q(is_correct=True)
+    totals = (
+        StudentAnswer.objects.filter(
+            question_id__in=chunk, attempt__status__in=FINISHED_STATUSES, attempt__aggregated=True
+        )
+        .order_by()
+        .values('question_id')
+        .annotate(
+            answered_count=Count('id'),
+            correct_count=Count('id', filter=correct),
+            **{
+                field: Count('id', filter=Q(selected_answer=option))
+                for option, field in OPTION_FIELDS.items()
+            },
+            score_sum=Sum(ANSWER_PERCENTAGE),
+            score_squares=Sum(ExpressionWrapper(ANSWER_PERCENTAGE * ANSWER_PERCENTAGE, output_field=FloatField())),
+            correct_score_sum=Sum(ANSWER_PERCENTAGE, filter=correct),
+        )
+    )
+    for row in totals:
+        for field in ANSWER_FIELDS:
+            setattr(stats[row['question_id']], field, row[field] or 0)
+
+    served = (
+        SelectedQuestion.objects.filter(
+            question_id__in=chunk,
+            examattempt__status__in=FINISHED_STATUSES,
+            examattempt__aggregated=True,
+        )
+        .order_by()
+        .values('question_id')
+        .annotate(count=Count('id'))
+        .values_list('question_id', 'count')
+    )
+    for question_id, count in served:
+        stats[question_id].served_count = count
+
+    QuestionStats.objects.bulk_create(
+        stats.values(),
+        update_conflicts=True,
+        unique_fields=['question'],
+        update_fields=['served_count', *ANSWER_FIELDS, 'updated_at'],
+    )
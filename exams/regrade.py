@@ -0,0 +1,207 @@
+"""
+Set-based re-grading.
+
+When a question's correct answer or marks change, every stored answer to
+it and every finished attempt that answered it must be re-scored. This
+is done with a few UPDATE statements instead of loading answers or
+attempts into Python:
+
+1. one UPDATE flips is_correct on the answers whose correctness changed,
+   with a CASE over the re-graded questions' correct answers;
+2. UPDATE ... FROM statements recompute correct_answers and score of the
+   affected finished attempts from a grouped aggregate of their answers,
+   and max_score from the current marks of their selected questions, so
+   both use the same marks; the marks frozen on their papers follow;
+3. the affected exams' performance aggregates and the item statistics of
+   the questions they answered are rebuilt in the database.
+"""
+import logging
+import sqlite3
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from .availability import invalidate_all_students
+from .models import Exam, ExamAttempt, Question, StudentAnswer
+from .papers import paper_max_score
+from .performance import FINISHED_STATUSES, rebuild_exam_performance
+from .question_stats import rebuild_question_stats
+
+logger = logging.getLogger(__name__)
+
+SelectedQuestion = ExamAttempt.selected_questions.through
+
+# Attempts whose papers are rewritten per bulk_update
+PAPER_BATCH = 500
+
+
+def _attempt_total(queryset, aggregate, attempt_field='attempt', default=Value(0)):
+    # Correlated "SELECT <aggregate> FROM rows WHERE attempt_id = outer.id"
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{attempt_field: OuterRef('pk')})
+            .order_by()
+            .values(attempt_field)
+            .annotate(total=aggregate)
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        default,
+    )
+
+
+def _supports_update_from():
+    return connection.vendor == 'postgresql' or (
+        connection.vendor == 'sqlite' and sqlite3.sqlite_version_info >= (3, 33)
+    )
+
+
+def rescore_attempts(attempt_ids):
+    """
+    Recompute correct_answers and score of the finished attempts among
+    attempt_ids (a queryset of ids) from their stored answers, and
+    max_score from their selected questions, all at current marks.
+    Attempts without recorded selections keep their max_score.
+
+    Where the database supports UPDATE ... FROM, the totals of all
+    attempts are aggregated once in grouped subqueries and joined in;
+    elsewhere each column is set from a correlated aggregate subquery.
+    Returns the number of attempts whose score was updated.
+    """
+    correct = Q(is_correct=True)
+    if not _supports_update_from():
+        correct_answers = StudentAnswer.objects.filter(correct)
+        return ExamAttempt.objects.filter(status__in=FINISHED_STATUSES, id__in=attempt_ids).update(
+            correct_answers=_attempt_total(correct_answers, Count('id')),
+            score=_attempt_total(correct_answers, Sum('question__marks')),
+            max_score=_attempt_total(
+                SelectedQuestion.objects.all(), Sum('question__marks'), 'examattempt', F('max_score')
+            ),
+        )
+
+    totals = (
+        StudentAnswer.objects.filter(attempt_id__in=attempt_ids)
+        .order_by()
+        .values('attempt_id')
+        .annotate(correct=Count('id', filter=correct), score=Sum('question__marks', filter=correct))
+    )
+    totals_sql, totals_params = totals.query.sql_with_params()
+    quote = connection.ops.quote_name
+    table = quote(ExamAttempt._meta.db_table)
+    sql = (
+        f'UPDATE {table} SET {quote("correct_answers")} = totals.correct, '
+        f'{quote("score")} = COALESCE(totals.score, 0) '
+        f'FROM ({totals_sql}) AS totals '
+        f'WHERE {table}.{quote("id")} = totals.attempt_id '
+        f'AND {table}.{quote("status")} IN ({", ".join(["%s"] * len(FINISHED_STATUSES))})'
+    )
+    paper_totals = (
+        SelectedQuestion.objects.filter(examattempt_id__in=attempt_ids)
+        .order_by()
+        .values('examattempt_id')
+        .annotate(max_score=Sum('question__marks'))
+    )
+    paper_sql, paper_params = paper_totals.query.sql_with_params()
+    max_score_sql = (
+        f'UPDATE {table} SET {quote("max_score")} = totals.max_score '
+        f'FROM ({paper_sql}) AS totals '
+        f'WHERE {table}.{quote("id")} = totals.examattempt_id '
+        f'AND {table}.{quote("status")} IN ({", ".join(["%s"] * len(FINISHED_STATUSES))})'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (*totals_params, *FINISHED_STATUSES))
+        rescored = cursor.rowcount
+        cursor.execute(max_score_sql, (*paper_params, *FINISHED_STATUSES))
+    return rescored
+
+
+def refresh_paper_marks(question_ids):
+    """
+    Write the questions' current marks into the frozen papers that hold
+    them, and the papers' totals into max_score (attempts still in
+    progress are graded at current marks too). Returns the number of
+    attempts updated.
+    """
+    marks = dict(Question.objects.filter(id__in=question_ids).values_list('id', 'marks'))
+    attempts = (
+        ExamAttempt.objects.filter(
+            id__in=SelectedQuestion.objects.filter(question_id__in=marks).values('examattempt_id')
+        )
+        .exclude(paper=[])
+        .values_list('id', 'paper')
+    )
+    stale = []
+    for attempt_id, paper in attempts.iterator(chunk_size=PAPER_BATCH):
+        changed = False
+        for question in paper:
+            if question['id'] in marks and question['marks'] != marks[question['id']]:
+                question['marks'] = marks[question['id']]
+                changed = True
+        if changed:
+            stale.append(ExamAttempt(id=attempt_id, paper=paper, max_score=paper_max_score(paper)))
+    ExamAttempt.objects.bulk_update(stale, ['paper', 'max_score'], batch_size=PAPER_BATCH)
+    return len(stale)
+
+
+def regrade_questions(question_ids):
+    """
+    Re-grade every answer to the given questions and the attempts they
+    belong to. Returns (answers changed, attempts re-scored, exams rebuilt).
+    """
+    answer_key = dict(Question.objects.filter(id__in=question_ids).values_list('id', 'correct_answer'))
+    if not answer_key:
+        return 0, 0, 0
+
+    answers = StudentAnswer.objects.filter(question_id__in=answer_key)
+    # Only rows whose correctness actually changes are written
+    stale = Q()
+    for question_id, correct_answer in answer_key.items():
+        stale |= Q(question_id=question_id) & (
+            Q(selected_answer=correct_answer, is_correct=False)
+            | (~Q(selected_answer=correct_answer) & Q(is_correct=True))
+        )
+
+    with transaction.atomic():
+        answers_changed = answers.filter(stale).update(
+            is_correct=Case(
+                *[
+                    When(question_id=question_id, selected_answer=correct_answer, then=Value(True))
+                    for question_id, correct_answer in answer_key.items()
+                ],
+                default=Value(False),
+            )
+        )
+
+        # Marks may have changed even where correctness did not, so every
+        # finished attempt that answered one of the questions is re-scored,
+        # and every one that was served one gets its max_score recomputed
+        attempt_ids = ExamAttempt.objects.filter(
+            Q(id__in=answers.values('attempt_id'))
+            | Q(id__in=SelectedQuestion.objects.filter(question_id__in=answer_key).values('examattempt_id'))
+        ).values('id')
+        exam_ids = list(
+            ExamAttempt.objects.filter(status__in=FINISHED_STATUSES, id__in=attempt_ids)
+            .order_by().values_list('exam_id', flat=True).distinct()
+        )
+        attempts_rescored = rescore_attempts(attempt_ids)
+        refresh_paper_marks(answer_key)
+
+        for exam in Exam.objects.filter(id__in=exam_ids):
+            rebuild_exam_performance(exam)
+        # Re-scored attempts change the percentages behind every item they answered
+        rebuild_question_stats(
+            StudentAnswer.objects.filter(attempt__exam_id__in=exam_ids).values_list('question_id', flat=True).distinct()
+        )
+        if attempts_rescored:
+            invalidate_all_students()
+
+    logger.info(
+        f"Re-graded questions {sorted(answer_key)}: {answers_changed} answer(s) changed, "
+        f"{attempts_rescored} attempt(s) re-scored, {len(exam_ids)} exam(s) rebuilt"
+    )
+    return answers_changed, attempts_rescored, len(exam_ids)
+
+
+def regrade_exam(exam):
+    """Re-grade every question in an exam's pool"""
+    return regrade_questions(exam.examquestion_set.values_list('question_id', flat=True))
+
@@ -0,0 +1,126 @@
+"""
+Result release and notification.
+
+Exams with show_results_immediately email each student as soon as their
+attempt is finished, whether submitted, timed out on reload or closed by
+the deadline sweeper. Other exams keep scores hidden until
+release_results is run for them; it
+marks the exam released and queues one result email per finished attempt
+in the core email outbox, chunk by chunk, so memory use only depends on
+the chunk size. The outbox worker delivers them over pooled connections,
+and each attempt's result_email row records its delivery state.
+"""
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from core.mail import build_email
+from core.models import EmailOutbox
+from .availability import invalidate_course_exams, invalidate_students
+from .cache import invalidate_exams
+from .models import Exam, ExamAttempt
+from .performance import FINISHED_STATUSES
+
+
+def render_result_email(attempt):
+    """Subject and body of an attempt's result email"""
+    exam = attempt.exam
+    subject = f'Exam Result: {exam.title}'
+    body = f"""
+Dear {attempt.student.first_name},
+
+Your exam results for "{exam.title}" are ready!
+
+Exam Details:
+- Subject: {exam.subject.name}
+- Duration: {exam.duration_minutes} minutes
+- Time Taken: {attempt.time_taken_minutes} minutes
+
+Your Results:
+- Score: {attempt.score} out of {attempt.max_score}
+- Correct Answers: {attempt.correct_answers} out of {attempt.total_questions}
+- Percentage: {attempt.percentage:.2f}%
+
+Thank you for taking the exam!
+
+Best regards,
+CBT System Team
+"""
+    return subject, body
+
+
+def _queue_result_emails(attempts):
+    """Queue one result email per attempt (with its exam and student loaded) and link it to the attempt"""
+    messages = [build_email(*render_result_email(attempt), [attempt.student.email]) for attempt in attempts]
+    EmailOutbox.objects.bulk_create(messages)
+    for attempt, message in zip(attempts, messages):
+        attempt.result_email = message
+    ExamAttempt.objects.bulk_update(attempts, ['result_email'])
+    invalidate_students(attempt.student_id for attempt in attempts)
+
+
+def notify_results(attempt_ids):
+    """
+    Queue the result emails of just finished attempts whose exam already
+    shows results, skipping attempts notified before. Called once the
+    grading transaction commits. Returns the number of emails queued.
+    """
+    attempts = list(
+        ExamAttempt.objects.filter(
+            Q(exam__show_results_immediately=True) | Q(exam__results_released_at__isnull=False),
+            id__in=attempt_ids, status__in=FINISHED_STATUSES, result_email__isnull=True,
+        ).select_related('exam__subject', 'student')
+    )
+    if attempts:
+        with transaction.atomic():
+            _queue_result_emails(attempts)
+    return len(attempts)
+
+
+def release_results(exam, chunk_size=500):
+    """
+    Release an exam's results and queue an email for every finished
+    attempt that has not been notified yet. Safe to run again: attempts
+    finished since the last run are picked up, others are skipped.
+    Returns the number of emails queued.
+    """
+    released = Exam.objects.filter(id=exam.id, results_released_at__isnull=True).update(
+        results_released_at=timezone.now()
+    )
+    exam = Exam.objects.select_related('subject').get(id=exam.id)
+    if released:
+        # QuerySet.update() sends no signals: retire the cached exam data here
+        invalidate_exams([exam.id])
+        invalidate_course_exams([exam.course_id])
+
+    pending = ExamAttempt.objects.filter(
+        exam=exam, status__in=FINISHED_STATUSES, result_email__isnull=True
+    ).select_related('student').only(
+        'id', 'exam_id', 'score', 'max_score', 'correct_answers', 'total_questions', 'time_taken_minutes',
+        'student__id', 'student__first_name', 'student__email',
+    ).order_by('id')
+
+    queued = 0
+    while True:
+        # Notified attempts drop out of the filter, so each pass reads the next chunk
+        with transaction.atomic():
+            attempts = list(pending[:chunk_size])
+            if not attempts:
+                break
+            for attempt in attempts:
+                attempt.exam = exam
+            _queue_result_emails(attempts)
+        queued += len(attempts)
+    return queued
+
+
+def result_delivery_summary(exam):
+    """Counts of the exam's finished attempts by result email state"""
+    summary = {'not_queued': 0, 'pending': 0, 'sending': 0, 'sent': 0, 'dead': 0}
+    rows = (
+        ExamAttempt.objects.filter(exam=exam, status__in=FINISHED_STATUSES)
+        .values('result_email__status')
+        .annotate(count=Count('id'))
+    )
+    for row in rows:
+        summary[row['result_email__status'] or 'not_queued'] += row['count']
+    return summary
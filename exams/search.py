@@ -0,0 +1,189 @@
+"""
+Full-text search over the question bank.
+
+Question text, options and explanation are indexed in the database so
+searching does not scan the table with LIKE '%term%':
+
+- PostgreSQL: a stored generated tsvector column (search_document) with a
+  GIN index. Text is weighted question > options > explanation.
+- SQLite: an external-content FTS5 table (exams_question_fts) kept in
+  sync by triggers on the question table. Only the best
+  SQLITE_RANKED_RESULTS matches are ordered by relevance there; it is a
+  development fallback.
+
+Both are maintained by the database itself, so saves, queryset updates
+and bulk imports are indexed alike. Other databases fall back to
+unranked icontains matching. Search terms are split into words; every
+word must match, and the last word of a query also matches as a prefix
+so the question picker can search as the instructor types.
+
+SQLite drops triggers when Django rebuilds a table during a migration,
+so repair_search_index re-installs them after every migrate. On
+PostgreSQL the generated column blocks type changes of the columns it
+reads; a migration altering them must drop and re-add it (see migration
+0012, which creates both indexes with the SQL inlined).
+"""
+import re
+from django.db import connection
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from .models import Question
+
+TABLE = Question._meta.db_table
+FTS_TABLE = f'{TABLE}_fts'
+INDEXED_FIELDS = ('question_text', 'option_a', 'option_b', 'option_c', 'option_d', 'explanation')
+
+# Relative weights of question text, options and explanation in ranking
+SQLITE_BM25_WEIGHTS = (4.0, 1.0, 1.0, 1.0, 1.0, 2.0)
+
+# Matches ordered by relevance on SQLite; further matches are listed newest first
+SQLITE_RANKED_RESULTS = 100
+
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(question_text, '')), 'A') || "
+    "setweight(to_tsvector('english', concat_ws(' ', option_a, option_b, option_c, option_d)), 'B') || "
+    "setweight(to_tsvector('english', coalesce(explanation, '')), 'C')"
+)
+
+
+def _postgres_install(cursor):
+    cursor.execute(
+        f'ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS search_document tsvector '
+        f'GENERATED ALWAYS AS ({POSTGRES_DOCUMENT}) STORED'
+    )
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS {TABLE}_search_gin ON {TABLE} USING gin (search_document)')
+
+
+def _postgres_uninstall(cursor):
+    cursor.execute(f'DROP INDEX IF EXISTS {TABLE}_search_gin')
+    cursor.execute(f'ALTER TABLE {TABLE} DROP COLUMN IF EXISTS search_document')
+
+
+def _sqlite_install(cursor):
+    columns = ', '.join(INDEXED_FIELDS)
+    new_values = ', '.join(f'new.{field}' for field in INDEXED_FIELDS)
+    old_values = ', '.join(f'old.{field}' for field in INDEXED_FIELDS)
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"{columns}, content='{TABLE}', content_rowid='id', tokenize='porter unicode61')"
+    )
+    cursor.execute(
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN '
+        f'INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END'
+    )
+    cursor.execute(
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN '
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+    )
+    cursor.execute(
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON {TABLE} BEGIN '
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+        f'INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END'
+    )
+    # Index the rows already in the table
+    cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def _sqlite_uninstall(cursor):
+    for suffix in ('ai', 'ad', 'au'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+    cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def install_search_index(using=connection):
+    """Create (or repair) the full-text index for the database in use and index every question"""
+    with using.cursor() as cursor:
+        if using.vendor == 'postgresql':
+            _postgres_install(cursor)
+        elif using.vendor == 'sqlite':
+            _sqlite_install(cursor)
+
+
+def repair_search_index(using=connection):
+    """
+    Re-install the SQLite triggers (and re-index every question) when a
+    migration rebuilt the question table and dropped them. Returns
+    whether a repair was needed.
+    """
+    if using.vendor != 'sqlite':
+        return False
+    with using.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name FROM sqlite_master WHERE name LIKE %s", [f'{FTS_TABLE}%']
+        )
+        objects = set(cursor.fetchall())
+    if ('table', FTS_TABLE) not in objects:
+        # Not installed (yet), e.g. migrating to a target before 0012
+        return False
+    if {('trigger', f'{FTS_TABLE}_{suffix}') for suffix in ('ai', 'ad', 'au')} <= objects:
+        return False
+    install_search_index(using)
+    return True
+
+
+def uninstall_search_index(using=connection):
+    with using.cursor() as cursor:
+        if using.vendor == 'postgresql':
+            _postgres_uninstall(cursor)
+        elif using.vendor == 'sqlite':
+            _sqlite_uninstall(cursor)
+
+
+def search_words(term):
+    """Words of a search term; punctuation and query operators are dropped"""
+    return re.findall(r'\w+', term or '')
+
+
+def _sqlite_query(words):
+    # Quoted words are matched literally; the last one also as a prefix
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+
+def _postgres_query(words):
+    return ' & '.join([*words[:-1], f'{words[-1]}:*'])
+
+
+def search_questions(queryset, term):
+    """
+    Narrow a Question queryset to the questions matching term, annotated
+    with search_rank (higher is better) and ordered by it. A term without
+    words returns the queryset unchanged.
+    """
+    words = search_words(term)
+    if not words:
+        return queryset
+
+    if connection.vendor == 'postgresql':
+        query = _postgres_query(words)
+        matches = RawSQL(
+            f"SELECT id FROM {TABLE} WHERE search_document @@ to_tsquery('english', %s)", [query]
+        )
+        rank = RawSQL(
+            f"ts_rank_cd({TABLE}.search_document, to_tsquery('english', %s))", [query],
+            output_field=FloatField(),
+        )
+    elif connection.vendor == 'sqlite':
+        query = _sqlite_query(words)
+        weights = ', '.join(str(weight) for weight in SQLITE_BM25_WEIGHTS)
+        matches = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [query])
+        # bm25() can only be evaluated inside the MATCH query itself, so the
+        # best matches are ranked up front; the rest follow, newest first
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s',
+                [query, SQLITE_RANKED_RESULTS],
+            )
+            best = [row[0] for row in cursor.fetchall()]
+        rank = Case(
+            *[When(id=question_id, then=Value(float(len(best) - position))) for position, question_id in enumerate(best)],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+    else:
+        condition = Q()
+        for word in words:
+            condition &= Q(*[Q(**{f'{field}__icontains': word}) for field in INDEXED_FIELDS], _connector=Q.OR)
+        return queryset.filter(condition).annotate(search_rank=Value(0.0)).order_by('-id')
+
+    return queryset.filter(id__in=matches).annotate(search_rank=rank).order_by('-search_rank', '-id')
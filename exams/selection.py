@@ -0,0 +1,84 @@
+"""
+Question selection for new attempts.
+
+An exam's pool is cached as question ids grouped by difficulty and then
+by subject, so drawing a paper never loads question rows: only the
+drawn questions are fetched afterwards. Exams may set a
+difficulty_distribution such as {"easy": 30, "medium": 50, "hard": 20}
+(percentages); each difficulty's share is then split over its subjects
+in proportion to their pool sizes, so papers cover subjects evenly.
+"""
+import random
+from .cache import get_exam_question_strata
+from .models import ExamAttempt
+
+SelectedQuestion = ExamAttempt.selected_questions.through
+
+
+def allocate(count, weights):
+    """
+    Split count into whole numbers proportional to weights (largest
+    remainder method). weights maps keys to non-negative numbers.
+    """
+    total = sum(weights.values())
+    if not total or count <= 0:
+        return {key: 0 for key in weights}
+    shares = {key: count * weight / total for key, weight in weights.items()}
+    allocation = {key: int(share) for key, share in shares.items()}
+    leftover = count - sum(allocation.values())
+    for key in sorted(shares, key=lambda key: shares[key] - allocation[key], reverse=True)[:leftover]:
+        allocation[key] += 1
+    return allocation
+
+
+def _draw(groups, count, rng):
+    """Draw up to count ids from {key: [ids]}, proportionally to group sizes"""
+    quotas = allocate(count, {key: len(ids) for key, ids in groups.items()})
+    drawn = []
+    for key, ids in groups.items():
+        drawn.extend(rng.sample(ids, min(quotas[key], len(ids))))
+    return drawn
+
+
+def select_question_ids(exam_id, count, distribution=None, rng=None):
+    """
+    Draw count question ids (or the whole pool if smaller) for a new
+    attempt, honouring the difficulty distribution where the pool allows.
+    A difficulty with too few questions is topped up from the rest of
+    the pool. The result is shuffled.
+    """
+    rng = rng or random
+    strata = get_exam_question_strata(exam_id)
+    pool_size = sum(len(ids) for subjects in strata.values() for ids in subjects.values())
+    count = min(count, pool_size)
+
+    weights = {difficulty: (distribution or {}).get(difficulty, 0) for difficulty in strata}
+    if not any(weights.values()):
+        # No distribution: follow the pool's own difficulty mix
+        weights = {difficulty: sum(map(len, subjects.values())) for difficulty, subjects in strata.items()}
+
+    selected = []
+    for difficulty, quota in allocate(count, weights).items():
+        selected.extend(_draw(strata[difficulty], quota, rng))
+
+    if len(selected) < count:
+        chosen = set(selected)
+        remaining = [
+            question_id
+            for subjects in strata.values()
+            for ids in subjects.values()
+            for question_id in ids
+            if question_id not in chosen
+        ]
+        selected.extend(rng.sample(remaining, count - len(selected)))
+
+    rng.shuffle(selected)
+    return selected
+
+
+def save_selection(attempt, question_ids):
+    """Record an attempt's selected questions with a single bulk insert"""
+    SelectedQuestion.objects.bulk_create([
+        SelectedQuestion(examattempt_id=attempt.id, question_id=question_id)
+        for question_id in question_ids
+    ])
@@ -0,0 +1,109 @@
+import logging
+from django.db import connections, transaction
+from django.db.models.signals import m2m_changed, pre_save, post_save, post_delete
+from django.dispatch import receiver
+from kombu.exceptions import OperationalError
+from authentication.models import CourseEnrollment
+from .availability import invalidate_course_exams, invalidate_students
+from .cache import invalidate_courses, invalidate_exams
+from .models import Course, Subject, Exam, ExamAttempt, ExamQuestion, Question, refresh_total_marks
+from .regrade import regrade_questions
+from . import search, tasks
+
+logger = logging.getLogger(__name__)
+
+
+@receiver([post_save, post_delete], sender=Course)
+def course_changed(sender, instance, **kwargs):
+    invalidate_courses()
+    invalidate_course_exams([instance.id])
+    invalidate_exams(Exam.objects.filter(course=instance).values_list('id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=Subject)
+def subject_changed(sender, instance, **kwargs):
+    invalidate_course_exams([instance.course_id])
+    invalidate_exams(Exam.objects.filter(subject=instance).values_list('id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=Exam)
+def exam_changed(sender, instance, **kwargs):
+    invalidate_course_exams([instance.course_id])
+    invalidate_exams([instance.id])
+
+
+@receiver([post_save, post_delete], sender=ExamQuestion)
+def exam_question_changed(sender, instance, **kwargs):
+    refresh_total_marks([instance.exam_id])
+    invalidate_course_exams([instance.exam.course_id])
+    invalidate_exams([instance.exam_id])
+
+
+@receiver(m2m_changed, sender=Exam.questions.through)
+def exam_questions_changed(sender, instance, action, pk_set, **kwargs):
+    # exam.questions.add()/set() bulk-create ExamQuestion rows without post_save
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if isinstance(instance, Exam):
+        exam_ids = [instance.id]
+    else:
+        exam_ids = list(pk_set or [])
+    refresh_total_marks(exam_ids)
+    invalidate_course_exams(Exam.objects.filter(id__in=exam_ids).values_list('course_id', flat=True))
+    invalidate_exams(exam_ids)
+
+
+@receiver(pre_save, sender=Question)
+def remember_answer_key(sender, instance, **kwargs):
+    # Compared after saving to see whether stored answers need re-grading
+    instance._previous_answer_key = None
+    if instance.pk:
+        instance._previous_answer_key = (
+            Question.objects.filter(pk=instance.pk).values_list('correct_answer', 'marks').first()
+        )
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    invalidate_exams(
+        ExamQuestion.objects.filter(question=instance).values_list('exam_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Question)
+def answer_key_changed(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_answer_key', None)
+    if created or previous is None or previous == (instance.correct_answer, instance.marks):
+        return
+    if previous[1] != instance.marks:
+        # Attempts' max_score and paper marks follow in regrade_questions
+        exams = Exam.objects.filter(examquestion__question=instance)
+        refresh_total_marks(exams.values_list('id', flat=True))
+        invalidate_course_exams(exams.values_list('course_id', flat=True))
+    question_ids = [instance.id]
+    transaction.on_commit(lambda: dispatch_regrade(question_ids))
+
+
+def dispatch_regrade(question_ids):
+    """Queue the regrade on a worker, or run it here when the broker is down"""
+    try:
+        tasks.regrade_changed_questions.delay(question_ids)
+    except OperationalError as e:
+        # Set-based, so it takes seconds even for heavily answered questions
+        logger.warning(f"Task broker unreachable, re-grading questions {question_ids} in process: {e}")
+        regrade_questions(question_ids)
+
+
+@receiver([post_save, post_delete], sender=CourseEnrollment)
+def enrollment_changed(sender, instance, **kwargs):
+    invalidate_students([instance.student_id])
+
+
+@receiver([post_save, post_delete], sender=ExamAttempt)
+def attempt_changed(sender, instance, **kwargs):
+    invalidate_students([instance.student_id])
+
+
+def repair_search_index(sender, using, **kwargs):
+    # Connected in ExamsConfig.ready for this app's post_migrate
+    search.repair_search_index(connections[using])
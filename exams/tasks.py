@@ -0,0 +1,52 @@
+from celery import shared_task
+from core.mail import drain_outbox
+from . import analysis, collusion, provisioning, regrade, results
+from .grading import aggregate_finished_attempts, finalize_expired_attempts
+from .models import Exam
+
+
+@shared_task
+def sweep_expired_attempts(batch_size=500):
+    """Time out and grade every in-progress attempt past its deadline"""
+    return finalize_expired_attempts(batch_size=batch_size)
+
+
+@shared_task
+def aggregate_exam_performance(batch_size=500):
+    """Fold newly finished attempts into their exams' performance aggregates"""
+    return aggregate_finished_attempts(batch_size=batch_size)
+
+
+@shared_task(soft_time_limit=10 * 60)
+def provision_upcoming_exams(lead_minutes=15, batch_size=1000):
+    """Pre-create attempts for exams whose window opens soon"""
+    return provisioning.provision_upcoming_exams(lead_minutes=lead_minutes, batch_size=batch_size)
+
+
+@shared_task(soft_time_limit=30 * 60)
+def regrade_changed_questions(question_ids):
+    """Re-grade the stored answers to questions whose answer key changed"""
+    return regrade.regrade_questions(question_ids)
+
+
+@shared_task(soft_time_limit=30 * 60)
+def release_exam_results(exam_id, chunk_size=500):
+    """Release an exam's results, queue every result email and start delivering them"""
+    exam = Exam.objects.get(id=exam_id)
+    queued = results.release_results(exam, chunk_size=chunk_size)
+    drain_outbox()
+    return queued
+
+
+@shared_task(soft_time_limit=15 * 60)
+def analyze_exam_results(exam_id):
+    """Recompute an exam's psychometric report"""
+    exam = Exam.objects.get(id=exam_id)
+    return analysis.analyze_exam(exam).id
+
+
+@shared_task(soft_time_limit=15 * 60)
+def detect_exam_collusion(exam_id):
+    """Look for suspiciously similar answer sheets in an exam"""
+    exam = Exam.objects.get(id=exam_id)
+    return collusion.detect_collusion(exam).id
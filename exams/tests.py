@@ -1,3 +1,732 @@
+import io
+import json
+import pickle
+import random
+from datetime import timedelta
+from unittest import mock
+import numpy as np
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from kombu.exceptions import OperationalError
+from redis.exceptions import RedisError
+from authentication.models import CustomUser, CourseEnrollment
+from core.models import EmailOutbox, PlatformStatistic
+from core.statistics import refresh_course_statistics
+from . import answer_key
+from .analysis import analyze_exam
+from .availability import get_course_exams
+from .cache import get_active_courses
+from .collusion import detect_collusion
+from .duplicates import detect_duplicates, find_duplicates, merge_cluster, minhash, question_document
+from .grading import aggregate_finished_attempts, finalize_expired_attempts, grade_attempt, save_answers
+from .importers import import_questions, read_csv, read_jsonl, read_markdown
+from .models import (
+    Course, DuplicateCluster, Exam, ExamAnalysisReport, ExamAttempt, ExamPerformance, ExamQuestion,
+    Question, QuestionStats, StudentAnswer, Subject,
+)
+from .papers import build_paper
+from .performance import rebuild_exam_performance
+from .provisioning import provision_exam
+from .question_stats import rebuild_question_stats
+from .regrade import regrade_questions
+from .search import search_questions
+from .selection import allocate, select_question_ids
 
-# Create your tests here.
+# Three statements with the answer key cached, plus the two savepoints
+# TestCase turns grading's atomic blocks into
+GRADING_QUERIES = 7
+
+QUESTION_TEXTS = [
+    'Which HTML element holds the page title?',
+    'What does the CSS box-sizing property change?',
+    'Which HTTP method is idempotent?',
+    'How do you declare a block-scoped variable in JavaScript?',
+    'Which Django command creates migration files?',
+    'What is the default port of PostgreSQL?',
+    'Which git command shows unstaged changes?',
+    'What status code means a resource was not found?',
+]
+
+
+class ExamTestCase(TestCase):
+    """An active exam drawing 5 of its 8 two-mark questions (answer A), and one enrolled student"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = CustomUser.objects.create_user(
+            email='instructor@test.local', username='instructor', password='pw',
+            first_name='Ivy', last_name='Instructor', user_type='instructor', is_approved=True,
+        )
+        cls.student = cls.create_student('student')
+        cls.course = Course.objects.create(code='fullstack', name='Fullstack', description='Course', instructor=cls.instructor)
+        cls.subject = Subject.objects.create(course=cls.course, name='Basics')
+        cls.exam = Exam.objects.create(
+            title='Midterm', course=cls.course, subject=cls.subject, duration_minutes=30,
+            questions_to_display=5, is_active=True, created_by=cls.instructor,
+        )
+        cls.questions = [
+            cls.create_question(text, difficulty=['easy', 'medium', 'hard'][number % 3])
+            for number, text in enumerate(QUESTION_TEXTS)
+        ]
+        ExamQuestion.objects.bulk_create([
+            ExamQuestion(exam=cls.exam, question=question, order=order) for order, question in enumerate(cls.questions)
+        ])
+        CourseEnrollment.objects.create(student=cls.student, course=cls.course)
+
+    @classmethod
+    def create_student(cls, name, enroll_in=None):
+        student = CustomUser.objects.create_user(
+            email=f'{name}@test.local', username=name, password='pw',
+            first_name='Sam', last_name='Student', user_type='student',
+        )
+        if enroll_in:
+            CourseEnrollment.objects.create(student=student, course=enroll_in)
+        return student
+
+    @classmethod
+    def create_question(cls, text, **fields):
+        values = {
+            'option_a': 'First', 'option_b': 'Second', 'option_c': 'Third', 'option_d': 'Fourth',
+            'correct_answer': 'A', 'marks': 2, **fields,
+        }
+        return Question.objects.create(subject=cls.subject, question_text=text, created_by=cls.instructor, **values)
+
+    def setUp(self):
+        cache.clear()
+        answer_key._local.clear()
+
+    def start(self, student):
+        self.client.force_login(student)
+        self.client.get(reverse('exams:start_exam', args=[self.exam.id]))
+        return ExamAttempt.objects.get(student=student, exam=self.exam)
+
+    def submit(self, attempt, answers):
+        return self.client.post(
+            reverse('exams:submit_exam', args=[attempt.id]), json.dumps({'answers': answers}),
+            content_type='application/json',
+        )
+
+    def paper_ids(self, attempt):
+        return [question['id'] for question in attempt.paper]
+
+    def graded_attempt(self, answered=slice(None)):
+        """The student's attempt, graded with the right answer to the given slice of the paper"""
+        attempt = self.start(self.student)
+        grade_attempt(attempt, {question_id: 'A' for question_id in self.paper_ids(attempt)[answered]})
+        attempt.refresh_from_db()
+        return attempt
+
+    def finish_attempts(self, count=8, timed_out=2):
+        """Attempts by new students, the last timed_out of them closed by the sweeper"""
+        rng = random.Random(3)
+        for number in range(count):
+            attempt = self.start(self.create_student(f'finished{number}', enroll_in=self.course))
+            answers = {question_id: rng.choice('AAB' if number % 2 else 'BCD') for question_id in self.paper_ids(attempt)}
+            if number < count - timed_out:
+                grade_attempt(attempt, answers)
+            else:
+                save_answers(attempt, answers)
+                ExamAttempt.objects.filter(pk=attempt.pk).update(deadline=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(finalize_expired_attempts(), timed_out)
+
+
+class GradingTests(ExamTestCase):
+    def test_start_and_submit(self):
+        attempt = self.start(self.student)
+        self.assertEqual((attempt.status, attempt.max_score), ('in_progress', 10))
+        paper = self.paper_ids(attempt)
+
+        # Questions off the paper and invalid options are ignored
+        response = self.submit(attempt, {str(paper[0]): 'A', str(paper[1]): 'c', str(paper[2]): 'E', '0': 'A'})
+        self.assertEqual(response.status_code, 200)
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.status, attempt.correct_answers, attempt.score), ('completed', 1, 2))
+        self.assertEqual(attempt.answers.count(), 2)
+        self.assertEqual(self.submit(attempt, {}).status_code, 400)
+
+    def test_grading_query_count_does_not_grow_with_the_paper(self):
+        answer_key.get_answer_key(self.exam.id)
+        for size in (3, 8):
+            attempt = ExamAttempt.objects.create(
+                student=self.create_student(f'size{size}'), exam=self.exam, deadline=timezone.now() + timedelta(hours=1),
+                total_questions=size, max_score=2 * size, paper=build_paper(self.questions[:size]),
+            )
+            with self.assertNumQueries(GRADING_QUERIES):
+                grade_attempt(attempt, {str(question.id): 'A' for question in self.questions[:size]})
+            attempt.refresh_from_db()
+            self.assertEqual(attempt.score, 2 * size)
+
+    def test_answer_key_change_drops_the_process_copy_whatever_redis_does(self):
+        answer_key.get_answer_key(self.exam.id)
+        question = self.questions[0]
+        question.correct_answer = 'B'
+        with mock.patch('core.cache.cache.incr', side_effect=RedisError('down')), \
+                mock.patch('core.cache.time.sleep'), self.assertRaises(RedisError):
+            with self.captureOnCommitCallbacks(execute=True):
+                question.save()
+        self.assertNotIn(self.exam.id, answer_key._local)
+
+
+class PaperTests(ExamTestCase):
+    def test_paper_is_frozen_on_the_attempt(self):
+        attempt = self.start(self.student)
+        paper = self.paper_ids(attempt)
+        self.assertEqual(sorted(paper), sorted(attempt.selected_questions.values_list('id', flat=True)))
+
+        # Later edits to the question bank do not change a started paper
+        Question.objects.filter(id=paper[0]).update(question_text='Edited afterwards')
+        response = self.client.get(reverse('exams:take_exam', args=[attempt.id]))
+        questions = response.context['questions']
+        self.assertEqual([question['id'] for question in questions], paper)
+        self.assertNotEqual(questions[0]['question_text'], 'Edited afterwards')
+        self.assertNotIn('correct_answer', questions[0])
+
+
+class AutosaveTests(ExamTestCase):
+    def test_autosave_keeps_the_latest_answers(self):
+        attempt = self.start(self.student)
+        paper = self.paper_ids(attempt)
+        url = reverse('exams:autosave_answers', args=[attempt.id])
+
+        # Questions off the paper and invalid options are ignored
+        response = self.client.post(
+            url, json.dumps({'answers': {str(paper[0]): 'A', str(paper[1]): 'b', str(paper[2]): 'E', '0': 'A'}}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.json(), {'success': True, 'saved': 2})
+        self.client.post(url, json.dumps({'answers': {str(paper[1]): 'A'}}), content_type='application/json')
+        self.assertEqual(dict(attempt.answers.values_list('question_id', 'selected_answer')), {paper[0]: 'A', paper[1]: 'A'})
+
+        # Submitting grades the saved answers together with the final ones
+        self.submit(attempt, {str(paper[2]): 'A', str(paper[3]): 'C'})
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.correct_answers, attempt.score), (3, 6))
+        self.assertEqual(attempt.answers.count(), 4)
+        self.assertEqual(self.client.post(url, json.dumps({'answers': {}}), content_type='application/json').status_code, 400)
+
+
+class DeadlineTests(ExamTestCase):
+    def test_sweeper_times_out_expired_attempts(self):
+        attempt = self.start(self.student)
+        paper = self.paper_ids(attempt)
+        save_answers(attempt, {paper[0]: 'A', paper[1]: 'B'})
+
+        # Within the grace period a final submission may still arrive
+        ExamAttempt.objects.filter(pk=attempt.pk).update(deadline=timezone.now() - timedelta(seconds=5))
+        self.assertEqual(finalize_expired_attempts(), 0)
+
+        ExamAttempt.objects.filter(pk=attempt.pk).update(deadline=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(finalize_expired_attempts(), 1)
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.status, attempt.correct_answers, attempt.score), ('timeout', 1, 2))
+        self.assertEqual(attempt.end_time, attempt.deadline)
+        self.assertEqual(self.submit(attempt, {}).status_code, 400)
+
+    def test_opening_an_expired_attempt_times_it_out(self):
+        attempt = self.start(self.student)
+        ExamAttempt.objects.filter(pk=attempt.pk).update(deadline=timezone.now() - timedelta(minutes=1))
+        response = self.client.get(reverse('exams:take_exam', args=[attempt.id]))
+        self.assertRedirects(response, reverse('exams:exam_result', args=[attempt.id]), fetch_redirect_response=False)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.status, 'timeout')
+
+    def test_late_submission_only_grades_autosaved_answers(self):
+        started = timezone.now() - timedelta(hours=2)
+        attempt = ExamAttempt.objects.create(
+            student=self.student, exam=self.exam, start_time=started, deadline=started + timedelta(hours=1),
+            total_questions=5, max_score=10, paper=build_paper(self.questions[:5]),
+        )
+        save_answers(attempt, {self.questions[0].id: 'A'})
+        self.client.force_login(self.student)
+        self.assertEqual(self.submit(attempt, {str(question.id): 'A' for question in self.questions[:5]}).status_code, 200)
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.status, attempt.score, attempt.time_taken_minutes), ('timeout', 2, 60))
+        self.assertEqual(attempt.end_time, attempt.deadline)
+        self.assertEqual(attempt.answers.count(), 1)
+
+    def test_started_attempts_need_a_deadline(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ExamAttempt.objects.create(student=self.student, exam=self.exam)
+        ExamAttempt.objects.create(student=self.student, exam=self.exam, status='scheduled')
+
+
+class SelectionTests(ExamTestCase):
+    def test_allocate(self):
+        self.assertEqual(allocate(10, {'a': 30, 'b': 50, 'c': 20}), {'a': 3, 'b': 5, 'c': 2})
+        self.assertEqual(sum(allocate(7, {'a': 1, 'b': 1, 'c': 1}).values()), 7)
+
+    def test_difficulty_distribution(self):
+        difficulty = dict(Question.objects.values_list('id', 'difficulty'))
+        # Only 2 hard questions exist, so the paper is topped up from the others
+        selected = select_question_ids(self.exam.id, 5, {'easy': 0, 'medium': 20, 'hard': 80}, rng=random.Random(1))
+        self.assertEqual(len(set(selected)), 5)
+        self.assertEqual([difficulty[question_id] for question_id in selected].count('hard'), 2)
+        self.assertEqual(len(select_question_ids(self.exam.id, 50)), 8)
+
+        self.exam.difficulty_distribution = {'easy': 50, 'hard': 40}
+        with self.assertRaises(ValidationError):
+            self.exam.full_clean()
+
+
+class ProvisioningTests(ExamTestCase):
+    def test_provision_and_open(self):
+        for number in range(5):
+            self.create_student(f'provisioned{number}', enroll_in=self.course)
+        out = io.StringIO()
+        call_command('provision_exam_attempts', exam=self.exam.id, batch_size=2, stdout=out)
+        self.assertIn('provisioned 6 student(s)', out.getvalue())
+        # Running again skips students who already have an attempt
+        self.assertEqual(provision_exam(self.exam), 0)
+
+        attempt = ExamAttempt.objects.get(student=self.student)
+        self.assertEqual((attempt.status, attempt.deadline), ('scheduled', None))
+        self.assertEqual(attempt.selected_questions.count(), 5)
+        self.assertEqual(len(attempt.paper), 5)
+
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('exams:start_exam', args=[self.exam.id]))
+        self.assertRedirects(response, reverse('exams:take_exam', args=[attempt.id]), fetch_redirect_response=False)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.status, 'in_progress')
+        self.assertAlmostEqual(attempt.deadline, attempt.start_time + timedelta(minutes=30), delta=timedelta(seconds=1))
+        self.assertEqual(PlatformStatistic.objects.get(key='total_attempts').value, 1)
+
+    def test_unenrolled_student_cannot_open_a_provisioned_attempt(self):
+        provision_exam(self.exam)
+        CourseEnrollment.objects.filter(student=self.student).update(is_active=False)
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('exams:start_exam', args=[self.exam.id]), follow=True)
+        self.assertContains(response, 'You are not enrolled')
+        self.assertEqual(ExamAttempt.objects.get(student=self.student).status, 'scheduled')
+
+
+class CatalogCacheTests(ExamTestCase):
+    def test_catalog_is_cached_as_plain_values(self):
+        courses = get_active_courses()
+        self.assertEqual(courses, [{'id': self.course.id, 'code': 'fullstack', 'name': 'Fullstack', 'description': 'Course'}])
+        exams = get_course_exams(self.course.id)
+        self.assertEqual(
+            {key: exams[0][key] for key in ('id', 'subject', 'question_count', 'display_count')},
+            {'id': self.exam.id, 'subject': {'name': 'Basics'}, 'question_count': 8, 'display_count': 5},
+        )
+        self.assertEqual((exams[0]['min_paper_marks'], exams[0]['max_paper_marks']), (10, 10))
+        # No model instances are pickled into the cache
+        self.assertNotIn(b'exams.models', pickle.dumps([courses, exams]))
+
+        self.assertContains(self.client.get(reverse('core:home')), 'Fullstack')
+
+    def test_cards_show_the_marks_of_a_paper(self):
+        question = self.questions[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            question.marks = 10
+            question.save()
+        self.exam.refresh_from_db()
+        self.assertEqual(self.exam.total_marks, 24)
+        # Five of the eight questions are drawn: 10 marks, or 18 with the 10-mark one
+        self.client.force_login(self.student)
+        self.assertContains(self.client.get(reverse('core:dashboard')), 'Total Marks: 10–18')
+        self.assertContains(self.client.get(reverse('exams:exam_list')), '10–18 marks')
+        self.client.force_login(self.student)
+        self.assertContains(self.client.get(reverse('core:dashboard')), 'Subject: Basics')
+        self.assertContains(self.client.get(reverse('exams:exam_list')), reverse('exams:start_exam', args=[self.exam.id]))
+
+
+class AggregationTests(ExamTestCase):
+    def test_fold_matches_rebuild(self):
+        self.finish_attempts()
+        # Grading leaves the shared rows alone; the periodic fold fills them in
+        self.assertFalse(ExamPerformance.objects.filter(exam=self.exam, attempt_count__gt=0).exists())
+        self.assertEqual(aggregate_finished_attempts(batch_size=3), 8)
+        self.assertEqual(aggregate_finished_attempts(), 0)
+
+        performance = ExamPerformance.objects.get(exam=self.exam)
+        self.assertEqual(performance.attempt_count, 8)
+        folded = (performance.score_total, performance.histogram, performance.score_counts, performance.passed_count)
+        performance = rebuild_exam_performance(self.exam)
+        self.assertEqual((performance.score_total, performance.histogram, performance.score_counts, performance.passed_count), folded)
+
+    def test_dashboards_read_aggregates(self):
+        attempt = self.start(self.student)
+        grade_attempt(attempt, {question_id: 'A' for question_id in self.paper_ids(attempt)})
+        aggregate_finished_attempts()
+        refresh_course_statistics()
+        call_command('rebuild_exam_performance', exam=self.exam.id, stdout=io.StringIO())
+
+        self.client.force_login(self.instructor)
+        response = self.client.get(reverse('core:dashboard'))
+        self.assertEqual(response.context['total_student_attempts'], 1)
+        self.assertEqual(response.context['unique_students'], 1)
+        response = self.client.get(reverse('exams:exam_performance', args=[self.exam.id]))
+        self.assertEqual(response.context['performance'].passed_count, 1)
+
+        self.client.force_login(self.student)
+        self.assertNotEqual(self.client.get(reverse('exams:exam_performance', args=[self.exam.id])).status_code, 200)
+
+
+class QuestionStatsTests(ExamTestCase):
+    def snapshot(self):
+        return {
+            stats.question_id: (
+                stats.served_count, stats.answered_count, stats.correct_count, stats.option_distribution,
+                round(stats.score_sum, 6), round(stats.score_squares, 4), round(stats.correct_score_sum, 6),
+            )
+            for stats in QuestionStats.objects.all()
+        }
+
+    def test_fold_matches_rebuild(self):
+        self.finish_attempts()
+        self.assertFalse(QuestionStats.objects.filter(served_count__gt=0).exists())
+        aggregate_finished_attempts(batch_size=3)
+        folded = self.snapshot()
+        # Every finished paper counts as served, answered or not
+        self.assertEqual(sum(row[0] for row in folded.values()), 40)
+        rebuild_question_stats([question.id for question in self.questions])
+        self.assertEqual(self.snapshot(), folded)
+
+        question = self.questions[0]
+        answers = StudentAnswer.objects.filter(question=question).select_related('attempt')
+        correct = np.array([answer.is_correct for answer in answers], float)
+        percentages = np.array([answer.attempt.percentage for answer in answers], float)
+        stats = QuestionStats.objects.get(question=question)
+        self.assertAlmostEqual(stats.facility, round(correct.mean(), 3))
+        if correct.std() > 0:
+            self.assertAlmostEqual(stats.discrimination, round(np.corrcoef(correct, percentages)[0, 1], 3), places=2)
+
+
+class RegradeTests(ExamTestCase):
+    def test_answer_key_change(self):
+        attempt = self.graded_attempt()
+        aggregate_finished_attempts()
+        question = Question.objects.get(id=self.paper_ids(attempt)[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            question.correct_answer = 'B'
+            question.save()
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.correct_answers, attempt.score), (4, 8))
+        self.assertFalse(StudentAnswer.objects.get(attempt=attempt, question=question).is_correct)
+        self.assertEqual(ExamPerformance.objects.get(exam=self.exam).score_total, 8)
+        self.assertEqual(QuestionStats.objects.get(question=question).correct_count, 0)
+
+    def test_answer_key_change_is_regraded_in_process_without_a_broker(self):
+        attempt = self.graded_attempt()
+        question = Question.objects.get(id=self.paper_ids(attempt)[0])
+        question.correct_answer = 'B'
+        with mock.patch('exams.tasks.regrade_changed_questions.delay', side_effect=OperationalError('down')) as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                question.save()
+        delay.assert_called_once_with([question.id])
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 8)
+
+    def test_regrade_command_is_idempotent(self):
+        attempt = self.graded_attempt()
+        regrade_questions([question.id for question in self.questions])
+        call_command('regrade_answers', exam=self.exam.id, stdout=io.StringIO())
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 10)
+
+
+class MaxScoreTests(ExamTestCase):
+    def test_marks_change_keeps_percentage(self):
+        attempt = self.graded_attempt()
+        question = Question.objects.get(id=self.paper_ids(attempt)[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            question.marks = 10
+            question.save()
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.score, attempt.max_score, attempt.percentage), (18, 18, 100))
+        self.assertEqual(next(entry['marks'] for entry in attempt.paper if entry['id'] == question.id), 10)
+
+    def test_marks_change_without_update_from(self):
+        with mock.patch('exams.regrade._supports_update_from', return_value=False):
+            self.test_marks_change_keeps_percentage()
+
+    def test_marks_change_of_unanswered_question(self):
+        attempt = self.graded_attempt(answered=slice(1, None))
+        question = Question.objects.get(id=self.paper_ids(attempt)[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            question.marks = 10
+            question.save()
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.score, attempt.max_score), (8, 18))
+        self.assertEqual(attempt.max_score, sum(entry['marks'] for entry in attempt.paper))
+
+
+class ImporterTests(ExamTestCase):
+    CSV = (
+        'text,a,b,c,d,answer,difficulty,marks,subject\n'
+        'What does CSS stand for?,Cascading Style Sheets,Colorful Styles,Creative Sheets,Computer Style,a,easy,1,Web\n'
+        'what does  CSS stand for?,Cascading Style Sheets,Colorful Styles,Creative Sheets,Computer Style,A,easy,1,Web\n'
+        'Missing options,,,,,A,easy,1,Web\n'
+        'Which tag links a stylesheet?,<link>,<style>,<css>,<script>,E,easy,1,Web\n'
+        'Which tag links a stylesheet?,<link>,<style>,<css>,<script>,Option A,hard,3,\n'
+    )
+
+    def import_rows(self, rows, **options):
+        errors = []
+        totals = import_questions(
+            rows, self.instructor, default_course=self.course, on_error=lambda line, message: errors.append((line, message)),
+            **options,
+        )
+        return totals, errors
+
+    def test_csv(self):
+        before = Question.objects.count()
+        totals, errors = self.import_rows(read_csv(io.StringIO(self.CSV)), default_subject='General')
+        self.assertEqual(totals, {'rows': 5, 'created': 2, 'duplicates': 1, 'invalid': 2})
+        self.assertEqual([line for line, _ in errors], [4, 5])
+        self.assertEqual(Question.objects.count(), before + 2)
+        linked = Question.objects.get(question_text='Which tag links a stylesheet?')
+        self.assertEqual((linked.correct_answer, linked.difficulty, linked.marks, linked.subject.name), ('A', 'hard', 3, 'General'))
+        self.assertNotEqual(linked.content_hash, '')
+
+        # Questions already in the bank are skipped on the next import
+        totals, _ = self.import_rows(read_csv(io.StringIO(self.CSV)), default_subject='General')
+        self.assertEqual((totals['created'], totals['duplicates']), (0, 3))
+
+    def test_jsonl_and_dry_run(self):
+        rows = io.StringIO(
+            '{"question": "Is HTTP stateless?", "a": "Yes", "b": "No", "c": "Sometimes", "d": "Never", "answer": "A", "subject": "Web"}\n'
+            'not json\n'
+            '["a list"]\n'
+        )
+        totals, errors = self.import_rows(read_jsonl(rows), dry_run=True)
+        self.assertEqual(totals, {'rows': 3, 'created': 1, 'duplicates': 0, 'invalid': 2})
+        self.assertIn('invalid JSON', errors[0][1])
+        self.assertFalse(Question.objects.filter(question_text='Is HTTP stateless?').exists())
+        self.assertFalse(Subject.objects.filter(name='Web').exists())
+
+    def test_markdown(self):
+        rows = io.StringIO(
+            '## Networking\n'
+            '### Question 1\n'
+            '**Text**: Which layer routes packets\n'
+            'between networks?\n'
+            '**A**: Network\n**B**: Transport\n**C**: Session\n**D**: Physical\n'
+            '**Answer**: A\n**Difficulty**: Medium\n'
+        )
+        totals, errors = self.import_rows(read_markdown(rows))
+        self.assertEqual((totals['created'], errors), (1, []))
+        question = Question.objects.get(subject__name='Networking')
+        self.assertEqual(question.question_text, 'Which layer routes packets\nbetween networks?')
+        self.assertEqual(PlatformStatistic.objects.get(key='total_questions').value, Question.objects.count())
+
+
+class DuplicateTests(ExamTestCase):
+    def test_minhash_similarity(self):
+        documents = [
+            question_document('Which layer of the OSI model routes packets?', 'Network', 'Transport', 'Session', 'Physical'),
+            question_document('which layer of the OSI model routes the packets ?', 'Network', 'Transport', 'Session', 'Physical'),
+            question_document('What is the capital of France?', 'Paris', 'Rome', 'Madrid', 'Berlin'),
+        ]
+        signatures = minhash(documents)
+        self.assertEqual(signatures.shape, (3, 128))
+        self.assertTrue(np.array_equal(minhash(documents[:1]), signatures[:1]))
+        similar = (signatures[0] == signatures[1]).mean()
+        different = (signatures[0] == signatures[2]).mean()
+        self.assertGreater(similar, 0.6)
+        self.assertLess(different, 0.1)
+
+    def test_detect_and_merge(self):
+        course = Course.objects.create(code='cybersecurity', name='Cyber', description='Course', instructor=self.instructor)
+        subject = Subject.objects.create(course=course, name='Networks')
+        text = 'Which layer of the OSI model is responsible for routing packets between networks?'
+        options = {'option_a': 'Network layer', 'option_b': 'Transport layer', 'option_c': 'Data link layer', 'option_d': 'Session layer'}
+        original = self.questions[0]
+        Question.objects.filter(pk=original.pk).update(question_text=text, **options)
+        copies = [
+            Question.objects.create(subject=subject, question_text=text.replace('?', ' ?'), correct_answer='A', created_by=self.instructor, **options),
+            Question.objects.create(subject=subject, question_text=text.lower().replace('routing', 'routing the'), correct_answer='A', created_by=self.instructor, **options),
+        ]
+        other_exam = Exam.objects.create(title='Networks', course=course, subject=subject, duration_minutes=10, created_by=self.instructor)
+        ExamQuestion.objects.bulk_create([ExamQuestion(exam=other_exam, question=question) for question in copies])
+        ExamQuestion.objects.create(exam=self.exam, question=copies[0])
+
+        groups = find_duplicates()
+        self.assertEqual([[question_id for question_id, _ in group] for group in groups], [[original.id, copies[0].id, copies[1].id]])
+        self.assertEqual(detect_duplicates(), 1)
+        self.assertEqual(detect_duplicates(), 1)
+
+        cluster = DuplicateCluster.objects.get()
+        self.assertEqual(merge_cluster(cluster), (2, 2))
+        self.assertEqual(list(other_exam.examquestion_set.values_list('question_id', flat=True)), [original.id])
+        self.assertEqual(self.exam.examquestion_set.filter(question=original).count(), 1)
+        other_exam.refresh_from_db()
+        self.assertEqual(other_exam.total_marks, 2)
+        # Merged clusters are not reported again
+        self.assertEqual(detect_duplicates(), 0)
+
+
+class AnalysisTests(ExamTestCase):
+    def test_psychometrics_match_a_direct_computation(self):
+        rng = random.Random(5)
+        Exam.objects.filter(pk=self.exam.pk).update(questions_to_display=6)
+        for number in range(15):
+            attempt = self.start(self.create_student(f'analysis{number}', enroll_in=self.course))
+            grade_attempt(attempt, {
+                question_id: rng.choice('AAAB' if number % 3 else 'BCD')
+                for question_id in self.paper_ids(attempt) if rng.random() < .9
+            })
+
+        report = analyze_exam(self.exam)
+        self.assertEqual(report.attempt_count, 15)
+        data = ExamAnalysisReport.objects.get(exam=self.exam, kind='psychometrics').report
+
+        attempts = list(ExamAttempt.objects.filter(exam=self.exam))
+        served = {attempt.id: set(self.paper_ids(attempt)) for attempt in attempts}
+        chosen = {(answer.attempt_id, answer.question_id): answer.selected_answer for answer in StudentAnswer.objects.all()}
+        totals = {attempt.id: sum(chosen.get((attempt.id, question_id)) == 'A' for question_id in served[attempt.id]) for attempt in attempts}
+        for item in data['items']:
+            rows = [attempt.id for attempt in attempts if item['question_id'] in served[attempt.id]]
+            correct = np.array([chosen.get((row, item['question_id'])) == 'A' for row in rows], float)
+            rest = np.array([totals[row] for row in rows], float) - correct
+            self.assertEqual(item['served'], len(rows))
+            self.assertAlmostEqual(item['facility'], round(correct.mean(), 3))
+            if correct.std() > 0 and rest.std() > 0:
+                self.assertAlmostEqual(item['point_biserial'], round(np.corrcoef(correct, rest)[0, 1], 3), places=3)
+            self.assertEqual(item['omitted'], sum(chosen.get((row, item['question_id'])) is None for row in rows))
+        self.assertEqual(sum(data['scores']['histogram']), 15)
+
+        self.client.force_login(self.instructor)
+        self.assertContains(self.client.get(reverse('exams:exam_performance', args=[self.exam.id])), 'KR-20')
+
+
+class CollusionTests(ExamTestCase):
+    def test_copied_answer_sheet_is_flagged(self):
+        rng = random.Random(7)
+        extra = [self.create_question(f'Extra question {number}') for number in range(30)]
+        ExamQuestion.objects.bulk_create([
+            ExamQuestion(exam=self.exam, question=question, order=100 + order) for order, question in enumerate(extra)
+        ])
+        Exam.objects.filter(pk=self.exam.pk).update(questions_to_display=38)
+        copied = None
+        for number in range(20):
+            attempt = self.start(self.create_student(f'collusion{number}', enroll_in=self.course))
+            answers = {question_id: rng.choice('AABCD') for question_id in self.paper_ids(attempt)}
+            if number == 0:
+                copied = answers
+            elif number == 1:
+                answers = {question_id: copied[question_id] if rng.random() < .95 else option for question_id, option in answers.items()}
+            grade_attempt(attempt, answers)
+
+        report = detect_collusion(self.exam).report
+        self.assertEqual(report['pairs_compared'], 190)
+        top = report['pairs'][0]
+        self.assertEqual({top['a']['email'], top['b']['email']}, {'collusion0@test.local', 'collusion1@test.local'})
+        self.assertGreater(top['identical_wrong'], top['expected_identical_wrong'])
+
+    def test_honest_candidates_are_not_flagged(self):
+        rng = random.Random(11)
+        for number in range(12):
+            attempt = self.start(self.create_student(f'honest{number}', enroll_in=self.course))
+            grade_attempt(attempt, {question_id: rng.choice('ABCD') for question_id in self.paper_ids(attempt)})
+        report = detect_collusion(self.exam).report
+        self.assertEqual((report['pairs_compared'], report['pairs']), (66, []))
+
+
+class ResultReleaseTests(ExamTestCase):
+    def test_results_are_held_until_released(self):
+        attempt = self.start(self.student)
+        self.submit(attempt, {})
+        self.assertEqual(EmailOutbox.objects.count(), 0)
+        self.assertContains(self.client.get(reverse('exams:exam_result', args=[attempt.id])), 'not been released')
+        for number in range(4):
+            ExamAttempt.objects.create(
+                student=self.create_student(f'released{number}'), exam=self.exam, status='completed',
+                score=number, deadline=timezone.now(),
+            )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('release_results', exam=self.exam.id, chunk_size=2, send=True, stdout=io.StringIO())
+        self.assertEqual(ExamAttempt.objects.filter(result_email__status='sent').count(), 5)
+        # Releasing again queues nothing new
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('release_results', exam=self.exam.id, stdout=io.StringIO())
+        self.assertEqual(EmailOutbox.objects.count(), 5)
+        self.assertContains(self.client.get(reverse('exams:exam_result', args=[attempt.id])), 'Overall Score')
+
+    def test_timed_out_attempts_are_emailed_when_results_show(self):
+        Exam.objects.filter(pk=self.exam.pk).update(show_results_immediately=True)
+        reloaded, swept = self.start(self.student), self.start(self.create_student('swept', enroll_in=self.course))
+        ExamAttempt.objects.update(deadline=timezone.now() - timedelta(minutes=1))
+
+        # Reopening the page after the deadline closes the attempt
+        self.client.force_login(self.student)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('exams:take_exam', args=[reloaded.id]))
+        reloaded.refresh_from_db()
+        self.assertEqual(reloaded.status, 'timeout')
+        self.assertEqual(reloaded.result_email.to, [self.student.email])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(finalize_expired_attempts(), 1)
+        swept.refresh_from_db()
+        self.assertEqual(swept.result_email.to, ['swept@test.local'])
+        self.assertEqual(EmailOutbox.objects.count(), 2)
+
+    def test_admin_actions_queue_tasks(self):
+        admin = CustomUser.objects.create_superuser(email='admin@test.local', username='admin', password='pw')
+        self.client.force_login(admin)
+        for action, task in (
+            ('release_results', 'release_exam_results'),
+            ('analyze_results', 'analyze_exam_results'),
+            ('detect_collusion', 'detect_exam_collusion'),
+        ):
+            with mock.patch(f'exams.tasks.{task}.delay') as delay:
+                response = self.client.post('/admin/exams/exam/', {'action': action, '_selected_action': [self.exam.id]}, follow=True)
+            delay.assert_called_once_with(self.exam.id)
+            self.assertContains(response, 'queued')
+        self.exam.refresh_from_db()
+        self.assertIsNone(self.exam.results_released_at)
+
+
+class SearchTests(ExamTestCase):
+    def matches(self, term):
+        return list(search_questions(Question.objects.all(), term).values_list('id', flat=True))
+
+    def test_index_follows_changes(self):
+        question = self.questions[0]
+        question.question_text = 'Which protocol encrypts web traffic?'
+        question.explanation = 'TLS secures HTTPS'
+        question.save()
+        self.assertEqual(self.matches('encrypting'), [question.id])
+        self.assertEqual(self.matches('tls'), [question.id])
+        self.assertEqual(self.matches('protoc'), [question.id])
+        self.assertEqual(self.matches('"protocol" -(web'), [question.id])
+
+        Question.objects.bulk_create([Question(
+            subject=self.subject, course=self.course, question_text='Bulk imported firewall question',
+            option_a='a', option_b='b', option_c='c', option_d='d', correct_answer='A', created_by=self.instructor,
+        )])
+        self.assertEqual(len(self.matches('firewall')), 1)
+        Question.objects.filter(question_text__contains='firewall').update(question_text='Renamed')
+        self.assertEqual(self.matches('firewall'), [])
+        question.delete()
+        self.assertEqual(self.matches('encrypts'), [])
+
+    def test_admin_lists_the_best_matches_first(self):
+        best = self.create_question('Which firewall rule blocks inbound firewall traffic?')
+        weaker = self.create_question('Which device filters packets?', option_b='A firewall', marks=5)
+        admin = CustomUser.objects.create_superuser(email='admin@test.local', username='admin', password='pw')
+        self.client.force_login(admin)
+        response = self.client.get('/admin/exams/question/', {'q': 'firewall'})
+        self.assertEqual(list(response.context['cl'].result_list), [best, weaker])
+        # Sorting by a column (marks, descending) still wins
+        response = self.client.get('/admin/exams/question/', {'q': 'firewall', 'o': '-4'})
+        self.assertEqual(list(response.context['cl'].result_list), [weaker, best])
+
+    def test_question_picker(self):
+        url = reverse('exams:question_search')
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(url, {'q': 'question'}).status_code, 403)
+        self.client.force_login(self.instructor)
+        self.assertEqual(self.client.get(url, {'q': 'which', 'exclude_exam': self.exam.id}).json()['results'], [])
+        results = self.client.get(url, {'q': 'which', 'difficulty': 'hard', 'limit': 1}).json()['results']
+        self.assertEqual(len(results), 1)
+        self.assertIn('facility', results[0])
+        self.assertEqual(self.client.get(url, {'limit': 'x'}).status_code, 400)
@@ -6,7 +6,10 @@ app_name = 'exams'
 urlpatterns = [
     path('list/', views.exam_list, name='exam_list'),
     path('<uuid:attempt_id>/take/', views.take_exam, name='take_exam'),
+    path('<uuid:attempt_id>/autosave/', views.autosave_answers, name='autosave_answers'),
     path('<uuid:attempt_id>/submit/', views.submit_exam, name='submit_exam'),
     path('<uuid:attempt_id>/result/', views.exam_result, name='exam_result'),
     path('start/<int:exam_id>/', views.start_exam, name='start_exam'),
+    path('questions/search/', views.question_search, name='question_search'),
+    path('<int:exam_id>/performance/', views.exam_performance, name='exam_performance'),
 ]
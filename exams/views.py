@@ -1,16 +1,25 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
+from django.db.models import Q
 from django.utils import timezone
-from django.core.mail import send_mail
-from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 import json
-import random
 from datetime import timedelta
-from .models import Exam, ExamAttempt, Question, StudentAnswer
+from .models import Exam, ExamAnalysisReport, ExamAttempt, ExamPerformance, ExamQuestion, Question
+from .availability import get_student_overview
+from .cache import get_exam_metadata
+from .grading import finalize_attempt, grade_attempt, save_answers
+from .papers import PAPER_FIELDS, build_paper, get_paper, paper_max_score
+from .provisioning import open_provisioned_attempt
+from .search import search_questions, search_words
+from .selection import save_selection, select_question_ids
+
+# Results returned by the question picker search, by default and at most
+QUESTION_SEARCH_LIMIT = 20
+QUESTION_SEARCH_MAX_LIMIT = 50
 
 @login_required
 def exam_list(request):
@@ -18,23 +27,12 @@ def exam_list(request):
         messages.error(request, 'Only students can access this page.')
         return redirect('core:dashboard')
     
-    # Get enrolled courses for the student
-    from authentication.models import CourseEnrollment
-    enrolled_courses = CourseEnrollment.objects.filter(
-        student=request.user, 
-        is_active=True
-    ).values_list('course', flat=True)
-    
     # Only show exams for courses the student is enrolled in
-    available_exams = Exam.objects.filter(
-        is_active=True,
-        course__in=enrolled_courses
-    ).exclude(
-        examattempt__student=request.user
-    )
+    overview = get_student_overview(request.user)
     
     return render(request, 'exams/exam_list.html', {
-        'available_exams': available_exams
+        'exams': overview['available_exams'],
+        'available_exams': overview['available_exams'],
     })
 
 @login_required
@@ -43,82 +41,87 @@ def start_exam(request, exam_id):
         messages.error(request, 'Only students can take exams.')
         return redirect('core:dashboard')
     
-    exam = get_object_or_404(Exam, id=exam_id, is_active=True)
+    # Attempts provisioned ahead of the exam window only need to be opened
+    attempt, opened = open_provisioned_attempt(request.user, exam_id)
+    if opened:
+        messages.success(request, f'Exam "{attempt.exam.title}" started! Good luck!')
+        return redirect('exams:take_exam', attempt_id=attempt.id)
+    
+    # Check if student has already attempted this exam
+    if attempt is not None:
+        messages.error(request, 'You have already attempted this exam.')
+        return redirect('core:dashboard')
+    
+    exam = get_exam_metadata(exam_id)
+    if exam is None or not exam['is_active']:
+        raise Http404('No active exam matches the given query.')
     
     # Check if student is enrolled in the exam's course
     from authentication.models import CourseEnrollment
     is_enrolled = CourseEnrollment.objects.filter(
         student=request.user,
-        course=exam.course,
+        course_id=exam['course_id'],
         is_active=True
     ).exists()
     
     if not is_enrolled:
-        messages.error(request, f'You are not enrolled in the {exam.course.name} course.')
+        messages.error(request, f'You are not enrolled in the {exam["course_name"]} course.')
         return redirect('core:dashboard')
     
-    # Check if student has already attempted this exam
-    existing_attempt = ExamAttempt.objects.filter(
-        student=request.user, 
-        exam=exam
-    ).first()
-    
-    if existing_attempt:
-        messages.error(request, 'You have already attempted this exam.')
-        return redirect('core:dashboard')
-    
-    # Get all questions for this exam
-    all_questions = list(exam.questions.all())
-    
-    # Randomly select questions based on questions_to_display
-    if len(all_questions) <= exam.questions_to_display:
-        selected_questions = all_questions
-    else:
-        selected_questions = random.sample(all_questions, exam.questions_to_display)
+    # Draw question ids from the cached pool, stratified by difficulty and
+    # subject, then load only the selected questions
+    selected_ids = select_question_ids(
+        exam_id, exam['questions_to_display'], exam['difficulty_distribution']
+    )
+    questions_by_id = Question.objects.only(*PAPER_FIELDS).in_bulk(selected_ids)
+    selected_questions = [
+        questions_by_id[question_id] for question_id in selected_ids
+        if question_id in questions_by_id
+    ]
     
-    # Create new attempt
+    # Create new attempt with its paper frozen in display order
+    paper = build_paper(selected_questions, shuffle=exam['randomize_questions'])
     attempt = ExamAttempt.objects.create(
         student=request.user,
-        exam=exam,
-        total_questions=len(selected_questions)
+        exam_id=exam_id,
+        deadline=timezone.now() + timedelta(minutes=exam['duration_minutes']),
+        total_questions=len(selected_questions),
+        max_score=paper_max_score(paper),
+        paper=paper
     )
     
     # Add selected questions to the attempt
-    attempt.selected_questions.set(selected_questions)
+    save_selection(attempt, [question.id for question in selected_questions])
     
-    messages.success(request, f'Exam "{exam.title}" started! Good luck!')
+    messages.success(request, f'Exam "{exam["title"]}" started! Good luck!')
     return redirect('exams:take_exam', attempt_id=attempt.id)
 
 @login_required
 def take_exam(request, attempt_id):
-    attempt = get_object_or_404(ExamAttempt, id=attempt_id, student=request.user)
+    attempt = get_object_or_404(
+        ExamAttempt.objects.select_related('exam__subject'),
+        id=attempt_id,
+        student=request.user
+    )
     
     if attempt.status != 'in_progress':
         messages.error(request, 'This exam attempt is no longer active.')
         return redirect('core:dashboard')
     
     # Check if exam time has expired
-    elapsed_time = timezone.now() - attempt.start_time
-    if elapsed_time.total_seconds() / 60 > attempt.exam.duration_minutes:
-        attempt.status = 'timeout'
-        attempt.end_time = timezone.now()
-        attempt.time_taken_minutes = attempt.exam.duration_minutes
-        attempt.save()
+    remaining_time = (attempt.deadline - timezone.now()).total_seconds()
+    if remaining_time <= 0:
+        finalize_attempt(attempt, status='timeout', end_time=attempt.deadline)
         messages.error(request, 'Time is up! Exam has been automatically submitted.')
         return redirect('exams:exam_result', attempt_id=attempt.id)
     
-    # Get questions for this attempt (the ones that were randomly selected)
-    questions = list(attempt.selected_questions.all())
-    if attempt.exam.randomize_questions:
-        random.shuffle(questions)
+    # Render the paper frozen when the attempt started
+    questions = get_paper(attempt)
     
     # Get existing answers
-    existing_answers = {
-        answer.question.id: answer.selected_answer 
-        for answer in attempt.answers.all()
-    }
-    
-    remaining_time = attempt.exam.duration_minutes * 60 - elapsed_time.total_seconds()
+    existing_answers = dict(
+        attempt.answers.values_list('question_id', 'selected_answer')
+    )
     
     context = {
         'attempt': attempt,
@@ -130,6 +133,31 @@ def take_exam(request, attempt_id):
     
     return render(request, 'exams/take_exam.html', context)
 
+@login_required
+@require_POST
+def autosave_answers(request, attempt_id):
+    """Store the answers changed since the last autosave of an attempt"""
+    attempt = get_object_or_404(ExamAttempt, id=attempt_id, student=request.user)
+    
+    if attempt.status != 'in_progress':
+        return JsonResponse({'error': 'Exam is not in progress'}, status=400)
+    
+    if timezone.now() > attempt.deadline:
+        return JsonResponse({'error': 'Time is up'}, status=400)
+    
+    try:
+        data = json.loads(request.body)
+        answers = data.get('answers', {})
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'Invalid answers payload'}, status=400)
+    
+    if not isinstance(answers, dict):
+        return JsonResponse({'error': 'Invalid answers payload'}, status=400)
+    
+    saved = save_answers(attempt, answers)
+    
+    return JsonResponse({'success': True, 'saved': saved})
+
 @login_required
 @require_POST
 @csrf_exempt
@@ -143,42 +171,9 @@ def submit_exam(request, attempt_id):
         data = json.loads(request.body)
         answers = data.get('answers', {})
         
-        # Save answers
-        correct_count = 0
-        total_score = 0
-        
-        for question_id, selected_answer in answers.items():
-            question = Question.objects.get(id=question_id)
-            
-            # Delete existing answer if any
-            StudentAnswer.objects.filter(
-                attempt=attempt, 
-                question=question
-            ).delete()
-            
-            # Create new answer
-            student_answer = StudentAnswer.objects.create(
-                attempt=attempt,
-                question=question,
-                selected_answer=selected_answer
-            )
-            
-            if student_answer.is_correct:
-                correct_count += 1
-                total_score += question.marks
-        
-        # Update attempt
-        attempt.status = 'completed'
-        attempt.end_time = timezone.now()
-        attempt.correct_answers = correct_count
-        attempt.score = total_score
-        
-        elapsed_time = attempt.end_time - attempt.start_time
-        attempt.time_taken_minutes = int(elapsed_time.total_seconds() / 60)
-        attempt.save()
-        
-        # Send result email
-        send_result_email(attempt)
+        # Store answers not yet autosaved and grade all stored answers
+        if not grade_attempt(attempt, answers):
+            return JsonResponse({'error': 'Exam is not in progress'}, status=400)
         
         return JsonResponse({
             'success': True,
@@ -192,57 +187,145 @@ def submit_exam(request, attempt_id):
 def exam_result(request, attempt_id):
     attempt = get_object_or_404(ExamAttempt, id=attempt_id, student=request.user)
     
+    if attempt.status == 'scheduled':
+        messages.error(request, 'This exam has not been started yet.')
+        return redirect('core:dashboard')
+    
     if attempt.status == 'in_progress':
         messages.error(request, 'Exam is still in progress.')
         return redirect('exams:take_exam', attempt_id=attempt.id)
     
+    if not attempt.exam.results_available:
+        return render(request, 'exams/results_pending.html', {'attempt': attempt})
+    
     # Get detailed answers
     answers = attempt.answers.select_related('question').order_by('answered_at')
     
-    # Calculate percentage
-    percentage = (attempt.score / attempt.exam.total_marks * 100) if attempt.exam.total_marks > 0 else 0
-    
     context = {
         'attempt': attempt,
         'answers': answers,
-        'percentage': round(percentage, 2)
+        'percentage': attempt.percentage
     }
     
     return render(request, 'exams/exam_result.html', context)
 
-def send_result_email(attempt):
-    """Send exam result to student's email"""
-    try:
-        subject = f'Exam Result: {attempt.exam.title}'
-        percentage = (attempt.score / attempt.exam.total_marks * 100) if attempt.exam.total_marks > 0 else 0
-        
-        message = f"""
-Dear {attempt.student.first_name},
-
-Your exam results for "{attempt.exam.title}" are ready!
-
-Exam Details:
-- Subject: {attempt.exam.subject.name}
-- Duration: {attempt.exam.duration_minutes} minutes
-- Time Taken: {attempt.time_taken_minutes} minutes
+ITEM_FLAG_LABELS = {
+    'too_easy': 'Too easy',
+    'too_hard': 'Too hard',
+    'low_discrimination': 'Low discrimination',
+    'distractor_attracts_strong_candidates': 'Distractor attracts strong candidates',
+}
 
-Your Results:
-- Score: {attempt.score} out of {attempt.exam.total_marks}
-- Correct Answers: {attempt.correct_answers} out of {attempt.total_questions}
-- Percentage: {percentage:.2f}%
+@login_required
+def exam_performance(request, exam_id):
+    """Performance drill-down of one exam for its instructor"""
+    exam = get_object_or_404(Exam.objects.select_related('course', 'subject'), id=exam_id)
+    
+    is_owner = request.user.is_instructor and (
+        exam.created_by_id == request.user.id
+        or (exam.course and exam.course.instructor_id == request.user.id)
+    )
+    if not (is_owner or request.user.is_admin):
+        messages.error(request, 'You do not have permission to view this exam.')
+        return redirect('core:dashboard')
+    
+    performance = ExamPerformance.objects.filter(exam=exam).first()
+    if performance is None:
+        performance = ExamPerformance(exam=exam, histogram=[0] * ExamPerformance.HISTOGRAM_BINS)
+    
+    histogram = [
+        {
+            'label': f'{band * 10}-{band * 10 + 10}%',
+            'count': count,
+            'share': round(count / performance.attempt_count * 100, 1) if performance.attempt_count else 0,
+        }
+        for band, count in enumerate(performance.histogram)
+    ]
+    
+    # Latest offline reports (analysis commands, tasks or admin actions)
+    reports = {report.kind: report for report in ExamAnalysisReport.objects.filter(exam=exam)}
+    analysis = reports.get('psychometrics')
+    items = []
+    if analysis:
+        items = analysis.report.get('items', [])
+        texts = dict(
+            Question.objects.filter(id__in=[item['question_id'] for item in items]).values_list('id', 'question_text')
+        )
+        items = sorted(
+            [
+                {**item, 'question_text': texts.get(item['question_id'], ''),
+                 'flag_labels': [ITEM_FLAG_LABELS[flag] for flag in item['flags']]}
+                for item in items
+            ],
+            # Flagged items first, weakest discrimination first
+            key=lambda item: (not item['flags'], item['point_biserial'] if item['point_biserial'] is not None else 1),
+        )
+    
+    return render(request, 'exams/exam_performance.html', {
+        'exam': exam,
+        'performance': performance,
+        'histogram': histogram,
+        'analysis': analysis,
+        'analysis_items': items,
+        'collusion': reports.get('collusion'),
+    })
 
-Thank you for taking the exam!
+def question_stats_summary(stats):
+    """Item statistics shown next to a question in the picker"""
+    if stats is None:
+        return {'served': 0, 'answered': 0, 'facility': None, 'discrimination': None}
+    return {
+        'served': stats.served_count,
+        'answered': stats.answered_count,
+        'facility': stats.facility,
+        'discrimination': stats.discrimination,
+    }
 
-Best regards,
-CBT System Team
-"""
-        
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [attempt.student.email],
-            fail_silently=True,
+@login_required
+def question_search(request):
+    """Ranked question search for the instructor question picker (JSON)"""
+    user = request.user
+    if not (user.is_instructor or user.is_admin):
+        return JsonResponse({'error': 'Only instructors can search the question bank'}, status=403)
+    
+    try:
+        limit = min(max(int(request.GET.get('limit', QUESTION_SEARCH_LIMIT)), 1), QUESTION_SEARCH_MAX_LIMIT)
+        subject_id = int(request.GET['subject']) if request.GET.get('subject') else None
+        exclude_exam_id = int(request.GET['exclude_exam']) if request.GET.get('exclude_exam') else None
+    except ValueError:
+        return JsonResponse({'error': 'limit, subject and exclude_exam must be integers'}, status=400)
+    
+    questions = Question.objects.select_related('subject', 'stats')
+    if not user.is_admin:
+        # Instructors pick from their own questions and the courses they teach
+        questions = questions.filter(Q(created_by=user) | Q(course__instructor=user))
+    if subject_id:
+        questions = questions.filter(subject_id=subject_id)
+    if request.GET.get('difficulty'):
+        questions = questions.filter(difficulty=request.GET['difficulty'])
+    if exclude_exam_id:
+        # Leave out questions already in the exam being edited
+        questions = questions.exclude(
+            id__in=ExamQuestion.objects.filter(exam_id=exclude_exam_id).values('question_id')
         )
-    except Exception as e:
-        print(f"Email sending failed: {e}")
+    
+    term = request.GET.get('q', '')
+    if search_words(term):
+        questions = search_questions(questions, term)
+    else:
+        questions = questions.order_by('-id')
+    
+    return JsonResponse({
+        'results': [
+            {
+                'id': question.id,
+                'question_text': question.question_text,
+                'subject': question.subject.name,
+                'difficulty': question.difficulty,
+                'marks': question.marks,
+                'rank': round(getattr(question, 'search_rank', 0.0), 4),
+                **question_stats_summary(getattr(question, 'stats', None)),
+            }
+            for question in questions[:limit]
+        ]
+    })
@@ -87,10 +87,18 @@ function initializeExamTimer() {
 }
 
 // Auto-save Functionality
+var autoSaveDelay = 1500; // Wait for answers to settle before sending them
+var autoSaveTimer = null;
+var autoSaveInFlight = false;
+var lastSavedAnswers = {};
+
 function initializeAutoSave() {
+    // Answers rendered by the server are already stored
+    lastSavedAnswers = collectAnswers();
+    
     var autoSaveInterval = setInterval(function() {
-        autoSaveAnswers();
-    }, 30000); // Auto-save every 30 seconds
+        flushAnswers();
+    }, 30000); // Retry unsaved answers every 30 seconds
     
     // Save on answer change
     $('.exam-form input[type="radio"]').change(function() {
@@ -102,19 +110,76 @@ function initializeAutoSave() {
     window.autoSaveInterval = autoSaveInterval;
 }
 
-// Auto-save answers
-function autoSaveAnswers() {
+// Collect the selected option of every answered question
+function collectAnswers() {
     var answers = {};
     $('.exam-form input[type="radio"]:checked').each(function() {
         var questionId = $(this).attr('name').replace('question_', '');
         answers[questionId] = $(this).val();
     });
-    
+    return answers;
+}
+
+// Answers changed since the last successful save
+function getUnsavedAnswers() {
+    var answers = collectAnswers();
+    var changed = {};
+    for (var questionId in answers) {
+        if (lastSavedAnswers[questionId] !== answers[questionId]) {
+            changed[questionId] = answers[questionId];
+        }
+    }
+    return changed;
+}
+
+// Auto-save answers
+function autoSaveAnswers() {
     // Store in localStorage as backup
-    localStorage.setItem('exam_answers', JSON.stringify(answers));
+    localStorage.setItem('exam_answers', JSON.stringify(collectAnswers()));
+    
+    // Debounce so rapid changes are sent to the server as one batch
+    clearTimeout(autoSaveTimer);
+    autoSaveTimer = setTimeout(flushAnswers, autoSaveDelay);
+}
+
+// Send unsaved answers to the server
+function flushAnswers() {
+    var autoSaveUrl = $('#exam-form').data('autosave-url');
+    var changed = getUnsavedAnswers();
+    
+    if (!autoSaveUrl || autoSaveInFlight || $.isEmptyObject(changed)) {
+        return;
+    }
     
-    // Visual feedback
-    $('#auto-save-indicator').fadeIn().delay(1000).fadeOut();
+    autoSaveInFlight = true;
+    
+    $.ajax({
+        url: autoSaveUrl,
+        method: 'POST',
+        data: JSON.stringify({
+            answers: changed
+        }),
+        contentType: 'application/json',
+        headers: {
+            'X-CSRFToken': $('input[name="csrfmiddlewaretoken"]').val()
+        },
+        success: function(response) {
+            if (response.success) {
+                $.extend(lastSavedAnswers, changed);
+                
+                // Visual feedback
+                $('#auto-save-indicator').fadeIn().delay(1000).fadeOut();
+                
+                // Answers changed while this batch was in flight
+                if (!$.isEmptyObject(getUnsavedAnswers())) {
+                    autoSaveAnswers();
+                }
+            }
+        },
+        complete: function() {
+            autoSaveInFlight = false;
+        }
+    });
 }
 
 // Update progress bar
@@ -138,12 +203,9 @@ function submitExam(autoSubmit = false) {
     // Disable submit button
     $('#submit-btn').prop('disabled', true).html('<span class="loading-spinner"></span> Submitting...');
     
-    // Collect answers
-    var answers = {};
-    $('.exam-form input[type="radio"]:checked').each(function() {
-        var questionId = $(this).attr('name').replace('question_', '');
-        answers[questionId] = $(this).val();
-    });
+    // Only answers the server has not stored yet need to be sent
+    clearTimeout(autoSaveTimer);
+    var answers = getUnsavedAnswers();
     
     // Get CSRF token
     var csrfToken = $('input[name="csrfmiddlewaretoken"]').val();
@@ -353,6 +415,9 @@ $(document).ready(function() {
                     $('input[name="question_' + questionId + '"][value="' + answers[questionId] + '"]').prop('checked', true);
                 }
                 updateProgress();
+                
+                // Push restored answers the server does not have yet
+                autoSaveAnswers();
             } catch (e) {
                 console.log('Error restoring answers:', e);
             }